@@ -1,17 +1,20 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
 import logging
 from datetime import datetime
 import json
-import requests
 from typing import Dict, Any, List, Optional
 import time
 import traceback
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import config
 
 # Import the comprehensive Samadhan AI dataset
-from samadhan_dataset import SAMADHAN_AI_COMPLETE_DATASET
+from samadhan_dataset import SAMADHAN_AI_COMPLETE_DATASET, UP_GOVERNMENT_DATASET
 from samadhan_dataset.load_dataset import (
     get_complete_dataset,
     get_training_documents,
@@ -20,31 +23,29 @@ from samadhan_dataset.load_dataset import (
     get_department_info,
     get_helpline_number,
     get_district_info,
-    get_dataset_stats
+    get_dataset_stats,
+    get_corpus_snapshot
 )
+from keyword_engine import ComplaintKeywordIndex
+from http_clients import get_http_client, prewarm_http_clients
+from token_manager import IAMTokenManager
+from watsonx_pool import NoWatsonXAccountAvailable, WatsonXPool
+from circuit_breaker import CircuitBreakerRegistry, guarded_stream
+from sse import iter_stream_deltas
+from response_cache import SemanticCache, TTLCache, normalize_complaint_text, response_cache_key
+from hedging import CancelToken, ProviderRaceError, RaceStats, race_providers
+from retrieval_index import RetrievalIndex, weighted_vote
+from bm25 import BM25Index, HybridRetriever, STAGE_LEXICAL, STAGE_HYBRID
+from embedding_cache import EmbeddingCache
+from static_responses import StaticJSONResponses
 
-# LangChain imports with error handling (no OpenAI)
-try:
-    from langchain.text_splitter import RecursiveCharacterTextSplitter
-    from langchain.schema import Document
-    from langchain.prompts import PromptTemplate
-    LANGCHAIN_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️ LangChain not available: {e}")
-    LANGCHAIN_AVAILABLE = False
-
-# Sentence transformers for embeddings fallback
-try:
-    from sentence_transformers import SentenceTransformer
-    import numpy as np
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-    print("✅ Sentence transformers available")
-except ImportError:
-    print("⚠️ Sentence transformers not available")
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
+# Embedding backend (sentence transformers or TF-IDF), loaded by initialize_sentence_transformers
+from embedding_backends import load_embedding_backend
+from corpus_embeddings import CorpusEmbeddings
 
 app = Flask(__name__)
-CORS(app, origins=["http://localhost:5173", "https://eclectic-centaur-42bbfd.netlify.app"])
+CORS_ORIGINS = ["http://localhost:5173", "https://eclectic-centaur-42bbfd.netlify.app"]
+CORS(app, origins=CORS_ORIGINS)
 
 # Configure logging - 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -52,189 +53,381 @@ logger = logging.getLogger(__name__)
 
 
 
-# Global variables for caching
-token_cache = {
-    'token': None,
-    'expiry': 0
+# Initialize components (without OpenAI)
+embedding_model = None
+rag_documents = None
+corpus_embeddings = None
+retrieval_index = None
+# BM25 first stage plus dense retrieval, used for the local analysis
+local_retriever = None
+# Query embeddings shared by retrieval, the semantic cache and batches
+query_embeddings = None
+
+# Sentiment lexicon for rule-based analysis
+SENTIMENT_KEYWORDS = {
+    'negative': ['angry', 'frustrated', 'terrible', 'worst', 'horrible', 'disgusted', 'furious', 'outraged', 'disappointed'],
+    'positive': ['thank', 'appreciate', 'good', 'excellent', 'satisfied', 'happy', 'pleased', 'grateful']
 }
 
-# Initialize components (without OpenAI)
-sentence_model = None
+# Canonical district names (all 75 plus the major-district keys used for contacts), looked up case-insensitively
+UP_DISTRICTS = {
+    name.casefold(): name
+    for group in ('all_districts', 'major_districts')
+    for name in SAMADHAN_AI_COMPLETE_DATASET['districts'][group]
+}
+
+# Keyword automaton for rule-based analysis, compiled once at startup
+keyword_index = ComplaintKeywordIndex(
+    SAMADHAN_AI_COMPLETE_DATASET['government_data']['departments'],
+    get_priority_keywords(),
+    SENTIMENT_KEYWORDS,
+    districts=UP_DISTRICTS.values()
+)
+
+# Generated responses for repeated complaints (exact) and paraphrases (semantic)
+response_cache = TTLCache(config.RESPONSE_CACHE_SIZE, config.RESPONSE_CACHE_TTL)
+semantic_cache = SemanticCache(config.SEMANTIC_CACHE_SIZE, config.SEMANTIC_CACHE_THRESHOLD, config.RESPONSE_CACHE_TTL)
+
+# Win/latency counters for hedged WatsonX/OpenRouter races
+race_stats = RaceStats()
+
+# Speculative generation overlapping the LLM analysis (see analyze_and_generate)
+pipeline_executor = ThreadPoolExecutor(max_workers=config.PIPELINE_MAX_WORKERS, thread_name_prefix='speculative')
+pipeline_stats = {'reused': 0, 'regenerated': 0, 'combined': 0, 'combined_fallback': 0}
+pipeline_stats_lock = threading.Lock()
+
+# Dataset endpoints polled by the frontend: serialised (byte for byte as jsonify), ETag'd and compressed once per dataset version
+static_responses = StaticJSONResponses(lambda payload: app.json.response(payload).get_data(),
+                                       lambda: get_corpus_snapshot().version)
+static_responses.register('up_data', get_complete_dataset)
+static_responses.register('dataset_stats', get_dataset_stats)
 
 class SimpleDocument:
-    """Simple document class for when LangChain is not available"""
+    """RAG corpus document (page_content and metadata, as in LangChain) without importing LangChain"""
     def __init__(self, page_content: str, metadata: dict = None):
         self.page_content = page_content
         self.metadata = metadata or {}
 
 def create_samadhan_ai_rag_documents():
     """Create comprehensive RAG documents trained on Samadhan AI dataset"""
-    if LANGCHAIN_AVAILABLE:
-        from langchain.schema import Document
-        doc_class = Document
-    else:
-        doc_class = SimpleDocument
-    
     documents = []
     training_docs = get_training_documents()
     
     for doc_data in training_docs:
-        documents.append(doc_class(
+        documents.append(SimpleDocument(
             page_content=doc_data['content'],
             metadata=doc_data['metadata']
         ))
     
     # Add project information
     project_info = SAMADHAN_AI_COMPLETE_DATASET['project_info']
-    documents.append(doc_class(
+    documents.append(SimpleDocument(
         page_content=f"Samadhan AI is {project_info['theme']}. Objective: {project_info['objective']}. Tech stack: {', '.join(project_info['tech_stack'])}. Features: {', '.join(project_info['features'])}. Dataset size: {project_info['dataset_size']}.",
         metadata={"type": "project_info", "category": "system"}
     ))
     
     return documents
 
+# Seconds spent in each startup phase (see initialize_runtime), reported in /health
+startup_timings: Dict[str, float] = {}
+
+def record_startup_phase(phase: str, started: float) -> float:
+    """Store the seconds since started under phase and return the current time"""
+    now = time.perf_counter()
+    startup_timings[phase] = round(now - started, 4)
+    return now
+
 def initialize_sentence_transformers():
     """Initialize sentence transformers for embeddings"""
-    global sentence_model
+    global embedding_model, rag_documents, corpus_embeddings, retrieval_index, query_embeddings, local_retriever
     
     try:
-        if SENTENCE_TRANSFORMERS_AVAILABLE:
-            sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
-            logger.info("✅ RAG system initialized with comprehensive Samadhan AI dataset")
+        mark = time.perf_counter()
+        rag_documents = create_samadhan_ai_rag_documents()
+        doc_texts = [doc.page_content for doc in rag_documents]
+        doc_metadata = [doc.metadata for doc in rag_documents]
+        mark = record_startup_phase('documents', mark)
+        lexical_index = None
+        if config.LEXICAL_RETRIEVAL_ENABLED:
+            lexical_index = BM25Index(doc_texts, doc_metadata, config.BM25_K1, config.BM25_B)
+            mark = record_startup_phase('bm25_index', mark)
+        # Imports torch (sentence transformers) or scikit-learn only now, not when the app is imported
+        embedding_model = load_embedding_backend(
+            config.EMBEDDING_BACKEND,
+            config.EMBEDDING_MODEL_NAME,
+            doc_texts,
+            tfidf_dimensions=config.TFIDF_EMBEDDING_DIMENSIONS
+        )
+        mark = record_startup_phase('embedding_model', mark)
+        if embedding_model is not None:
+            query_embeddings = EmbeddingCache(embedding_model.encode, int(config.QUERY_EMBEDDING_CACHE_MB * 1024 * 1024))
+            
+            # Corpus embeddings are built once and reused across restarts
+            corpus_embeddings = CorpusEmbeddings.load_or_build(
+                embedding_model,
+                embedding_model.name,
+                doc_texts,
+                config.EMBEDDING_CACHE_DIR
+            )
+            mark = record_startup_phase('corpus_embeddings', mark)
+            retrieval_index = RetrievalIndex(
+                corpus_embeddings.matrix,
+                doc_metadata,
+                faiss_min_docs=config.RETRIEVAL_FAISS_MIN_DOCS
+            )
+            record_startup_phase('retrieval_index', mark)
+            logger.info(f"✅ RAG system initialized with comprehensive Samadhan AI dataset ({embedding_model.kind} embeddings)")
         else:
-            logger.warning("⚠️ Using rule-based analysis (sentence transformers not available)")
+            logger.warning("⚠️ No embedding backend available, local analysis uses BM25 and keyword rules")
+        
+        if lexical_index is not None or retrieval_index is not None:
+            local_retriever = HybridRetriever(
+                doc_metadata,
+                lexical=lexical_index,
+                dense=retrieval_index,
+                encode=query_embeddings.encode_many if query_embeddings is not None else None,
+                confident_share=config.LEXICAL_CONFIDENT_SHARE,
+                confident_score=config.LEXICAL_CONFIDENT_SCORE,
+                confident_hits=config.LEXICAL_CONFIDENT_HITS,
+                fusion=config.HYBRID_FUSION,
+                dense_weight=config.HYBRID_DENSE_WEIGHT,
+                candidates=config.HYBRID_CANDIDATES,
+                gate_field=VOTING_FIELD
+            )
     except Exception as e:
         logger.error(f"❌ Error initializing RAG system: {e}")
 
-def get_ibm_cloud_token():
-    """Get IBM Cloud IAM token with caching - EXACTLY like your friend's code"""
-    global token_cache
+# Exercises encoding, retrieval and the keyword rules once before traffic arrives
+WARMUP_COMPLAINT = 'Street light not working and water pipe leaking near the main road in Lucknow'
+runtime_initialized = False
+
+def initialize_runtime():
+    """Load and warm the embedding model, corpus embeddings and indexes (once per process tree)
     
-    # Check if we have a valid cached token
-    if token_cache['token'] and time.time() < token_cache['expiry']:
-        return token_cache['token']
+    Under gunicorn this runs in the master (preload_app), so forked workers
+    share everything copy-on-write and recycled workers start warm.
+    """
+    global runtime_initialized
+    if runtime_initialized:
+        return
+    runtime_initialized = True
     
+    started = time.perf_counter()
+    initialize_sentence_transformers()
     try:
-        logger.info('🔄 Getting IBM Cloud token...')
-        
-        # EXACTLY like your friend's approach
-        response = requests.post(
-            'https://iam.cloud.ibm.com/identity/token',
-            headers={
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'Accept': 'application/json',
-            },
-            data=f'grant_type=urn:ibm:params:oauth:grant-type:apikey&apikey={config.WATSONX_API_KEY}'
-        )
-        
-        if response.status_code != 200:
-            logger.error(f'❌ IBM Cloud error: {response.status_code}')
-            raise Exception(f'IBM Cloud authentication failed: {response.status_code}')
-        
-        token_data = response.json()
-        
-        if not token_data.get('access_token'):
-            raise Exception('Failed to obtain access token')
-        
-        # Cache the token (expire 5 minutes before actual expiry)
-        token_cache['token'] = token_data['access_token']
-        token_cache['expiry'] = time.time() + (token_data.get('expires_in', 3600) - 300)
-        
-        logger.info('✅ IBM Cloud token obtained')
-        return token_data['access_token']
-        
+        mark = time.perf_counter()
+        get_local_analysis(WARMUP_COMPLAINT)
+        logger.info(f'🔥 Warm-up inference done in {time.perf_counter() - mark:.2f}s')
+        record_startup_phase('warmup', mark)
+    except Exception as e:
+        logger.warning(f'⚠️ Warm-up inference failed: {e}')
+    mark = time.perf_counter()
+    static_responses.prebuild()
+    record_startup_phase('static_responses', mark)
+    record_startup_phase('total', started)
+    logger.info('🚀 Startup phases: ' + ', '.join(f'{phase} {seconds:.2f}s' for phase, seconds in startup_timings.items()))
+
+# Provider endpoints and request formats (shared with the ASGI app)
+IAM_TOKEN_URL = 'https://iam.cloud.ibm.com/identity/token'
+IAM_TOKEN_HEADERS = {
+    'Content-Type': 'application/x-www-form-urlencoded',
+    'Accept': 'application/json',
+}
+OPENROUTER_CHAT_URL = "https://openrouter.ai/api/v1/chat/completions"
+DEFAULT_OPENROUTER_MODEL = "deepseek/deepseek-r1-0528-qwen3-8b:free"
+
+def iam_token_request_body(api_key: str) -> str:
+    return f'grant_type=urn:ibm:params:oauth:grant-type:apikey&apikey={api_key}'
+
+def parse_iam_token_response(status_code: int, token_data) -> tuple:
+    """(access_token, expires_in) from an IAM response, raising on errors"""
+    if status_code != 200:
+        logger.error(f'❌ IBM Cloud error: {status_code}')
+        raise Exception(f'IBM Cloud authentication failed: {status_code}')
+    
+    if not token_data.get('access_token'):
+        raise Exception('Failed to obtain access token')
+    
+    logger.info('✅ IBM Cloud token obtained')
+    return token_data['access_token'], token_data.get('expires_in', 3600)
+
+def watsonx_headers(access_token: str) -> Dict[str, str]:
+    return {
+        'Authorization': f'Bearer {access_token}',
+        'Accept': 'text/event-stream',
+        'Content-Type': 'application/json',
+    }
+
+def openrouter_headers() -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {config.OPENROUTER_API_KEY}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": config.FRONTEND_URL,
+        "X-Title": "Samadhan AI"
+    }
+
+def openrouter_payload(prompt: str, model: str, stream: bool = False) -> Dict[str, Any]:
+    payload = {
+        "model": model,
+        "messages": [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "max_tokens": 500,
+        "temperature": 0.7
+    }
+    if stream:
+        payload["stream"] = True
+    return payload
+
+def request_ibm_cloud_token(api_key: str):
+    """Exchange an API key for an IBM Cloud IAM token - EXACTLY like your friend's code"""
+    logger.info('🔄 Getting IBM Cloud token...')
+    
+    # EXACTLY like your friend's approach
+    response = get_http_client('ibm_iam').post(
+        IAM_TOKEN_URL,
+        headers=IAM_TOKEN_HEADERS,
+        data=iam_token_request_body(api_key)
+    )
+    
+    return parse_iam_token_response(response.status_code, response.json() if response.status_code == 200 else None)
+
+# Per-account IAM tokens, refreshed in the background before they expire
+iam_token_manager = IAMTokenManager(request_ibm_cloud_token)
+
+# Breakers for 'watsonx', 'openrouter' and each 'watsonx:<account>'
+circuit_breakers = CircuitBreakerRegistry(
+    failure_rate_threshold=config.CIRCUIT_FAILURE_RATE_THRESHOLD,
+    slow_call_seconds=config.CIRCUIT_SLOW_CALL_SECONDS,
+    slow_call_rate_threshold=config.CIRCUIT_SLOW_CALL_RATE_THRESHOLD,
+    window_size=config.CIRCUIT_WINDOW_SIZE,
+    minimum_calls=config.CIRCUIT_MINIMUM_CALLS,
+    open_seconds=config.CIRCUIT_OPEN_SECONDS,
+    half_open_calls=config.CIRCUIT_HALF_OPEN_CALLS
+)
+
+# WatsonX accounts balanced by latency, load and error rate
+watsonx_pool = WatsonXPool(
+    config.WATSONX_ACCOUNTS,
+    throttle_cooldown=config.WATSONX_THROTTLE_COOLDOWN,
+    acquire_timeout=config.WATSONX_ACQUIRE_TIMEOUT,
+    breakers=circuit_breakers
+)
+
+def get_ibm_cloud_token(api_key: str = None):
+    """Get IBM Cloud IAM token with caching"""
+    try:
+        return iam_token_manager.get_token(api_key or config.WATSONX_API_KEY)
     except Exception as e:
         logger.error(f'❌ Token error: {e}')
         raise
 
-def call_watsonx_streaming(request_body: dict) -> str:
-    """Call WatsonX streaming API - EXACTLY like your friend's working approach with FIXED parsing"""
+def parse_retry_after(response) -> Optional[float]:
+    """Seconds from a Retry-After header, if present and numeric"""
     try:
-        if not config.WATSONX_API_KEY:
-            raise Exception("WatsonX API key not configured")
-        
-        logger.info('🤖 Calling WatsonX...')
-        
-        # Get IBM Cloud token
-        access_token = get_ibm_cloud_token()
-        
-        # Use the streaming URL
-        scoring_url = config.WATSONX_STREAMING_URL
-        
-        # EXACTLY like your friend's approach
-        response = requests.post(
-            scoring_url,
-            headers={
-                'Authorization': f'Bearer {access_token}',
-                'Accept': 'text/event-stream',
-                'Content-Type': 'application/json',
-            },
-            json=request_body,
-            stream=True,
-            timeout=60
-        )
+        return float(response.headers.get('Retry-After'))
+    except (AttributeError, TypeError, ValueError):
+        return None
 
-        if response.status_code != 200:
-            logger.error(f'❌ WatsonX error: {response.status_code}')
-            raise Exception(f'WatsonX API error: {response.status_code}')
-
-        # Process the streaming response - EXACTLY like your friend's code with FIXED parsing
-        response_text = ""
-        buffer = ""  # Buffer to handle split JSON
+def iter_watsonx_deltas(request_body: dict, cancel=None):
+    """Stream content deltas from the WatsonX streaming API as they arrive
+    
+    Fails fast with CircuitOpenError while the 'watsonx' breaker is open.
+    cancel is an optional hedging.CancelToken; cancelling it closes the connection.
+    """
+    if not watsonx_pool.accounts:
+        raise Exception("WatsonX API key not configured")
+    
+    return guarded_stream(circuit_breakers.get('watsonx'), iter_watsonx_account_deltas(request_body, cancel),
+                          cancel, neutral=(NoWatsonXAccountAvailable,))
 
+def iter_watsonx_account_deltas(request_body: dict, cancel=None):
+    """WatsonX call with account failover.
+    
+    The account is leased from watsonx_pool (least expected latency with a free
+    slot). If an account fails or is throttled before any text was streamed, the
+    request moves on to the next available account.
+    """
+    tried = []
+    last_error = None
+    while True:
         try:
-            for chunk in response.iter_content(chunk_size=1024, decode_unicode=True):
-                if chunk:
-                    chunk_str = str(chunk)
-
-                    # Append chunk to buffer
-                    buffer += chunk_str
-
-                    # Split buffer by newlines and process complete lines
-                    lines = buffer.split('\n')
-                    buffer = lines.pop() if lines else ""  # Keep the last (possibly incomplete) line in buffer
-
-                    for line in lines:
-                        if line.startswith('data:'):
-                            data_str = line[5:].strip()
-                            if data_str and data_str != '[DONE]':
-                                try:
-                                    json_data = json.loads(data_str)
-                                    # FIXED: Better error handling for choices array
-                                    choices = json_data.get('choices', [])
-                                    if choices and len(choices) > 0:
-                                        delta = choices[0].get('delta', {})
-                                        content = delta.get('content')
-                                        if content:
-                                            response_text += content
-                                except json.JSONDecodeError:
-                                    continue
-                                except (IndexError, KeyError):
-                                    continue
-
-            # Process any remaining buffer content
-            if buffer and buffer.startswith('data:'):
-                data_str = buffer[5:].strip()
-                if data_str and data_str != '[DONE]':
-                    try:
-                        json_data = json.loads(data_str)
-                        # FIXED: Better error handling for choices array
-                        choices = json_data.get('choices', [])
-                        if choices and len(choices) > 0:
-                            delta = choices[0].get('delta', {})
-                            content = delta.get('content')
-                            if content:
-                                response_text += content
-                    except (json.JSONDecodeError, IndexError, KeyError):
-                        pass
-
-        except Exception as stream_error:
-            logger.error(f'❌ WatsonX streaming error: {stream_error}')
-            raise Exception(f'WatsonX streaming error: {stream_error}')
+            lease = watsonx_pool.acquire(exclude=tuple(tried))
+        except NoWatsonXAccountAvailable:
+            if last_error is not None:
+                raise last_error
+            raise
+        account = lease.account
+        tried.append(account.name)
+        response = None
+        streamed = False
+        outcome_recorded = False
+        
+        logger.info(f'🤖 Calling WatsonX ({account.name})...')
+        
+        try:
+            # Get IBM Cloud token for this account
+            access_token = get_ibm_cloud_token(account.api_key)
+            
+            # EXACTLY like your friend's approach
+            response = get_http_client('watsonx').post(
+                account.url,
+                headers=watsonx_headers(access_token),
+                json=request_body,
+                stream=True
+            )
+            if cancel is not None:
+                cancel.bind(response)
+            
+            if response.status_code != 200:
+                logger.error(f'❌ WatsonX error: {response.status_code} ({account.name})')
+                if response.status_code == 429:
+                    lease.throttle(parse_retry_after(response))
+                    outcome_recorded = True
+                elif response.status_code == 401:
+                    # Revoked or expired early: the next call fetches a fresh token
+                    iam_token_manager.invalidate(account.api_key)
+                raise Exception(f'WatsonX API error: {response.status_code}')
+            
+            try:
+                # Incremental decoder: raw bytes in, content deltas out, no re-scanning
+                for content in iter_stream_deltas(response.iter_content(chunk_size=1024)):
+                    if not streamed:
+                        streamed = True
+                        lease.first_token()
+                    yield content
+            except Exception as stream_error:
+                logger.error(f'❌ WatsonX streaming error: {stream_error}')
+                raise Exception(f'WatsonX streaming error: {stream_error}')
+            
+            lease.succeeded()
+            return
+        except Exception as e:
+            if cancel is not None and cancel.cancelled:
+                raise
+            if not outcome_recorded:
+                lease.failed()
+            # Text already sent cannot be retracted; otherwise another account can take over
+            if streamed or len(tried) >= len(watsonx_pool):
+                raise
+            logger.warning(f'⚠️ WatsonX {account.name} failed, trying another account: {e}')
+            last_error = e
+        finally:
+            lease.release()
+            if response is not None:
+                response.close()
+
+def call_watsonx_streaming(request_body: dict, cancel=None) -> str:
+    """Call WatsonX streaming API - EXACTLY like your friend's working approach with FIXED parsing"""
+    try:
+        response_text = ''.join(iter_watsonx_deltas(request_body, cancel))
         
         if not response_text.strip():
             raise Exception('No response from WatsonX')
-
+        
         # Clean up response - remove markdown formatting
         cleaned_text = clean_ai_response(response_text)
         
@@ -245,34 +438,22 @@ def call_watsonx_streaming(request_body: dict) -> str:
         logger.error(f'❌ WatsonX failed: {e}')
         raise
 
-def call_openrouter_api(prompt: str, model: str = "deepseek/deepseek-r1-0528-qwen3-8b:free") -> str:
+def call_openrouter_api(prompt: str, model: str = DEFAULT_OPENROUTER_MODEL) -> str:
     """Call OpenRouter API with DeepSeek model (fallback when WatsonX fails)"""
+    permit = None
     try:
         if not config.OPENROUTER_API_KEY:
             raise Exception("OpenRouter API key not configured")
         
+        # Fails fast with CircuitOpenError while OpenRouter is degraded
+        permit = circuit_breakers.get('openrouter').acquire()
+        
         logger.info(f'🤖 Using OpenRouter DeepSeek (fallback)...')
         
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {config.OPENROUTER_API_KEY}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": config.FRONTEND_URL,
-                "X-Title": "Samadhan AI"
-            },
-            json={
-                "model": model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "max_tokens": 500,
-                "temperature": 0.7
-            },
-            timeout=30
+        response = get_http_client('openrouter').post(
+            OPENROUTER_CHAT_URL,
+            headers=openrouter_headers(),
+            json=openrouter_payload(prompt, model)
         )
         
         if response.status_code != 200:
@@ -282,32 +463,92 @@ def call_openrouter_api(prompt: str, model: str = "deepseek/deepseek-r1-0528-qwe
         data = response.json()
         content = data['choices'][0]['message']['content']
         
+        permit.success()
         logger.info('✅ OpenRouter response generated')
         return content
         
     except Exception as e:
+        if permit is not None:
+            permit.failure()
         logger.error(f'❌ OpenRouter failed: {e}')
         raise
 
-def clean_ai_response(text: str) -> str:
-    """Clean AI response from unwanted formatting and markdown"""
+def iter_openrouter_deltas(prompt: str, model: str = DEFAULT_OPENROUTER_MODEL, cancel=None):
+    """Stream content deltas from OpenRouter (fails fast while the 'openrouter' breaker is open)"""
+    if not config.OPENROUTER_API_KEY:
+        raise Exception("OpenRouter API key not configured")
+    
+    return guarded_stream(circuit_breakers.get('openrouter'), iter_openrouter_stream(prompt, model, cancel), cancel)
+
+def iter_openrouter_stream(prompt: str, model: str, cancel=None):
+    """OpenRouter streaming call (OpenAI-compatible server-sent events)"""
+    logger.info(f'🤖 Streaming from OpenRouter DeepSeek...')
+    
+    response = get_http_client('openrouter').post(
+        OPENROUTER_CHAT_URL,
+        headers=openrouter_headers(),
+        json=openrouter_payload(prompt, model, stream=True),
+        stream=True
+    )
+    if cancel is not None:
+        cancel.bind(response)
+    
+    try:
+        if response.status_code != 200:
+            logger.error(f'❌ OpenRouter error: {response.status_code}')
+            raise Exception(f'OpenRouter API error: {response.status_code}')
+        
+        # OpenRouter uses the same delta format as WatsonX; ': OPENROUTER PROCESSING' keep-alive comments are skipped
+        yield from iter_stream_deltas(response.iter_content(chunk_size=1024))
+    finally:
+        response.close()
+
+# Markdown passes of clean_ai_response in order: (character the match needs, pattern, replacement).
+# Every pass only deletes characters, so a pass whose character is absent from the input never matches.
+_BOLD = ('*', re.compile(r'\*\*(.*?)\*\*'), r'\1')
+_ITALIC = ('*', re.compile(r'\*(.*?)\*'), r'\1')
+_HEADER = ('#', re.compile(r'#{1,6}\s*'), '')
+_CODE_BLOCK = ('`', re.compile(r'```.*?```', re.DOTALL), '')
+_CODE_BLOCK_UNWRAP = ('`', re.compile(r'```(?:json)?(.*?)```', re.DOTALL | re.IGNORECASE), r'\1')
+_INLINE_CODE = ('`', re.compile(r'`(.*?)`'), r'\1')
+_LINK = ('[', re.compile(r'\[(.*?)\]\(.*?\)'), r'\1')
+_MARKDOWN_PASSES = (_BOLD, _ITALIC, _HEADER, _CODE_BLOCK, _INLINE_CODE, _LINK)
+# Code blocks are unwrapped instead of dropped, so a fenced JSON answer survives
+_JSON_MARKDOWN_PASSES = (_BOLD, _ITALIC, _HEADER, _CODE_BLOCK_UNWRAP, _INLINE_CODE, _LINK)
+
+def clean_ai_response(text: str, preserve_json: bool = False) -> str:
+    """Clean AI response from unwanted formatting and markdown
+    
+    Markdown passes run only for the characters present in the text (plain
+    prose skips them all), then whitespace runs collapse to single spaces.
+    preserve_json keeps the contents of code blocks for JSON extraction.
+    """
     if not text:
         return text
     
-    # Remove markdown formatting
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # Remove **bold**
-    text = re.sub(r'\*(.*?)\*', r'\1', text)      # Remove *italic*
-    text = re.sub(r'#{1,6}\s*', '', text)         # Remove headers
-    text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)  # Remove code blocks
-    text = re.sub(r'`(.*?)`', r'\1', text)        # Remove inline code
-    text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)  # Remove links
-    
-    # Remove extra whitespace and newlines
-    text = re.sub(r'\n\s*\n', '\n', text)
-    text = re.sub(r'\s+', ' ', text)
-    text = text.strip()
+    for trigger, pattern, replacement in (_JSON_MARKDOWN_PASSES if preserve_json else _MARKDOWN_PASSES):
+        if trigger in text:
+            text = pattern.sub(replacement, text)
     
-    return text
+    # Same as collapsing blank lines, then every whitespace run, then stripping
+    return ' '.join(text.split())
+
+# LLM analysis categories that are not dataset department names
+CATEGORY_DEPARTMENTS = {
+    'Infrastructure': 'Public Works',
+    'Utilities': 'Water Supply',
+    'WaterSupply': 'Water Supply',
+    'Traffic': 'Traffic Police',
+    'Environment': 'Environment',
+    'Healthcare': 'Healthcare',
+    'Education': 'Education'
+}
+
+def canonical_department(category: str) -> str:
+    """Dataset department for a category, so LLM ('Infrastructure') and local ('Public Works') labels compare"""
+    if get_department_info(category):
+        return category
+    return CATEGORY_DEPARTMENTS.get(category, category)
 
 def get_up_government_info(category: str, district: str = None) -> Dict[str, Any]:
     """Get real UP government information based on category"""
@@ -315,15 +556,7 @@ def get_up_government_info(category: str, district: str = None) -> Dict[str, Any
     
     if not dept_info:
         # Try to map category to department
-        category_mapping = {
-            'Infrastructure': 'Public Works',
-            'Utilities': 'Water Supply',
-            'Traffic': 'Traffic Police',
-            'Environment': 'Environment',
-            'Healthcare': 'Healthcare',
-            'Education': 'Education'
-        }
-        dept_name = category_mapping.get(category, 'Public Works')
+        dept_name = CATEGORY_DEPARTMENTS.get(category, 'Public Works')
         dept_info = get_department_info(dept_name)
     
     info = {
@@ -346,12 +579,74 @@ def get_up_government_info(category: str, district: str = None) -> Dict[str, Any
     
     return info
 
-def analyze_complaint_with_rag(complaint_text: str, language: str = 'en') -> Dict[str, Any]:
-    """Analyze complaint using RAG system trained on comprehensive Samadhan AI dataset"""
-    try:
-        # Try OpenRouter first for analysis
-        if config.OPENROUTER_API_KEY:
-            analysis_prompt = f"""
+# Documents that vote on the department of a complaint: the complaint examples cover six
+# departments, the department descriptions all of them
+VOTING_FILTERS = {'type': ['complaint_example', 'department_info']}
+VOTING_FIELD = 'department'
+# A department with a single description among the votes rarely wins a vote against the
+# examples, so for the others the keyword rules' answer is kept
+EXAMPLE_DEPARTMENTS = frozenset(
+    doc['metadata']['department'] for doc in get_corpus_snapshot().documents_of_type('complaint_example')
+)
+
+def get_embedding_analysis(complaint_text: str, hits, stage: str = None) -> Dict[str, Any]:
+    """Rule-based analysis refined by a similarity-weighted vote of the nearest complaint examples
+    and department descriptions
+    
+    When the keyword rules name a department without complaint examples
+    (Revenue, Agriculture, ...), their answer stands.
+    
+    hits are (document row, score) pairs from local_retriever, best first; stage
+    is the retrieval stage that produced them (lexical, hybrid or dense).
+    confidence is the best BM25 score (lexical) or cosine similarity (dense,
+    hybrid) of a hit in the winning department, not its fused score.
+    """
+    analysis = get_fallback_analysis(complaint_text)
+    if analysis['category'] != 'Other' and analysis['category'] not in EXAMPLE_DEPARTMENTS:
+        return analysis
+    vote = weighted_vote(hits, local_retriever.metadata, VOTING_FIELD)
+    if vote is None:
+        return analysis
+    category, vote_share = vote
+    
+    # Department names as categories, like the keyword rules
+    analysis['category'] = category
+    analysis['department'] = category
+    department_hits = [(row, score) for row, score in hits if local_retriever.metadata[row].get(VOTING_FIELD) == category]
+    if stage == STAGE_HYBRID:
+        # Fused scores only rank the hits; the query embedding is cached, so this does not re-encode
+        scores = local_retriever.similarities(complaint_text, [row for row, _ in department_hits]).tolist()
+    else:
+        scores = [score for _, score in department_hits]
+    analysis['confidence'] = round(float(max(scores)), 4)
+    analysis['vote_share'] = round(vote_share, 3)
+    if stage == STAGE_LEXICAL:
+        analysis['source'] = 'samadhan_ai_bm25'
+    else:
+        source = f"samadhan_ai_{embedding_model.kind.replace('-', '_')}"
+        analysis['source'] = f'{source}_hybrid' if stage == STAGE_HYBRID else source
+    
+    # Add UP government info
+    up_info = get_up_government_info(analysis['category'], analysis['district'])
+    analysis['up_info'] = up_info
+    analysis['timeline'] = up_info['response_time']
+    
+    return analysis
+
+def get_local_analyses(complaint_texts: List[str]) -> List[Dict[str, Any]]:
+    """Retrieval or rule-based analysis for many complaints
+    
+    Complaints settled by BM25 are not embedded; the rest share a single encode call.
+    """
+    if local_retriever is not None:
+        results = local_retriever.search_many(complaint_texts, config.RETRIEVAL_VOTE_K, VOTING_FILTERS)
+        return [get_embedding_analysis(text, hits, stage) for text, (hits, stage) in zip(complaint_texts, results)]
+    
+    return [get_fallback_analysis(text) for text in complaint_texts]
+
+def build_analysis_prompt(complaint_text: str, language: str) -> str:
+    """OpenRouter prompt asking for the complaint analysis as JSON"""
+    return f"""
             You are Samadhan AI, an expert system for UP government complaints trained on comprehensive real data.
             
             Analyze this complaint for Uttar Pradesh CM Helpline 1076:
@@ -371,79 +666,155 @@ def analyze_complaint_with_rag(complaint_text: str, language: str = 'en') -> Dic
             
             Only respond with valid JSON.
             """
-            
+
+def parse_llm_analysis(complaint_text: str, llm_response: str) -> Optional[Dict[str, Any]]:
+    """Analysis dict from the model's JSON answer, or None if it contains no JSON object"""
+    # Clean and try to parse JSON from response (fenced JSON is kept)
+    cleaned_response = clean_ai_response(llm_response, preserve_json=True)
+    json_match = re.search(r'\{.*\}', cleaned_response, re.DOTALL)
+    if not json_match:
+        return None
+    return build_llm_analysis(complaint_text, json.loads(json_match.group()))
+
+def build_llm_analysis(complaint_text: str, parsed: Dict[str, Any], source: str = 'samadhan_ai_rag') -> Dict[str, Any]:
+    """Analysis dict from the fields of a model's JSON answer"""
+    # Get real UP government info
+    category = parsed.get('category', 'Other')
+    # The model answers free text ("if mentioned", "N/A"); keep known districts only
+    district = UP_DISTRICTS.get(str(parsed.get('district') or '').strip().casefold())
+    district = district or keyword_index.scan(complaint_text).district
+    up_info = get_up_government_info(category, district)
+    
+    return {
+        'category': category,
+        'priority': parsed.get('priority', 'medium'),
+        'department': parsed.get('department', 'General Services'),
+        'sentiment': parsed.get('sentiment', 'neutral'),
+        'suggested_response': f"Thank you for your {category.lower()} complaint. We will address it promptly.",
+        'timeline': up_info['response_time'],
+        'confidence': parsed.get('confidence', 0.8),
+        'district': district,
+        'source': source,
+        'up_info': up_info
+    }
+
+COMBINED_PRIORITIES = ('low', 'medium', 'high', 'critical')
+
+def build_combined_prompt(complaint_text: str, language: str, district: Optional[str] = None) -> str:
+    """One prompt asking for the complaint analysis and the citizen reply as a single JSON object
+    
+    The department contacts are listed up front since the category is not known yet.
+    """
+    directory = '\n'.join(
+        f"- {name} | {info.get('contact', 'N/A')} | {info.get('emergency_contact', get_helpline_number('emergency'))} | {info.get('response_time', '3-5 days')}"
+        for name, info in UP_GOVERNMENT_DATASET['departments'].items()
+    )
+    district_line = ''
+    district_info = get_district_info(district) if district else None
+    if district_info:
+        district_line = f"\nDistrict {district}: DM {district_info.get('dm_contact')}, {district_info.get('collectorate')}\n"
+    
+    return f"""You are Samadhan AI, a helpful government assistant for Uttar Pradesh, India.
+
+A citizen submitted this complaint to CM Helpline 1076:
+Complaint: "{complaint_text}"
+Language: {language}
+
+UP government departments (name | contact | emergency | response time):
+{directory}
+{district_line}
+Classify the complaint and write the reply to the citizen. Respond with only this JSON object:
+{{
+    "category": "one department name from the list above, or Other",
+    "priority": "low|medium|high|critical",
+    "sentiment": "positive|neutral|negative",
+    "district": "UP district if mentioned, else null",
+    "reply": "professional, empathetic 2-3 sentence reply in the complaint's language with the department's contact, realistic timeline and the emergency number if urgent; no markdown"
+}}"""
+
+def parse_combined_response(complaint_text: str, llm_response: str) -> Optional[tuple]:
+    """(analysis, reply) from a combined answer, or None if it is malformed or incomplete"""
+    # Raw text: clean_ai_response would drop a JSON object wrapped in a code fence
+    json_match = re.search(r'\{.*\}', llm_response or '', re.DOTALL)
+    if not json_match:
+        return None
+    try:
+        parsed = json.loads(json_match.group())
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(parsed, dict):
+        return None
+    
+    category = parsed.get('category')
+    priority = str(parsed.get('priority') or '').strip().lower()
+    reply = parsed.get('reply')
+    if not isinstance(category, str) or not isinstance(reply, str) or not reply.strip():
+        return None
+    department = canonical_department(category.strip())
+    if priority not in COMBINED_PRIORITIES or not (get_department_info(department) or department == 'Other'):
+        return None
+    
+    parsed.update(category=department, priority=priority,
+                  department=department if department != 'Other' else 'General Services')
+    return build_llm_analysis(complaint_text, parsed, source='samadhan_ai_combined'), clean_ai_response(reply)
+
+def call_combined_providers(prompt: str) -> Optional[str]:
+    """Raw answer to the combined prompt from the first provider that gives one"""
+    if watsonx_pool.accounts:
+        try:
+            return ''.join(iter_watsonx_deltas({
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": 500,
+                "temperature": 0.3
+            }))
+        except Exception as e:
+            logger.warning(f"⚠️ WatsonX combined call failed: {e}")
+    if config.OPENROUTER_API_KEY:
+        try:
+            return call_openrouter_api(prompt)
+        except Exception as e:
+            logger.warning(f"⚠️ OpenRouter combined call failed: {e}")
+    return None
+
+def get_local_analysis(complaint_text: str) -> Dict[str, Any]:
+    """BM25/embedding analysis when the retrieval indexes are built, otherwise rule-based"""
+    if local_retriever is not None:
+        # Only the query is encoded per request (and not at all when BM25 settles it)
+        hits, stage = local_retriever.search(complaint_text, config.RETRIEVAL_VOTE_K, VOTING_FILTERS)
+        return get_embedding_analysis(complaint_text, hits, stage)
+    
+    return get_fallback_analysis(complaint_text)
+
+def analyze_complaint_with_rag(complaint_text: str, language: str = 'en', local_analysis: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Analyze complaint using RAG system trained on comprehensive Samadhan AI dataset
+    
+    local_analysis is a precomputed embedding/rule-based result (see get_local_analyses)
+    used in place of encoding the complaint again when the LLM analysis is unavailable.
+    """
+    try:
+        # Try OpenRouter first for analysis
+        if config.OPENROUTER_API_KEY:
             try:
-                openrouter_response = call_openrouter_api(analysis_prompt)
-                
-                # Clean and try to parse JSON from response
-                cleaned_response = clean_ai_response(openrouter_response)
-                json_match = re.search(r'\{.*\}', cleaned_response, re.DOTALL)
-                if json_match:
-                    parsed = json.loads(json_match.group())
-                    
-                    # Get real UP government info
-                    category = parsed.get('category', 'Other')
-                    district = parsed.get('district')
-                    up_info = get_up_government_info(category, district)
-                    
-                    return {
-                        'category': category,
-                        'priority': parsed.get('priority', 'medium'),
-                        'department': parsed.get('department', 'General Services'),
-                        'sentiment': parsed.get('sentiment', 'neutral'),
-                        'suggested_response': f"Thank you for your {category.lower()} complaint. We will address it promptly.",
-                        'timeline': up_info['response_time'],
-                        'confidence': parsed.get('confidence', 0.8),
-                        'source': 'samadhan_ai_rag',
-                        'up_info': up_info
-                    }
+                openrouter_response = call_openrouter_api(build_analysis_prompt(complaint_text, language))
+                analysis = parse_llm_analysis(complaint_text, openrouter_response)
+                if analysis is not None:
+                    return analysis
             except Exception as e:
                 logger.warning(f"⚠️ OpenRouter analysis failed, using fallback: {e}")
         
-        # Fallback to sentence transformers RAG if available
-        if sentence_model:
-            sample_docs = create_samadhan_ai_rag_documents()
-            doc_texts = [doc.page_content for doc in sample_docs]
-            
-            # Get embeddings
-            complaint_embedding = sentence_model.encode([complaint_text])
-            doc_embeddings = sentence_model.encode(doc_texts)
-            
-            # Find most similar document
-            similarities = np.dot(complaint_embedding, doc_embeddings.T)[0]
-            best_match_idx = np.argmax(similarities)
-            best_doc = sample_docs[best_match_idx]
-            
-            # Use metadata from best match
-            analysis = get_fallback_analysis(complaint_text)
-            analysis['category'] = best_doc.metadata.get('category', analysis['category'])
-            analysis['department'] = best_doc.metadata.get('department', analysis['department'])
-            analysis['confidence'] = float(similarities[best_match_idx])
-            analysis['source'] = 'samadhan_ai_sentence_transformers'
-            
-            # Add UP government info
-            up_info = get_up_government_info(analysis['category'])
-            analysis['up_info'] = up_info
-            analysis['timeline'] = up_info['response_time']
-            
-            return analysis
+        if local_analysis is not None:
+            return local_analysis
         
-        # Final fallback to rule-based analysis
-        return get_fallback_analysis(complaint_text)
+        # Fallback to sentence transformers RAG if available, then rule-based analysis
+        return get_local_analysis(complaint_text)
         
     except Exception as e:
         logger.error(f"❌ RAG analysis error: {e}")
         return get_fallback_analysis(complaint_text)
 
-def generate_ai_response(complaint_text: str, category: str, priority: str, language: str = 'en') -> str:
-    """Generate AI response using available services (WatsonX primary, OpenRouter fallback)"""
-    try:
-        # Get UP government info
-        up_info = get_up_government_info(category)
-        
-        # Try WatsonX streaming first for response generation
-        if config.WATSONX_API_KEY:
-            watson_prompt = f"""You are Samadhan AI, a helpful government assistant for Uttar Pradesh, India.
+def build_watsonx_request(complaint_text: str, category: str, priority: str, language: str, up_info: Dict[str, Any]) -> Dict[str, Any]:
+    """WatsonX request body for the citizen-facing response"""
+    watson_prompt = f"""You are Samadhan AI, a helpful government assistant for Uttar Pradesh, India.
 
 A citizen submitted this complaint to CM Helpline 1076:
 Complaint: "{complaint_text}"
@@ -466,28 +837,21 @@ Provide a professional, empathetic response that:
 
 Keep response concise (2-3 sentences). No markdown formatting."""
 
-            try:
-                # Use your friend's exact request format
-                request_body = {
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": watson_prompt
-                        }
-                    ],
-                    "max_tokens": 300,
-                    "temperature": 0.7
-                }
-                
-                watson_response = call_watsonx_streaming(request_body)
-                logger.info('✅ WatsonX response generated')
-                return watson_response
-            except Exception as e:
-                logger.warning(f"⚠️ WatsonX failed, using OpenRouter fallback: {e}")
-        
-        # Try OpenRouter as fallback
-        if config.OPENROUTER_API_KEY:
-            openrouter_prompt = f"""Generate professional UP government response for Samadhan AI:
+    # Use your friend's exact request format
+    return {
+        "messages": [
+            {
+                "role": "user",
+                "content": watson_prompt
+            }
+        ],
+        "max_tokens": 300,
+        "temperature": 0.7
+    }
+
+def build_openrouter_response_prompt(complaint_text: str, category: str, priority: str, up_info: Dict[str, Any]) -> str:
+    """OpenRouter prompt for the citizen-facing response"""
+    return f"""Generate professional UP government response for Samadhan AI:
 
 Complaint: {complaint_text}
 Category: {category}
@@ -499,10 +863,157 @@ Response Time: {up_info['response_time']}
 
 Professional, empathetic response with real contact info. 2-3 sentences. No markdown."""
 
+# Analyses answered by a provider; local ones (BM25, embeddings, rules) have already run retrieval
+LLM_ANALYSIS_SOURCES = frozenset({'samadhan_ai_rag', 'samadhan_ai_combined'})
+
+def may_encode_for_cache(analysis: Dict[str, Any]) -> bool:
+    """Whether the semantic cache may encode the complaint behind this analysis
+    
+    Retrieval for a local analysis already encoded the complaint if it needed
+    the embedding model; one settled by BM25 (or the rules) is not encoded just
+    for the cache, which then only reuses an embedding that is already cached.
+    """
+    return analysis.get('source') in LLM_ANALYSIS_SOURCES
+
+def get_semantic_cache_embedding(complaint_text: str, encode: bool = True):
+    """Query embedding for the semantic cache, or None when it cannot be used
+    
+    encode=False returns the embedding only if it is already cached.
+    """
+    if not embedding_model or config.SEMANTIC_CACHE_SIZE <= 0:
+        return None
+    if not encode:
+        return query_embeddings.peek(complaint_text)
+    try:
+        return query_embeddings.encode(complaint_text)
+    except Exception as e:
+        logger.warning(f"⚠️ Semantic cache embedding failed: {e}")
+        return None
+
+def lookup_cached_response(complaint_text: str, cache_key: tuple, semantic: bool = True, encode: bool = True):
+    """Cached answer for an exact repeat, else for a close paraphrase in the same scope.
+    
+    Returns (response, hit, embedding): hit describes the cache hit ({'type': 'exact'}
+    or {'type': 'semantic', 'similarity': ...}) and embedding is the query embedding,
+    reused by store_cached_response so the complaint is encoded only once.
+    semantic=False checks exact repeats only (without providers nothing new is
+    ever stored); encode is passed to get_semantic_cache_embedding.
+    """
+    cached_response = response_cache.get(cache_key)
+    if cached_response is not None:
+        logger.info('⚡ Response cache hit')
+        return cached_response, {'type': 'exact'}, None
+    
+    embedding = get_semantic_cache_embedding(complaint_text, encode) if semantic else None
+    if embedding is not None:
+        # Same category, priority, language and district as the cached complaint
+        semantic_hit = semantic_cache.get(embedding, cache_key[1:])
+        if semantic_hit is not None:
+            cached_response, similarity = semantic_hit
+            logger.info(f'⚡ Semantic cache hit (similarity {similarity:.3f})')
+            return cached_response, {'type': 'semantic', 'similarity': round(similarity, 4)}, embedding
+    return None, None, embedding
+
+def store_cached_response(complaint_text: str, cache_key: tuple, response: str, embedding=None, encode: bool = True):
+    """Remember a provider-generated answer in both caches"""
+    if not response:
+        return
+    response_cache.set(cache_key, response)
+    if embedding is None:
+        embedding = get_semantic_cache_embedding(complaint_text, encode)
+    if embedding is not None:
+        semantic_cache.set(embedding, cache_key[1:], response)
+
+def get_generation_providers(complaint_text: str, category: str, priority: str, language: str,
+                             up_info: Dict[str, Any]) -> List[tuple]:
+    """Configured response providers in priority order, as (name, open_stream(cancel=None))"""
+    providers = []
+    if watsonx_pool.accounts:
+        providers.append(('watsonx', lambda cancel=None: iter_watsonx_deltas(
+            build_watsonx_request(complaint_text, category, priority, language, up_info), cancel)))
+    if config.OPENROUTER_API_KEY:
+        providers.append(('openrouter', lambda cancel=None: iter_openrouter_deltas(
+            build_openrouter_response_prompt(complaint_text, category, priority, up_info), cancel=cancel)))
+    return providers
+
+def use_hedged_generation(providers: List[tuple]) -> bool:
+    return config.HEDGE_ENABLED and len(providers) > 1
+
+def generate_ai_response(complaint_text: str, category: str, priority: str, language: str = 'en',
+                         district: Optional[str] = None, use_cache: bool = True, cancel=None,
+                         encode: bool = True) -> str:
+    """Generate AI response using available services (WatsonX primary, OpenRouter fallback)
+    
+    Provider answers are cached by normalised complaint, category, priority,
+    language and district, and reused for paraphrased complaints in the same scope;
+    use_cache=False bypasses the lookup (the fresh answer is still stored).
+    
+    With HEDGE_ENABLED, OpenRouter is started as soon as WatsonX is slow (no token
+    within HEDGE_FIRST_TOKEN_DEADLINE or no answer within HEDGE_DELAY) or fails,
+    and the first complete answer is used.
+    
+    cancel (a hedging.CancelToken) abandons the call: open provider streams are
+    closed, no further provider is tried and nothing is cached.
+    
+    encode=False keeps the semantic cache from encoding the complaint (see
+    may_encode_for_cache).
+    """
+    def cancelled() -> bool:
+        return cancel is not None and cancel.cancelled
+    
+    try:
+        # Get UP government info
+        up_info = get_up_government_info(category, district)
+        providers = get_generation_providers(complaint_text, category, priority, language, up_info)
+        
+        cache_key = response_cache_key(complaint_text, category, priority, language, district)
+        embedding = None
+        if use_cache:
+            cached_response, _, embedding = lookup_cached_response(complaint_text, cache_key, bool(providers), encode)
+            if cached_response is not None:
+                return cached_response
+        
+        if use_hedged_generation(providers):
+            try:
+                winner, parts = None, []
+                for kind, payload in race_providers(providers, config.HEDGE_DELAY,
+                                                    config.HEDGE_FIRST_TOKEN_DEADLINE, race_stats, cancel=cancel):
+                    if kind == 'provider':
+                        winner = payload
+                    else:
+                        parts.append(payload)
+                if cancelled():
+                    return get_category_fallback_response(category, priority, up_info)
+                cleaned_response = clean_ai_response(''.join(parts))
+                logger.info(f'✅ {winner} response generated (hedged)')
+                store_cached_response(complaint_text, cache_key, cleaned_response, embedding, encode)
+                return cleaned_response
+            except ProviderRaceError as e:
+                logger.warning(f"⚠️ {e}")
+            return get_category_fallback_response(category, priority, up_info)
+        
+        # Try WatsonX streaming first for response generation
+        if watsonx_pool.accounts:
+            try:
+                request_body = build_watsonx_request(complaint_text, category, priority, language, up_info)
+                watson_response = call_watsonx_streaming(request_body, cancel)
+                logger.info('✅ WatsonX response generated')
+                store_cached_response(complaint_text, cache_key, watson_response, embedding, encode)
+                return watson_response
+            except Exception as e:
+                if cancelled():
+                    return get_category_fallback_response(category, priority, up_info)
+                logger.warning(f"⚠️ WatsonX failed, using OpenRouter fallback: {e}")
+        
+        # Try OpenRouter as fallback
+        if config.OPENROUTER_API_KEY and not cancelled():
+            openrouter_prompt = build_openrouter_response_prompt(complaint_text, category, priority, up_info)
+
             try:
                 openrouter_response = call_openrouter_api(openrouter_prompt)
                 cleaned_response = clean_ai_response(openrouter_response)
                 logger.info('✅ OpenRouter fallback response generated')
+                store_cached_response(complaint_text, cache_key, cleaned_response, embedding, encode)
                 return cleaned_response
             except Exception as e:
                 logger.warning(f"⚠️ OpenRouter fallback failed: {e}")
@@ -512,21 +1023,188 @@ Professional, empathetic response with real contact info. 2-3 sentences. No mark
         
     except Exception as e:
         logger.error(f"❌ AI response generation error: {e}")
-        up_info = get_up_government_info(category)
+        up_info = get_up_government_info(category, district)
         return get_category_fallback_response(category, priority, up_info)
 
+def stream_ai_response(complaint_text: str, category: str, priority: str, language: str = 'en',
+                       district: Optional[str] = None, use_cache: bool = True, encode: bool = True):
+    """Streaming counterpart of generate_ai_response.
+    
+    Yields ('delta', text) as provider tokens arrive and ('provider', name) when a
+    provider starts answering. If a provider fails after it has already streamed
+    text, ('reset', name) tells the consumer to discard the partial answer before
+    the next tier takes over. Cache hits yield ('cache', hit) followed by the
+    cached answer as a single delta.
+    """
+    up_info = get_up_government_info(category, district)
+    providers = get_generation_providers(complaint_text, category, priority, language, up_info)
+    
+    cache_key = response_cache_key(complaint_text, category, priority, language, district)
+    embedding = None
+    if use_cache:
+        cached_response, cache_hit, embedding = lookup_cached_response(complaint_text, cache_key, bool(providers), encode)
+        if cached_response is not None:
+            yield 'cache', cache_hit
+            yield 'provider', 'cache'
+            yield 'delta', cached_response
+            return
+    
+    if use_hedged_generation(providers):
+        # The first provider to produce a token wins the race and streams the answer
+        winner, parts = None, []
+        try:
+            for kind, payload in race_providers(providers, config.HEDGE_DELAY, config.HEDGE_FIRST_TOKEN_DEADLINE,
+                                                race_stats, commit_on_first_token=True):
+                if kind == 'provider':
+                    winner = payload
+                else:
+                    parts.append(payload)
+                yield kind, payload
+            logger.info(f'✅ {winner} response streamed (hedged)')
+            store_cached_response(complaint_text, cache_key, clean_ai_response(''.join(parts)), embedding, encode)
+            return
+        except ProviderRaceError as e:
+            logger.warning(f"⚠️ {e}")
+        except Exception as e:
+            # The winner failed mid-answer; the other providers were already cancelled
+            logger.warning(f"⚠️ {winner} streaming failed: {e}")
+            yield 'reset', winner
+        providers = []
+    
+    for name, open_stream in providers:
+        streamed = False
+        parts = []
+        try:
+            for content in open_stream():
+                if not streamed:
+                    streamed = True
+                    yield 'provider', name
+                parts.append(content)
+                yield 'delta', content
+            if streamed:
+                logger.info(f'✅ {name} response streamed')
+                store_cached_response(complaint_text, cache_key, clean_ai_response(''.join(parts)), embedding, encode)
+                return
+            logger.warning(f"⚠️ {name} returned an empty stream")
+        except Exception as e:
+            logger.warning(f"⚠️ {name} streaming failed: {e}")
+            if streamed:
+                yield 'reset', name
+    
+    # Final fallback to category-based response with real UP data
+    yield 'provider', 'dataset_template'
+    yield 'delta', get_category_fallback_response(category, priority, up_info)
+
+def same_generation_inputs(speculative: Dict[str, Any], analysis: Dict[str, Any]) -> bool:
+    """Whether a response generated for speculative also answers analysis"""
+    return (canonical_department(speculative['category']) == canonical_department(analysis['category'])
+            and speculative['priority'] == analysis['priority']
+            and speculative.get('district') == analysis.get('district'))
+
+def record_pipeline_outcome(outcome: str):
+    with pipeline_stats_lock:
+        pipeline_stats[outcome] += 1
+
+def combined_cache_key(complaint_text: str, language: str, district: Optional[str]) -> tuple:
+    """Response cache key of a combined (analysis, reply) answer; category and priority come with the answer"""
+    return ('combined', normalize_complaint_text(complaint_text), language, district)
+
+def lookup_combined_response(complaint_text: str, language: str, district: Optional[str]) -> Optional[tuple]:
+    """Cached (analysis, reply) of an exact repeat in combined mode"""
+    cached = response_cache.get(combined_cache_key(complaint_text, language, district))
+    if cached is None:
+        return None
+    logger.info('⚡ Combined response cache hit')
+    analysis, reply = cached
+    # Callers annotate the analysis (e.g. the batch endpoint); keep the cached one intact
+    return dict(analysis), reply
+
+def store_combined_response(complaint_text: str, language: str, district: Optional[str], analysis: Dict[str, Any], reply: str):
+    """Remember a combined answer, and its reply for the two-call path under the answer's category"""
+    response_cache.set(combined_cache_key(complaint_text, language, district), (dict(analysis), reply))
+    store_cached_response(complaint_text, response_cache_key(
+        complaint_text, analysis['category'], analysis['priority'], language, analysis.get('district')), reply)
+
+def analyze_and_respond_combined(complaint_text: str, language: str = 'en', use_cache: bool = True) -> Optional[tuple]:
+    """(analysis, ai_response) from a single combined provider call, or None to use the two-call path
+    
+    An exact repeat is answered from the response cache; use_cache=False skips
+    the lookup and does not store the answer.
+    """
+    district = keyword_index.scan(complaint_text).district
+    if use_cache:
+        cached = lookup_combined_response(complaint_text, language, district)
+        if cached is not None:
+            return cached
+    llm_response = call_combined_providers(build_combined_prompt(complaint_text, language, district))
+    result = parse_combined_response(complaint_text, llm_response) if llm_response else None
+    if result is None:
+        logger.warning('⚠️ Combined answer missing or malformed, using separate analysis and response calls')
+        record_pipeline_outcome('combined_fallback')
+        return None
+    
+    analysis, reply = result
+    record_pipeline_outcome('combined')
+    if use_cache:
+        store_combined_response(complaint_text, language, district, analysis, reply)
+    return analysis, reply
+
+def analyze_and_generate(complaint_text: str, language: str = 'en', use_cache: bool = True,
+                         local_analysis: Dict[str, Any] = None) -> tuple:
+    """(analysis, ai_response) for a complaint
+    
+    With COMBINED_PROMPT_ENABLED the provider is first asked for both in one
+    call (see analyze_and_respond_combined); a malformed answer falls back to
+    the two-call path below. With PIPELINE_ENABLED and an LLM analysis configured, generation starts
+    right away from the local (embedding or rule-based) classification while
+    the LLM analysis runs. The speculative response is kept when the LLM
+    agrees on department, priority and district; otherwise the speculative
+    call is cancelled and the response is generated again for the LLM's answer.
+    """
+    if config.COMBINED_PROMPT_ENABLED:
+        combined = analyze_and_respond_combined(complaint_text, language, use_cache)
+        if combined is not None:
+            return combined
+    
+    if not (config.PIPELINE_ENABLED and config.OPENROUTER_API_KEY):
+        analysis = analyze_complaint_with_rag(complaint_text, language, local_analysis)
+        return analysis, generate_ai_response(complaint_text, analysis['category'], analysis['priority'],
+                                              language, analysis.get('district'), use_cache=use_cache,
+                                              encode=may_encode_for_cache(analysis))
+    
+    if local_analysis is None:
+        try:
+            local_analysis = get_local_analysis(complaint_text)
+        except Exception as e:
+            logger.error(f"❌ Local analysis error: {e}")
+            local_analysis = get_fallback_analysis(complaint_text)
+    
+    speculative_cancel = CancelToken()
+    speculative = pipeline_executor.submit(
+        generate_ai_response, complaint_text, local_analysis['category'], local_analysis['priority'],
+        language, local_analysis.get('district'), use_cache, speculative_cancel, may_encode_for_cache(local_analysis)
+    )
+    analysis = analyze_complaint_with_rag(complaint_text, language, local_analysis)
+    
+    if same_generation_inputs(local_analysis, analysis):
+        record_pipeline_outcome('reused')
+        return analysis, speculative.result()
+    
+    logger.info(f"🔀 LLM analysis disagrees with local ({local_analysis['category']}/{local_analysis['priority']} "
+                f"-> {analysis['category']}/{analysis['priority']}), regenerating")
+    record_pipeline_outcome('regenerated')
+    # Closes the speculative provider stream (Future.cancel cannot stop a running call)
+    speculative_cancel.cancel()
+    return analysis, generate_ai_response(complaint_text, analysis['category'], analysis['priority'],
+                                          language, analysis.get('district'), use_cache=use_cache,
+                                          encode=may_encode_for_cache(analysis))
+
 def get_fallback_analysis(complaint_text: str) -> Dict[str, Any]:
     """Enhanced rule-based analysis with comprehensive Samadhan AI dataset"""
-    text = complaint_text.lower()
+    # Single pass over the text collects category, priority and sentiment keyword hits
+    hits = keyword_index.scan(complaint_text)
     
-    # Use comprehensive Samadhan AI dataset for better categorization
-    priority_keywords = get_priority_keywords()
-    
-    category_scores = {}
-    for dept_name, dept_info in SAMADHAN_AI_COMPLETE_DATASET['government_data']['departments'].items():
-        score = sum(1 for keyword in dept_info['priority_keywords'] if keyword in text)
-        if score > 0:
-            category_scores[dept_name] = score
+    category_scores = hits.category_scores(keyword_index.categories)
     
     if category_scores:
         category = max(category_scores, key=category_scores.get)
@@ -537,26 +1215,16 @@ def get_fallback_analysis(complaint_text: str) -> Dict[str, Any]:
     
     # Priority detection using comprehensive keywords
     priority = 'medium'  # default
+    category_key = category.lower().replace(' ', '_')
     for p in ['critical', 'high', 'low']:
-        if any(keyword in text for keyword in priority_keywords[p]['general']):
+        if (p, 'general') in hits.priority_groups or (p, category_key) in hits.priority_groups:
             priority = p
             break
-        # Check category-specific keywords
-        category_key = category.lower().replace(' ', '_')
-        if category_key in priority_keywords[p]:
-            if any(keyword in text for keyword in priority_keywords[p][category_key]):
-                priority = p
-                break
     
     # Sentiment analysis
-    sentiment_keywords = {
-        'negative': ['angry', 'frustrated', 'terrible', 'worst', 'horrible', 'disgusted', 'furious', 'outraged', 'disappointed'],
-        'positive': ['thank', 'appreciate', 'good', 'excellent', 'satisfied', 'happy', 'pleased', 'grateful']
-    }
-    
     sentiment = 'neutral'
-    neg_score = sum(1 for word in sentiment_keywords['negative'] if word in text)
-    pos_score = sum(1 for word in sentiment_keywords['positive'] if word in text)
+    neg_score = hits.sentiment_score('negative')
+    pos_score = hits.sentiment_score('positive')
     
     if neg_score > pos_score:
         sentiment = 'negative'
@@ -564,7 +1232,8 @@ def get_fallback_analysis(complaint_text: str) -> Dict[str, Any]:
         sentiment = 'positive'
     
     # Get UP government info
-    up_info = get_up_government_info(category)
+    district = hits.district
+    up_info = get_up_government_info(category, district)
     
     return {
         'category': category,
@@ -573,6 +1242,7 @@ def get_fallback_analysis(complaint_text: str) -> Dict[str, Any]:
         'sentiment': sentiment,
         'timeline': up_info['response_time'],
         'confidence': 0.7,
+        'district': district,
         'source': 'samadhan_ai_rule_based',
         'up_info': up_info,
         'suggested_response': f'Thank you for your {category.lower()} complaint. Contact {department} at {up_info["contact"]} or emergency {up_info["emergency"]}. Response time: {up_info["response_time"]}.'
@@ -595,6 +1265,51 @@ def get_category_fallback_response(category: str, priority: str = 'medium', up_i
     
     return base_response
 
+def analyze_complaints_batch(items: List[Any], default_language: str = 'en', use_cache: bool = True) -> List[Dict[str, Any]]:
+    """Analyze and respond to many complaints.
+    
+    Local classification runs once for the whole batch; only the LLM analysis
+    and response generation fan out, bounded by BATCH_MAX_CONCURRENCY.
+    Items are complaint strings or {"complaint": ..., "language": ...} objects.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            item = {'complaint': item}
+        complaint_text = item.get('complaint') if isinstance(item, dict) else None
+        if not complaint_text or not isinstance(complaint_text, str):
+            results[index] = {'index': index, 'error': 'Complaint text is required'}
+        else:
+            valid.append((index, complaint_text, item.get('language', default_language)))
+    
+    if not valid:
+        return results
+    
+    try:
+        local_analyses = get_local_analyses([text for _, text, _ in valid])
+    except Exception as e:
+        logger.error(f"❌ Batch local analysis error: {e}")
+        local_analyses = [get_fallback_analysis(text) for _, text, _ in valid]
+    
+    def process(position: int) -> Dict[str, Any]:
+        index, complaint_text, language = valid[position]
+        try:
+            analysis, ai_response = analyze_and_generate(complaint_text, language, use_cache, local_analyses[position])
+            analysis['ai_response'] = ai_response
+            analysis['index'] = index
+            analysis['language'] = language
+            return analysis
+        except Exception as e:
+            logger.error(f"❌ Batch item {index} failed: {e}")
+            return {'index': index, 'error': str(e)}
+    
+    with ThreadPoolExecutor(max_workers=min(config.BATCH_MAX_CONCURRENCY, len(valid))) as executor:
+        for position, result in enumerate(executor.map(process, range(len(valid)))):
+            results[valid[position][0]] = result
+    
+    return results
+
 # Routes
 @app.route('/', methods=['GET'])
 def root():
@@ -607,12 +1322,12 @@ def root():
         'project': SAMADHAN_AI_COMPLETE_DATASET['project_info'],
         'dataset_statistics': dataset_stats,
         'ai_services': {
-            'watson_x_streaming': bool(config.WATSONX_API_KEY),
+            'watson_x_streaming': bool(watsonx_pool.accounts),
             'openrouter_deepseek_fallback': bool(config.OPENROUTER_API_KEY),
-            'rag_system': SENTENCE_TRANSFORMERS_AVAILABLE,
+            'rag_system': bool(embedding_model),
             'comprehensive_dataset': 'loaded'
         },
-        'endpoints': ['/health', '/api/ai/chat', '/api/ai/analyze', '/api/up/data', '/api/dataset/stats'],
+        'endpoints': ['/health', '/api/ai/chat', '/api/ai/chat/stream', '/api/ai/analyze', '/api/ai/analyze/batch', '/api/ai/similar', '/api/up/data', '/api/dataset/stats'],
         'timestamp': datetime.now().isoformat()
     })
 
@@ -626,28 +1341,53 @@ def health_check():
         'samadhan_ai': {
             'version': '3.0.0',
             'dataset': 'comprehensive',
-            'rag_trained': bool(sentence_model),
+            'rag_trained': bool(embedding_model),
+            'embedding_backend': embedding_model.name if embedding_model else None,
             'dataset_stats': dataset_stats
         },
         'watsonx': {
-            'configured': bool(config.WATSONX_API_KEY),
-            'streaming_ready': True
+            'configured': bool(watsonx_pool.accounts),
+            'streaming_ready': True,
+            'accounts': watsonx_pool.status()
         },
         'openrouter': {
             'configured': bool(config.OPENROUTER_API_KEY),
             'fallback_ready': True
-        }
+        },
+        'circuit_breakers': circuit_breakers.status(),
+        'response_cache': response_cache.stats(),
+        'semantic_cache': semantic_cache.stats(),
+        'query_embedding_cache': query_embeddings.stats() if query_embeddings is not None else None,
+        'local_retrieval': local_retriever.stats() if local_retriever else None,
+        'startup': {'initialized': runtime_initialized, 'phases_seconds': startup_timings},
+        'static_responses': static_responses.stats(),
+        'provider_race': {
+            'enabled': config.HEDGE_ENABLED,
+            'hedge_delay_seconds': config.HEDGE_DELAY,
+            'first_token_deadline_seconds': config.HEDGE_FIRST_TOKEN_DEADLINE,
+            **race_stats.stats()
+        },
+        'pipeline': {'enabled': config.PIPELINE_ENABLED, 'combined_prompt': config.COMBINED_PROMPT_ENABLED, **pipeline_stats}
     })
 
+def static_json_response(name: str) -> Response:
+    """Precomputed JSON payload: 304 if the client's ETag is current, else the bytes in the best accepted encoding"""
+    status, body, headers = static_responses.get(name).negotiate(
+        request.headers.get('Accept-Encoding'), request.headers.get('If-None-Match')
+    )
+    headers['Cache-Control'] = (f'public, max-age={config.STATIC_RESPONSE_MAX_AGE}'
+                                if config.STATIC_RESPONSE_MAX_AGE > 0 else 'no-cache')
+    return Response(body, status=status, headers=headers, mimetype='application/json')
+
 @app.route('/api/up/data', methods=['GET'])
 def get_up_data():
     """Get comprehensive Samadhan AI UP Government dataset"""
-    return jsonify(get_complete_dataset())
+    return static_json_response('up_data')
 
 @app.route('/api/dataset/stats', methods=['GET'])
 def get_dataset_statistics():
     """Get dataset statistics"""
-    return jsonify(get_dataset_stats())
+    return static_json_response('dataset_stats')
 
 @app.route('/api/ai/chat', methods=['POST'])
 def ai_chat():
@@ -656,22 +1396,15 @@ def ai_chat():
         data = request.get_json()
         message = data.get('message')
         language = data.get('language', 'en')
+        use_cache = data.get('cache', True) is not False
         
         if not message:
             return jsonify({'error': 'Message is required'}), 400
 
         logger.info(f'💬 Samadhan AI processing: {message[:50]}...')
         
-        # Analyze with comprehensive RAG system
-        analysis = analyze_complaint_with_rag(message, language)
-        
-        # Generate response
-        ai_response = generate_ai_response(
-            message, 
-            analysis['category'], 
-            analysis['priority'], 
-            language
-        )
+        # Analyze with comprehensive RAG system and generate the response (overlapped)
+        analysis, ai_response = analyze_and_generate(message, language, use_cache)
         
         logger.info('✅ Samadhan AI response ready')
         
@@ -691,6 +1424,76 @@ def ai_chat():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+def format_sse_event(event: str, data: Any) -> str:
+    """Serialise one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/api/ai/chat/stream', methods=['POST'])
+def ai_chat_stream():
+    """Streaming variant of /api/ai/chat (server-sent events).
+    
+    Events: 'analysis' (the complaint analysis), 'cache' (cache hit type and
+    similarity), 'provider', 'delta' (response tokens), 'reset' (discard partial
+    text, another provider follows) and 'done' with the cleaned full response.
+    Errors are reported as an 'error' event.
+    """
+    data = request.get_json(silent=True) or {}
+    message = data.get('message')
+    language = data.get('language', 'en')
+    use_cache = data.get('cache', True) is not False
+    
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+    
+    logger.info(f'💬 Samadhan AI streaming: {message[:50]}...')
+    
+    def events():
+        try:
+            analysis = analyze_complaint_with_rag(message, language)
+            yield format_sse_event('analysis', analysis)
+            
+            parts = []
+            provider = None
+            cache_hit = None
+            for kind, payload in stream_ai_response(message, analysis['category'], analysis['priority'],
+                                                  language, analysis.get('district'), use_cache,
+                                                  may_encode_for_cache(analysis)):
+                if kind == 'delta':
+                    parts.append(payload)
+                    yield format_sse_event('delta', {'content': payload})
+                elif kind == 'provider':
+                    provider = payload
+                    yield format_sse_event('provider', {'provider': payload})
+                elif kind == 'reset':
+                    parts = []
+                    yield format_sse_event('reset', {'provider': payload})
+                elif kind == 'cache':
+                    cache_hit = payload
+                    yield format_sse_event('cache', payload)
+            
+            logger.info('✅ Samadhan AI stream complete')
+            
+            yield format_sse_event('done', {
+                'response': clean_ai_response(''.join(parts)),
+                'provider': provider,
+                'cache': cache_hit,
+                'timestamp': datetime.now().isoformat(),
+                'language': language,
+                'system': 'samadhan_ai_comprehensive'
+            })
+        except Exception as e:
+            logger.error(f'❌ Samadhan AI stream error: {e}')
+            yield format_sse_event('error', {
+                'error': str(e),
+                'response': f'I apologize for the error. Please contact CM Helpline {get_helpline_number("cm_helpline")} for immediate assistance.'
+            })
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/ai/analyze', methods=['POST'])
 def ai_analyze():
     """AI analysis endpoint with comprehensive Samadhan AI RAG"""
@@ -698,22 +1501,15 @@ def ai_analyze():
         data = request.get_json()
         complaint_text = data.get('complaint')
         language = data.get('language', 'en')
+        use_cache = data.get('cache', True) is not False
         
         if not complaint_text:
             return jsonify({'error': 'Complaint text is required'}), 400
 
         logger.info(f'🔍 Samadhan AI analyzing: {complaint_text[:50]}...')
         
-        # Analyze with comprehensive RAG system
-        analysis = analyze_complaint_with_rag(complaint_text, language)
-        
-        # Generate response
-        ai_response = generate_ai_response(
-            complaint_text,
-            analysis['category'],
-            analysis['priority'],
-            language
-        )
+        # Analyze with comprehensive RAG system and generate the response (overlapped)
+        analysis, ai_response = analyze_and_generate(complaint_text, language, use_cache)
         
         # Add response to analysis
         analysis['ai_response'] = ai_response
@@ -731,12 +1527,93 @@ def ai_analyze():
             'fallback_analysis': get_fallback_analysis(complaint_text)
         }), 500
 
+@app.route('/api/ai/analyze/batch', methods=['POST'])
+def ai_analyze_batch():
+    """Batch analysis endpoint for bursts of complaints (e.g. 1076 call centre intake)"""
+    try:
+        data = request.get_json() or {}
+        complaints = data.get('complaints')
+        language = data.get('language', 'en')
+        use_cache = data.get('cache', True) is not False
+        
+        if not isinstance(complaints, list) or not complaints:
+            return jsonify({'error': 'Complaints array is required'}), 400
+        
+        if len(complaints) > config.BATCH_MAX_ITEMS:
+            return jsonify({'error': f'At most {config.BATCH_MAX_ITEMS} complaints per batch'}), 400
+        
+        logger.info(f'📦 Samadhan AI batch analyzing {len(complaints)} complaints...')
+        
+        # Batch-level language applies to items that do not set their own
+        results = analyze_complaints_batch(complaints, language, use_cache)
+        failed = sum(1 for result in results if 'error' in result)
+        
+        logger.info(f'✅ Samadhan AI batch complete ({len(results) - failed} ok, {failed} failed)')
+        
+        return jsonify({
+            'results': results,
+            'total': len(results),
+            'succeeded': len(results) - failed,
+            'failed': failed,
+            'timestamp': datetime.now().isoformat(),
+            'system': 'samadhan_ai_comprehensive'
+        })
+        
+    except Exception as e:
+        logger.error(f'❌ Samadhan AI batch error: {e}')
+        return jsonify({'error': str(e)}), 500
+
+# Metadata fields /api/ai/similar can filter on
+SIMILAR_FILTER_FIELDS = ('type', 'category', 'department', 'district')
+
+@app.route('/api/ai/similar', methods=['POST'])
+def ai_similar():
+    """Most similar corpus documents (complaint examples, departments, districts...) with real similarity scores"""
+    try:
+        data = request.get_json(silent=True) or {}
+        query = data.get('complaint') or data.get('query')
+        filters = data.get('filters') or {}
+        
+        if not query or not isinstance(query, str):
+            return jsonify({'error': 'Complaint text is required'}), 400
+        try:
+            k = int(data.get('k', 5))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'k must be an integer'}), 400
+        if not 1 <= k <= config.SIMILAR_MAX_K:
+            return jsonify({'error': f'k must be between 1 and {config.SIMILAR_MAX_K}'}), 400
+        if not isinstance(filters, dict) or set(filters) - set(SIMILAR_FILTER_FIELDS):
+            return jsonify({'error': f'filters may only use {", ".join(SIMILAR_FILTER_FIELDS)}'}), 400
+        
+        if not embedding_model or retrieval_index is None:
+            return jsonify({'error': 'Similarity search needs an embedding backend'}), 503
+        
+        hits = retrieval_index.search(query_embeddings.encode(query), k, filters)
+        
+        return jsonify({
+            'query': query,
+            'results': [
+                {
+                    'content': rag_documents[row].page_content,
+                    'metadata': rag_documents[row].metadata,
+                    'similarity_score': round(score, 4)
+                }
+                for row, score in hits
+            ],
+            'backend': retrieval_index.backend,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f'❌ Similarity search error: {e}')
+        return jsonify({'error': str(e)}), 500
+
 # Legacy endpoints (for backward compatibility)
 @app.route('/api/watsonx/test', methods=['GET'])
 def test_watsonx():
     """Test WatsonX streaming connection"""
     try:
-        if not config.WATSONX_API_KEY:
+        if not watsonx_pool.accounts:
             return jsonify({
                 'success': False,
                 'error': 'WatsonX API key not configured'
@@ -792,11 +1669,14 @@ if __name__ == '__main__':
     logger.info(f'📞 Helplines: {dataset_stats["helplines"]}')
     logger.info(f'🏙️ Districts: {dataset_stats["districts"]}')
     logger.info(f'💬 Complaint Patterns: {dataset_stats["complaint_patterns"]}')
-    logger.info(f'🔧 WatsonX: {"✅ Ready" if config.WATSONX_API_KEY else "❌ Not configured"}')
+    logger.info(f'🔧 WatsonX: {f"✅ Ready ({len(watsonx_pool)} account(s))" if watsonx_pool.accounts else "❌ Not configured"}')
     logger.info(f'🔧 OpenRouter: {"✅ Ready" if config.OPENROUTER_API_KEY else "❌ Not configured"}')
     
-    # Initialize RAG system
-    initialize_sentence_transformers()
+    # Initialize and warm the RAG system
+    initialize_runtime()
+    
+    # Open provider connections before the first complaint arrives
+    prewarm_http_clients()
     
     logger.info('AI ready ')
     
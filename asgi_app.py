@@ -0,0 +1,567 @@
+"""
+ASGI serving mode for Samadhan AI
+Starlette app whose IAM, WatsonX and OpenRouter calls are non-blocking (httpx),
+so one process holds hundreds of complaints in flight; embedding and rule
+classification run in a bounded thread pool
+
+Run: uvicorn asgi_app:asgi_app --host 0.0.0.0 --port 5000
+The Flask app (app.py) is unchanged and still served by gunicorn.
+"""
+
+import time
+import asyncio
+import logging
+import contextlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import app as samadhan
+from config import config
+from sse import SSEDecoder, event_deltas
+from token_manager import AsyncIAMTokenManager
+from watsonx_pool import NoWatsonXAccountAvailable
+from hedging import ProviderRaceError
+from response_cache import response_cache_key
+from samadhan_dataset.load_dataset import get_helpline_number
+
+logger = logging.getLogger(__name__)
+
+# Embedding, classification and cache lookups; bounded so CPU work cannot swamp the process
+cpu_executor = ThreadPoolExecutor(max_workers=config.ASGI_CPU_WORKERS, thread_name_prefix='samadhan-cpu')
+
+# One AsyncClient per provider, created at startup
+http_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+async def run_cpu(func: Callable, *args):
+    """Run blocking CPU work in the bounded pool"""
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, func, *args)
+
+
+def create_http_clients() -> Dict[str, httpx.AsyncClient]:
+    limits = httpx.Limits(max_connections=config.ASGI_MAX_CONNECTIONS,
+                          max_keepalive_connections=config.HTTP_POOL_SIZE)
+    return {
+        'ibm_iam': httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(
+            config.IAM_READ_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT)),
+        'watsonx': httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(
+            config.WATSONX_READ_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT)),
+        'openrouter': httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(
+            config.OPENROUTER_READ_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT))
+    }
+
+
+async def request_ibm_cloud_token(api_key: str) -> Tuple[str, float]:
+    logger.info('🔄 Getting IBM Cloud token...')
+    response = await http_clients['ibm_iam'].post(
+        samadhan.IAM_TOKEN_URL,
+        headers=samadhan.IAM_TOKEN_HEADERS,
+        content=samadhan.iam_token_request_body(api_key)
+    )
+    return samadhan.parse_iam_token_response(response.status_code,
+                                             response.json() if response.status_code == 200 else None)
+
+
+iam_tokens = AsyncIAMTokenManager(request_ibm_cloud_token)
+
+
+async def iter_response_deltas(response: httpx.Response) -> AsyncIterator[str]:
+    """Content deltas from a streaming chat completion response until [DONE]"""
+    decoder = SSEDecoder()
+    async for chunk in response.aiter_bytes():
+        for event in decoder.feed(chunk):
+            deltas = event_deltas(event.data)
+            if deltas is None:
+                return
+            for content in deltas:
+                yield content
+    for event in decoder.flush():
+        deltas = event_deltas(event.data)
+        if deltas is None:
+            return
+        for content in deltas:
+            yield content
+
+
+async def acquire_watsonx_account(exclude: tuple):
+    """Lease a pool account without blocking the event loop"""
+    deadline = time.monotonic() + config.WATSONX_ACQUIRE_TIMEOUT
+    while True:
+        try:
+            return samadhan.watsonx_pool.acquire(exclude, timeout=0)
+        except NoWatsonXAccountAvailable:
+            if time.monotonic() >= deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def iter_watsonx_deltas(request_body: dict) -> AsyncIterator[str]:
+    """Async WatsonX stream with the same breakers, account pool and failover as app.iter_watsonx_deltas"""
+    if not samadhan.watsonx_pool.accounts:
+        raise Exception("WatsonX API key not configured")
+
+    permit = samadhan.circuit_breakers.get('watsonx').acquire()
+    tried: List[str] = []
+    last_error: Optional[Exception] = None
+    try:
+        while True:
+            try:
+                lease = await acquire_watsonx_account(tuple(tried))
+            except NoWatsonXAccountAvailable:
+                if last_error is not None:
+                    raise last_error
+                raise
+            account = lease.account
+            tried.append(account.name)
+            streamed = False
+            outcome_recorded = False
+            logger.info(f'🤖 Calling WatsonX ({account.name})...')
+            try:
+                access_token = await iam_tokens.get_token(account.api_key)
+                async with http_clients['watsonx'].stream(
+                    'POST', account.url, headers=samadhan.watsonx_headers(access_token), json=request_body
+                ) as response:
+                    if response.status_code != 200:
+                        logger.error(f'❌ WatsonX error: {response.status_code} ({account.name})')
+                        if response.status_code == 429:
+                            lease.throttle(samadhan.parse_retry_after(response))
+                            outcome_recorded = True
+                        elif response.status_code == 401:
+                            iam_tokens.invalidate(account.api_key)
+                        raise Exception(f'WatsonX API error: {response.status_code}')
+
+                    async for content in iter_response_deltas(response):
+                        if not streamed:
+                            streamed = True
+                            lease.first_token()
+                            permit.first_token()
+                        yield content
+                lease.succeeded()
+                permit.success()
+                return
+            except Exception as e:
+                if not outcome_recorded:
+                    lease.failed()
+                if streamed or len(tried) >= len(samadhan.watsonx_pool):
+                    raise
+                logger.warning(f'⚠️ WatsonX {account.name} failed, trying another account: {e}')
+                last_error = e
+            finally:
+                lease.release()
+    except Exception as e:
+        # Running out of free accounts is not held against WatsonX itself
+        if not isinstance(e, NoWatsonXAccountAvailable):
+            permit.failure()
+        raise
+    finally:
+        permit.release()
+
+
+async def iter_openrouter_deltas(prompt: str, model: str = samadhan.DEFAULT_OPENROUTER_MODEL) -> AsyncIterator[str]:
+    if not config.OPENROUTER_API_KEY:
+        raise Exception("OpenRouter API key not configured")
+
+    permit = samadhan.circuit_breakers.get('openrouter').acquire()
+    logger.info('🤖 Streaming from OpenRouter DeepSeek...')
+    try:
+        async with http_clients['openrouter'].stream(
+            'POST', samadhan.OPENROUTER_CHAT_URL,
+            headers=samadhan.openrouter_headers(), json=samadhan.openrouter_payload(prompt, model, stream=True)
+        ) as response:
+            if response.status_code != 200:
+                logger.error(f'❌ OpenRouter error: {response.status_code}')
+                raise Exception(f'OpenRouter API error: {response.status_code}')
+            started = False
+            async for content in iter_response_deltas(response):
+                if not started:
+                    started = True
+                    permit.first_token()
+                yield content
+        permit.success()
+    except Exception:
+        permit.failure()
+        raise
+    finally:
+        permit.release()
+
+
+async def call_openrouter_api(prompt: str, model: str = samadhan.DEFAULT_OPENROUTER_MODEL) -> str:
+    if not config.OPENROUTER_API_KEY:
+        raise Exception("OpenRouter API key not configured")
+
+    permit = samadhan.circuit_breakers.get('openrouter').acquire()
+    try:
+        response = await http_clients['openrouter'].post(
+            samadhan.OPENROUTER_CHAT_URL, headers=samadhan.openrouter_headers(),
+            json=samadhan.openrouter_payload(prompt, model)
+        )
+        if response.status_code != 200:
+            logger.error(f'❌ OpenRouter error: {response.status_code}')
+            raise Exception(f'OpenRouter API error: {response.status_code}')
+        content = response.json()['choices'][0]['message']['content']
+        permit.success()
+        return content
+    except Exception:
+        permit.failure()
+        raise
+    finally:
+        permit.release()
+
+
+class _AsyncRunner:
+    """One provider call in a hedged race"""
+
+    def __init__(self, name: str, open_stream: Callable[[], AsyncIterator[str]]):
+        self.name = name
+        self.started_at = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.task = asyncio.create_task(self._collect(open_stream))
+
+    async def _collect(self, open_stream) -> str:
+        parts = []
+        async for content in open_stream():
+            if self.first_token_at is None:
+                self.first_token_at = time.monotonic()
+                samadhan.race_stats.record_first_token(self.name, self.first_token_at - self.started_at)
+            parts.append(content)
+        if not parts:
+            raise Exception(f'{self.name} returned an empty answer')
+        return ''.join(parts)
+
+
+async def race_providers(providers: List[Tuple[str, Callable[[], AsyncIterator[str]]]]) -> Tuple[str, str]:
+    """asyncio version of hedging.race_providers (first complete answer wins): (provider, text)"""
+    stats = samadhan.race_stats
+    stats.record_race()
+    pending = list(providers)
+    runners: List[_AsyncRunner] = []
+    errors: Dict[str, BaseException] = {}
+
+    def launch(reason: Optional[str] = None):
+        name, open_stream = pending.pop(0)
+        if reason:
+            stats.record_hedge(reason)
+            logger.info(f'🏁 Hedging to {name} ({reason})')
+        stats.record_start(name)
+        runners.append(_AsyncRunner(name, open_stream))
+
+    def next_hedge() -> Optional[Tuple[float, str]]:
+        if not pending:
+            return None
+        latest = runners[-1]
+        triggers = []
+        if config.HEDGE_DELAY > 0:
+            triggers.append((latest.started_at + config.HEDGE_DELAY, 'hedge_delay'))
+        if config.HEDGE_FIRST_TOKEN_DEADLINE > 0 and not any(r.first_token_at for r in runners):
+            triggers.append((latest.started_at + config.HEDGE_FIRST_TOKEN_DEADLINE, 'first_token_deadline'))
+        return min(triggers) if triggers else None
+
+    launch()
+    try:
+        while True:
+            running = {runner.task: runner for runner in runners if not runner.task.done()}
+            hedge = next_hedge()
+            timeout = None if hedge is None else max(0.0, hedge[0] - time.monotonic())
+            if running:
+                # Wake at least every 50ms so the first-token deadline notices tokens
+                wait_timeout = 0.05 if hedge and hedge[1] == 'first_token_deadline' else timeout
+                if timeout is not None and wait_timeout is not None:
+                    wait_timeout = min(wait_timeout, timeout)
+                done, _ = await asyncio.wait(running, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED)
+            else:
+                done = set()
+
+            for task in done:
+                runner = running[task]
+                if task.exception() is None:
+                    stats.record_win(runner.name, time.monotonic() - runner.started_at)
+                    return runner.name, task.result()
+                stats.record_failure(runner.name)
+                errors[runner.name] = task.exception()
+                logger.warning(f'⚠️ {runner.name} failed in race: {task.exception()}')
+
+            if done and any(task.exception() is not None for task in done) and pending:
+                launch('failure')
+            elif hedge is not None and time.monotonic() >= hedge[0]:
+                launch(hedge[1])
+            elif not pending and all(runner.task.done() for runner in runners):
+                raise ProviderRaceError(errors)
+    finally:
+        for runner in runners:
+            if not runner.task.done():
+                runner.task.cancel()
+                stats.record_cancel(runner.name)
+
+
+async def generate_ai_response(complaint_text: str, category: str, priority: str, language: str = 'en',
+                               district: Optional[str] = None, use_cache: bool = True, encode: bool = True) -> str:
+    """Async counterpart of app.generate_ai_response (same caches, hedging and fallbacks)"""
+    up_info = samadhan.get_up_government_info(category, district)
+    try:
+        providers = []
+        if samadhan.watsonx_pool.accounts:
+            request_body = samadhan.build_watsonx_request(complaint_text, category, priority, language, up_info)
+            providers.append(('watsonx', lambda: iter_watsonx_deltas(request_body)))
+        if config.OPENROUTER_API_KEY:
+            prompt = samadhan.build_openrouter_response_prompt(complaint_text, category, priority, up_info)
+            providers.append(('openrouter', lambda: iter_openrouter_deltas(prompt)))
+
+        cache_key = response_cache_key(complaint_text, category, priority, language, district)
+        embedding = None
+        if use_cache:
+            cached_response, _, embedding = await run_cpu(samadhan.lookup_cached_response, complaint_text, cache_key,
+                                                          bool(providers), encode)
+            if cached_response is not None:
+                return cached_response
+
+        response_text = None
+        if samadhan.use_hedged_generation(providers):
+            try:
+                winner, text = await race_providers(providers)
+                response_text = samadhan.clean_ai_response(text)
+                logger.info(f'✅ {winner} response generated (hedged)')
+            except ProviderRaceError as e:
+                logger.warning(f"⚠️ {e}")
+        else:
+            for name, open_stream in providers:
+                try:
+                    response_text = samadhan.clean_ai_response(''.join([delta async for delta in open_stream()]))
+                    logger.info(f'✅ {name} response generated')
+                    break
+                except Exception as e:
+                    logger.warning(f"⚠️ {name} failed: {e}")
+
+        if response_text is not None:
+            await run_cpu(samadhan.store_cached_response, complaint_text, cache_key, response_text, embedding, encode)
+            return response_text
+    except Exception as e:
+        logger.error(f"❌ AI response generation error: {e}")
+
+    # Final fallback to category-based response with real UP data
+    return samadhan.get_category_fallback_response(category, priority, up_info)
+
+
+async def analyze_complaint(complaint_text: str, language: str = 'en',
+                            local_analysis: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Async counterpart of app.analyze_complaint_with_rag"""
+    if config.OPENROUTER_API_KEY:
+        try:
+            llm_response = await call_openrouter_api(samadhan.build_analysis_prompt(complaint_text, language))
+            analysis = samadhan.parse_llm_analysis(complaint_text, llm_response)
+            if analysis is not None:
+                return analysis
+        except Exception as e:
+            logger.warning(f"⚠️ OpenRouter analysis failed, using fallback: {e}")
+
+    if local_analysis is not None:
+        return local_analysis
+    try:
+        return await run_cpu(samadhan.get_local_analysis, complaint_text)
+    except Exception as e:
+        logger.error(f"❌ RAG analysis error: {e}")
+        return await run_cpu(samadhan.get_fallback_analysis, complaint_text)
+
+
+async def call_combined_providers(prompt: str) -> Optional[str]:
+    """Async counterpart of app.call_combined_providers"""
+    if samadhan.watsonx_pool.accounts:
+        try:
+            return ''.join([delta async for delta in iter_watsonx_deltas({
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": 500,
+                "temperature": 0.3
+            })])
+        except Exception as e:
+            logger.warning(f"⚠️ WatsonX combined call failed: {e}")
+    if config.OPENROUTER_API_KEY:
+        try:
+            return await call_openrouter_api(prompt)
+        except Exception as e:
+            logger.warning(f"⚠️ OpenRouter combined call failed: {e}")
+    return None
+
+
+async def analyze_and_respond_combined(complaint_text: str, language: str = 'en',
+                                      use_cache: bool = True) -> Optional[Tuple[Dict[str, Any], str]]:
+    """Async counterpart of app.analyze_and_respond_combined"""
+    district = samadhan.keyword_index.scan(complaint_text).district
+    if use_cache:
+        cached = samadhan.lookup_combined_response(complaint_text, language, district)
+        if cached is not None:
+            return cached
+    llm_response = await call_combined_providers(samadhan.build_combined_prompt(complaint_text, language, district))
+    result = samadhan.parse_combined_response(complaint_text, llm_response) if llm_response else None
+    if result is None:
+        logger.warning('⚠️ Combined answer missing or malformed, using separate analysis and response calls')
+        samadhan.record_pipeline_outcome('combined_fallback')
+        return None
+
+    analysis, reply = result
+    samadhan.record_pipeline_outcome('combined')
+    if use_cache:
+        await run_cpu(samadhan.store_combined_response, complaint_text, language, district, analysis, reply)
+    return analysis, reply
+
+
+async def analyze_and_generate(complaint_text: str, language: str = 'en',
+                               use_cache: bool = True) -> Tuple[Dict[str, Any], str]:
+    """Async counterpart of app.analyze_and_generate; a discarded speculative generation is cancelled"""
+    if config.COMBINED_PROMPT_ENABLED:
+        combined = await analyze_and_respond_combined(complaint_text, language, use_cache)
+        if combined is not None:
+            return combined
+
+    if not (config.PIPELINE_ENABLED and config.OPENROUTER_API_KEY):
+        analysis = await analyze_complaint(complaint_text, language)
+        return analysis, await generate_ai_response(complaint_text, analysis['category'], analysis['priority'],
+                                                    language, analysis.get('district'), use_cache,
+                                                    samadhan.may_encode_for_cache(analysis))
+
+    try:
+        local_analysis = await run_cpu(samadhan.get_local_analysis, complaint_text)
+    except Exception as e:
+        logger.error(f"❌ Local analysis error: {e}")
+        local_analysis = await run_cpu(samadhan.get_fallback_analysis, complaint_text)
+
+    speculative = asyncio.create_task(generate_ai_response(
+        complaint_text, local_analysis['category'], local_analysis['priority'],
+        language, local_analysis.get('district'), use_cache, samadhan.may_encode_for_cache(local_analysis)
+    ))
+    try:
+        analysis = await analyze_complaint(complaint_text, language, local_analysis)
+    except BaseException:
+        speculative.cancel()
+        raise
+
+    if samadhan.same_generation_inputs(local_analysis, analysis):
+        samadhan.record_pipeline_outcome('reused')
+        return analysis, await speculative
+
+    logger.info(f"🔀 LLM analysis disagrees with local ({local_analysis['category']}/{local_analysis['priority']} "
+                f"-> {analysis['category']}/{analysis['priority']}), regenerating")
+    samadhan.record_pipeline_outcome('regenerated')
+    speculative.cancel()
+    return analysis, await generate_ai_response(complaint_text, analysis['category'], analysis['priority'],
+                                                language, analysis.get('district'), use_cache,
+                                                samadhan.may_encode_for_cache(analysis))
+
+
+async def read_json(request: Request) -> Dict[str, Any]:
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def ai_chat(request: Request) -> JSONResponse:
+    """Async /api/ai/chat"""
+    data = await read_json(request)
+    message = data.get('message')
+    language = data.get('language', 'en')
+    use_cache = data.get('cache', True) is not False
+
+    if not message:
+        return JSONResponse({'error': 'Message is required'}, status_code=400)
+
+    try:
+        logger.info(f'💬 Samadhan AI processing: {message[:50]}...')
+        analysis, ai_response = await analyze_and_generate(message, language, use_cache)
+        logger.info('✅ Samadhan AI response ready')
+        return JSONResponse({
+            'response': ai_response,
+            'analysis': analysis,
+            'timestamp': datetime.now().isoformat(),
+            'language': language,
+            'system': 'samadhan_ai_comprehensive'
+        })
+    except Exception as e:
+        logger.error(f'❌ Samadhan AI error: {e}')
+        return JSONResponse({
+            'error': str(e),
+            'response': f'I apologize for the error. Please contact CM Helpline {get_helpline_number("cm_helpline")} for immediate assistance.',
+            'timestamp': datetime.now().isoformat()
+        }, status_code=500)
+
+
+async def ai_analyze(request: Request) -> JSONResponse:
+    """Async /api/ai/analyze"""
+    data = await read_json(request)
+    complaint_text = data.get('complaint')
+    language = data.get('language', 'en')
+    use_cache = data.get('cache', True) is not False
+
+    if not complaint_text:
+        return JSONResponse({'error': 'Complaint text is required'}, status_code=400)
+
+    try:
+        logger.info(f'🔍 Samadhan AI analyzing: {complaint_text[:50]}...')
+        analysis, ai_response = await analyze_and_generate(complaint_text, language, use_cache)
+        analysis['ai_response'] = ai_response
+        analysis['timestamp'] = datetime.now().isoformat()
+        analysis['system'] = 'samadhan_ai_comprehensive'
+        logger.info('✅ Samadhan AI analysis complete')
+        return JSONResponse(analysis)
+    except Exception as e:
+        logger.error(f'❌ Samadhan AI analysis error: {e}')
+        return JSONResponse({
+            'error': str(e),
+            'fallback_analysis': await run_cpu(samadhan.get_fallback_analysis, complaint_text)
+        }, status_code=500)
+
+
+async def health_check(request: Request) -> JSONResponse:
+    return JSONResponse({
+        'status': 'healthy',
+        'mode': 'asgi',
+        'timestamp': datetime.now().isoformat(),
+        'samadhan_ai': {'version': '3.0.0', 'rag_trained': bool(samadhan.embedding_model),
+                        'embedding_backend': samadhan.embedding_model.name if samadhan.embedding_model else None},
+        'watsonx': {'configured': bool(samadhan.watsonx_pool.accounts), 'accounts': samadhan.watsonx_pool.status()},
+        'openrouter': {'configured': bool(config.OPENROUTER_API_KEY)},
+        'circuit_breakers': samadhan.circuit_breakers.status(),
+        'provider_race': samadhan.race_stats.stats(),
+        'pipeline': {'enabled': config.PIPELINE_ENABLED, 'combined_prompt': config.COMBINED_PROMPT_ENABLED,
+                     **samadhan.pipeline_stats},
+        'response_cache': samadhan.response_cache.stats(),
+        'query_embedding_cache': samadhan.query_embeddings.stats() if samadhan.query_embeddings is not None else None,
+        'local_retrieval': samadhan.local_retriever.stats() if samadhan.local_retriever else None
+    })
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_app: Starlette):
+    http_clients.update(create_http_clients())
+    await run_cpu(samadhan.initialize_runtime)
+    logger.info('🚀 Samadhan AI ASGI mode ready')
+    try:
+        yield
+    finally:
+        for client in http_clients.values():
+            await client.aclose()
+        http_clients.clear()
+        cpu_executor.shutdown(wait=False)
+
+
+asgi_app = Starlette(
+    routes=[
+        Route('/health', health_check, methods=['GET']),
+        Route('/api/ai/chat', ai_chat, methods=['POST']),
+        Route('/api/ai/analyze', ai_analyze, methods=['POST']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=samadhan.CORS_ORIGINS, allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(asgi_app, host='0.0.0.0', port=config.PORT)
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Accuracy and cost of the embedding backends
+Compares the sentence transformer and the TF-IDF + SVD backend (and, as
+baselines, no embeddings and the keyword rules alone) on department
+classification, query latency, startup time and peak memory. Each backend runs
+in a fresh process, so import time and RSS include its dependencies (torch for
+the transformer).
+
+k-NN voting accuracy is measured two ways: leave-one-out over the complaint
+examples in the corpus, and on held-out paraphrased complaints for all ten
+departments that are not in the corpus. The examples share per-department
+boilerplate (head, contacts), which flatters leave-one-out. The analysis
+column is the held-out accuracy of the app's local analysis with the backend
+(BM25 and dense voting, keyword rules for departments without examples); with
+none it runs on BM25 and the rules. That is the figure to compare. --randomized-svd fits TF-IDF with randomized
+TruncatedSVD instead of the exact Gram-matrix SVD, to compare the two.
+
+Usage: python benchmarks/bench_embedding_backends.py [--backends tfidf sentence-transformers none rules] [--k 5]
+       [--randomized-svd]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Complaints written for this benchmark (not in the dataset), with the expected department
+HELD_OUT_COMPLAINTS = [
+    ('The approach road to our village has caved in after the rain', 'Public Works'),
+    ('Bridge railing is broken and children walk there every day', 'Public Works'),
+    ('Street lights in sector 4 have been off for two weeks', 'Public Works'),
+    ('Footpath tiles are uprooted near the bus stand', 'Public Works'),
+    ('No water in the taps of our colony since Monday', 'Water Supply'),
+    ('Drinking water smells bad and looks muddy', 'Water Supply'),
+    ('The main water pipeline is leaking and wasting water', 'Water Supply'),
+    ('Hand pump in the village is not working', 'Water Supply'),
+    ('Trucks park on the highway and block the traffic every evening', 'Traffic Police'),
+    ('Signal at the crossing is not working and there is a jam', 'Traffic Police'),
+    ('Autos overcharge and drive rashly near the station', 'Traffic Police'),
+    ('Illegal parking outside the market blocks the road', 'Traffic Police'),
+    ('Factory is releasing black smoke into the air all night', 'Environment'),
+    ('Garbage has not been collected for a week and it stinks', 'Environment'),
+    ('Loud music from a marriage hall till 2 am every day', 'Environment'),
+    ('Someone is cutting trees in the park illegally', 'Environment'),
+    ('The government hospital has no doctor in the night shift', 'Healthcare'),
+    ('Medicines are not available at the primary health centre', 'Healthcare'),
+    ('Ambulance did not arrive after calling 108', 'Healthcare'),
+    ('Dengue cases are rising and no fogging is done', 'Healthcare'),
+    ('Teachers do not come to the primary school regularly', 'Education'),
+    ('Mid day meal in the school is of very poor quality', 'Education'),
+    ('Scholarship amount has not been credited this year', 'Education'),
+    ('School building roof is leaking in classrooms', 'Education'),
+    ('Land mutation khatauni record wrong', 'Revenue'),
+    ('The lekhpal is demanding money to correct my land record', 'Revenue'),
+    ('My income certificate application is pending at the tehsil for a month', 'Revenue'),
+    ('Neighbour has encroached on my agricultural land and the survey is not done', 'Revenue'),
+    ('Crop insurance claim not paid', 'Agriculture'),
+    ('Fertilizer is not available at the cooperative society', 'Agriculture'),
+    ('PM Kisan installment has not come to my account', 'Agriculture'),
+    ('Seeds given by the block office were of bad quality and did not grow', 'Agriculture'),
+    ('My ration card has not been issued', 'Food & Civil Supplies'),
+    ('The ration shop dealer gives less wheat and rice than our quota', 'Food & Civil Supplies'),
+    ('Kerosene and sugar are not distributed at the fair price shop', 'Food & Civil Supplies'),
+    ('My name was removed from the ration card list without reason', 'Food & Civil Supplies'),
+    ('Old age pension not received', 'Social Welfare'),
+    ('Widow pension has stopped for the last six months', 'Social Welfare'),
+    ('Disability pension application is pending for a year', 'Social Welfare'),
+    ('Scholarship for SC students under the welfare scheme not received', 'Social Welfare'),
+]
+
+
+def rss_mb() -> float:
+    """Peak resident set size of this process (MiB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def local_analysis(backend: str):
+    """app.get_local_analysis with the given embedding backend"""
+    from config import config
+    config.EMBEDDING_BACKEND = backend
+    import app
+    app.initialize_sentence_transformers()
+    return app.get_local_analysis
+
+
+def analysis_accuracy(classify) -> float:
+    """Held-out accuracy of an analysis function returning a category"""
+    return sum(
+        classify(text)['category'] == expected for text, expected in HELD_OUT_COMPLAINTS
+    ) / len(HELD_OUT_COMPLAINTS)
+
+
+def measure_backend(backend: str, k: int, queries: int) -> dict:
+    """Runs in a child process: load one backend and measure it"""
+    started = time.perf_counter()
+    from samadhan_dataset.load_dataset import get_training_documents
+    documents = get_training_documents()
+    texts = [doc['content'] for doc in documents]
+    metadata = [doc['metadata'] for doc in documents]
+    held_out = [text for text, _ in HELD_OUT_COMPLAINTS]
+
+    if backend in ('rules', 'none'):
+        # No embeddings: the app's BM25 retrieval plus the rules, or the keyword rules alone
+        import app
+        classify = local_analysis(backend) if backend == 'none' else app.get_fallback_analysis
+        load_seconds = time.perf_counter() - started
+        accuracy = analysis_accuracy(classify)
+        timings = []
+        for i in range(queries):
+            query_started = time.perf_counter()
+            classify(f'{held_out[i % len(held_out)]} #{i}')
+            timings.append(time.perf_counter() - query_started)
+        return {
+            'backend': backend, 'load_seconds': load_seconds, 'rss_mb': rss_mb(),
+            'loo_accuracy': None, 'held_out_accuracy': None, 'analysis_accuracy': accuracy,
+            'query_p50_ms': percentile(timings, 0.5) * 1e3, 'query_p95_ms': percentile(timings, 0.95) * 1e3,
+            'batch_docs_per_s': None, 'torch_loaded': 'torch' in sys.modules
+        }
+
+    from config import config
+    from corpus_embeddings import l2_normalize
+    from embedding_backends import load_embedding_backend
+    from retrieval_index import RetrievalIndex, weighted_vote
+
+    model = load_embedding_backend(backend, config.EMBEDDING_MODEL_NAME, texts,
+                                   tfidf_dimensions=config.TFIDF_EMBEDDING_DIMENSIONS)
+    if model is None or model.kind != backend:
+        return {'backend': backend, 'skipped': 'dependencies not installed'}
+
+    encode_started = time.perf_counter()
+    matrix = l2_normalize(model.encode(texts, batch_size=64))
+    batch_seconds = time.perf_counter() - encode_started
+    index = RetrievalIndex(matrix, metadata)
+    load_seconds = time.perf_counter() - started
+    voting_filters = {'type': ['complaint_example', 'department_info']}
+
+    # Leave-one-out: each complaint example votes among its neighbours, itself excluded
+    examples = [row for row, meta in enumerate(metadata) if meta.get('type') == 'complaint_example']
+    neighbours = index.search_batch(matrix[examples], k + 1, voting_filters)
+    loo_hits = 0
+    for row, hits in zip(examples, neighbours):
+        vote = weighted_vote([hit for hit in hits if hit[0] != row][:k], metadata, 'department')
+        loo_hits += bool(vote) and vote[0] == metadata[row]['department']
+
+    held_out_hits = 0
+    for (text, expected), hits in zip(HELD_OUT_COMPLAINTS, index.search_batch(model.encode(held_out), k, voting_filters)):
+        vote = weighted_vote(hits, metadata, 'department')
+        held_out_hits += bool(vote) and vote[0] == expected
+
+    # Per-request cost: encode one uncached query and search
+    timings = []
+    for i in range(queries):
+        query_started = time.perf_counter()
+        index.search(model.encode([f'{held_out[i % len(held_out)]} #{i}'])[0], k, voting_filters)
+        timings.append(time.perf_counter() - query_started)
+
+    # Measured after the costs above: the app fits its own copy of the backend
+    peak_rss = rss_mb()
+    return {
+        'backend': model.name, 'load_seconds': load_seconds, 'rss_mb': peak_rss,
+        'loo_accuracy': loo_hits / len(examples), 'held_out_accuracy': held_out_hits / len(HELD_OUT_COMPLAINTS),
+        'analysis_accuracy': analysis_accuracy(local_analysis(backend)),
+        'query_p50_ms': percentile(timings, 0.5) * 1e3, 'query_p95_ms': percentile(timings, 0.95) * 1e3,
+        'batch_docs_per_s': len(texts) / batch_seconds, 'torch_loaded': 'torch' in sys.modules
+    }
+
+
+def run_isolated(backend: str, k: int, queries: int, randomized_svd: bool = False) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), '--worker', backend, '--k', str(k), '--queries', str(queries)]
+    if randomized_svd:
+        command.append('--randomized-svd')
+    output = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if output.returncode != 0:
+        return {'backend': backend, 'skipped': output.stderr.strip().splitlines()[-1] if output.stderr.strip() else 'failed'}
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=['tfidf', 'sentence-transformers', 'none', 'rules'])
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--randomized-svd', action='store_true', help='fit TF-IDF with randomized TruncatedSVD')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        import logging
+        logging.disable(logging.CRITICAL)
+        if args.randomized_svd:
+            import tempfile
+            import embedding_backends
+            embedding_backends.GRAM_SVD_MAX_DOCUMENTS = 0
+            # Both SVDs give the backend the same name: keep the app's corpus embeddings apart
+            os.environ['EMBEDDING_CACHE_DIR'] = tempfile.mkdtemp()
+        print(json.dumps(measure_backend(args.worker, args.k, args.queries)))
+        return 0
+
+    svd = 'randomized' if args.randomized_svd else 'Gram-matrix'
+    print(f"🔬 Embedding backend benchmark (k={args.k}, {args.queries} queries, one process per backend, {svd} TF-IDF SVD)")
+    for backend in args.backends:
+        result = run_isolated(backend, args.k, args.queries, args.randomized_svd)
+        if 'skipped' in result:
+            print(f"⚠️ {result['backend']}: skipped ({result['skipped']})")
+            continue
+        loo = f"{result['loo_accuracy']:6.1%}" if result['loo_accuracy'] is not None else '     -'
+        held_out = f"{result['held_out_accuracy']:6.1%}" if result['held_out_accuracy'] is not None else '     -'
+        batch = f"{result['batch_docs_per_s']:8.0f} docs/s" if result['batch_docs_per_s'] else '           -'
+        print(f"📊 {result['backend']:<28} k-NN leave-one-out {loo} / held-out {held_out}, "
+              f"analysis {result['analysis_accuracy']:6.1%}, "
+              f"query p50 {result['query_p50_ms']:6.2f} ms / p95 {result['query_p95_ms']:6.2f} ms, "
+              f"corpus {batch}, startup {result['load_seconds']:5.2f} s, peak RSS {result['rss_mb']:6.0f} MiB, "
+              f"torch {'loaded' if result['torch_loaded'] else 'not loaded'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
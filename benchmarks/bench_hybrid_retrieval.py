@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Accuracy and cost of lexical, dense and hybrid retrieval
+Classifies complaints by k-NN voting on the department with BM25 only, the
+dense embedding backend only, and hybrid retrieval (RRF and weighted fusion),
+each with and without the lexical confidence gate that skips the embedding
+model. Reports accuracy, the share of queries decided without an encode (and
+how many of those BM25 got right), and per-query latency. The dense backend is EMBEDDING_BACKEND; without torch, run
+with EMBEDDING_BACKEND=tfidf to include the dense and hybrid modes.
+
+Accuracy is cross-validated: the complaint patterns are split into folds and
+each fold is classified against indexes built from the remaining documents
+(so no complaint finds itself), plus the held-out complaints of
+bench_embedding_backends.py against the full corpus.
+
+Finally it checks that a full /api/ai/analyze request for a complaint BM25
+settles never calls the encoder, without providers and with a stand-in
+provider whose answers go to the response caches.
+
+Usage: python benchmarks/bench_hybrid_retrieval.py [--folds 5] [--k 5] [--share 0.8] [--score 0.15] [--hits 3]
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bm25 import BM25Index, HybridRetriever, STAGE_LEXICAL
+from bench_embedding_backends import HELD_OUT_COMPLAINTS
+from config import config
+from corpus_embeddings import l2_normalize
+from embedding_backends import load_embedding_backend
+from retrieval_index import RetrievalIndex, weighted_vote
+from samadhan_dataset.load_dataset import get_training_documents
+
+VOTING_FILTERS = {'type': ['complaint_example', 'department_info']}
+VOTING_FIELD = 'department'
+
+# name -> (uses BM25, uses dense, fusion, gated)
+MODES = {
+    'bm25': (True, False, 'rrf', True),
+    'dense': (False, True, 'rrf', False),
+    'hybrid-rrf': (True, True, 'rrf', False),
+    'hybrid-weighted': (True, True, 'weighted', False),
+    'gated-rrf': (True, True, 'rrf', True),
+    'gated-weighted': (True, True, 'weighted', True),
+}
+
+
+def build_indexes(texts, metadata):
+    model = load_embedding_backend(config.EMBEDDING_BACKEND, config.EMBEDDING_MODEL_NAME, texts,
+                                   tfidf_dimensions=config.TFIDF_EMBEDDING_DIMENSIONS)
+    dense = None
+    if model is not None:
+        dense = RetrievalIndex(l2_normalize(model.encode(texts, batch_size=64)), metadata)
+    return model, BM25Index(texts, metadata, config.BM25_K1, config.BM25_B), dense
+
+
+def make_retriever(mode, metadata, model, lexical, dense, args):
+    uses_lexical, uses_dense, fusion, gated = MODES[mode]
+    if uses_dense and dense is None:
+        return None
+    return HybridRetriever(
+        metadata,
+        lexical=lexical if uses_lexical else None,
+        dense=dense if uses_dense else None,
+        encode=model.encode if uses_dense else None,
+        confident_share=args.share if gated else float('inf'),
+        confident_score=args.score,
+        confident_hits=args.hits,
+        fusion=fusion,
+        gate_field=VOTING_FIELD
+    )
+
+
+def classify(retriever, queries, k):
+    """Predicted categories, stages and per-query latencies (queries one by one, as requests arrive)"""
+    predictions, stages, timings = [], [], []
+    for query in queries:
+        started = time.perf_counter()
+        hits, stage = retriever.search(query, k, VOTING_FILTERS)
+        vote = weighted_vote(hits, retriever.metadata, VOTING_FIELD)
+        timings.append(time.perf_counter() - started)
+        predictions.append(vote[0] if vote else None)
+        stages.append(stage)
+    return predictions, stages, timings
+
+
+# Settled by the BM25 stage with the bundled corpus
+LEXICAL_COMPLAINTS = ('street lights not working in my colony', 'street light is not working on the main road')
+# Needs the embedding model
+HYBRID_COMPLAINT = 'Factory is releasing black smoke into the air all night'
+
+
+def check_request_encodes() -> bool:
+    """Counts encoder calls of full /api/ai/analyze requests (Flask test client)"""
+    import app as samadhan
+    load_backend = samadhan.load_embedding_backend
+    calls = []
+
+    def load_counted(*args, **kwargs):
+        model = load_backend(*args, **kwargs)
+        if model is not None:
+            encode = model.encode
+            model.encode = lambda texts, *a, **kw: calls.append(len(texts)) or encode(texts, *a, **kw)
+        return model
+
+    samadhan.load_embedding_backend = load_counted
+    samadhan.config.OPENROUTER_API_KEY = None
+    samadhan.watsonx_pool.accounts = []
+    samadhan.initialize_sentence_transformers()
+    if samadhan.embedding_model is None:
+        print("⚠️ Request check skipped (no embedding backend)")
+        return True
+    client = samadhan.app.test_client()
+
+    def analyze(text):
+        del calls[:]
+        analysis = client.post('/api/ai/analyze', json={'complaint': text}).get_json()
+        return analysis['source'], len(calls), analysis['ai_response']
+
+    ok = True
+    for label, text, expected_source, expected_calls in (
+        ('no provider', LEXICAL_COMPLAINTS[0], 'samadhan_ai_bm25', 0),
+        ('no provider', HYBRID_COMPLAINT, f"samadhan_ai_{samadhan.embedding_model.kind.replace('-', '_')}_hybrid", 1),
+    ):
+        source, encodes, _ = analyze(text)
+        passed = source == expected_source and encodes == expected_calls
+        ok &= passed
+        print(f"{'✅' if passed else '❌'} {label:<14} {source:<26} {encodes} encoder call(s): {text}")
+
+    # A provider makes the semantic cache usable; BM25-settled complaints still skip the encoder.
+    # The stand-in OpenRouter answers every call with plain text, so its LLM analysis falls back to the local one
+    samadhan.config.OPENROUTER_API_KEY = 'stand-in'
+    samadhan.call_openrouter_api = lambda prompt, *args, **kwargs: 'Complaint registered.'
+    for text in LEXICAL_COMPLAINTS:
+        source, encodes, reply = analyze(text)
+        passed = source == 'samadhan_ai_bm25' and encodes == 0 and reply == 'Complaint registered.'
+        ok &= passed
+        print(f"{'✅' if passed else '❌'} {'with provider':<14} {source:<26} {encodes} encoder call(s): {text}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--share', type=float, default=config.LEXICAL_CONFIDENT_SHARE)
+    parser.add_argument('--score', type=float, default=config.LEXICAL_CONFIDENT_SCORE)
+    parser.add_argument('--hits', type=int, default=config.LEXICAL_CONFIDENT_HITS)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    documents = get_training_documents()
+    examples = [row for row, doc in enumerate(documents) if doc['metadata'].get('type') == 'complaint_example']
+    # Complaint texts as a citizen would type them (the documents wrap them in contact details)
+    queries = {row: documents[row]['content'].split('. This should be handled by')[0].replace('Common complaint: ', '')
+               for row in examples}
+
+    results = {mode: {'correct': 0, 'total': 0, 'lexical': 0, 'lexical_correct': 0, 'timings': []} for mode in MODES}
+    folds = [examples[i::args.folds] for i in range(args.folds)]
+    evaluations = [(fold, [row for row in range(len(documents)) if row not in set(fold)]) for fold in folds]
+    # Held-out complaints against the full corpus
+    evaluations.append((None, list(range(len(documents)))))
+
+    dense_name = None
+    for fold, train_rows in evaluations:
+        texts = [documents[row]['content'] for row in train_rows]
+        metadata = [documents[row]['metadata'] for row in train_rows]
+        model, lexical, dense = build_indexes(texts, metadata)
+        dense_name = model.name if model is not None else None
+        if fold is None:
+            fold_queries = [text for text, _ in HELD_OUT_COMPLAINTS]
+            expected = [department for _, department in HELD_OUT_COMPLAINTS]
+        else:
+            fold_queries = [queries[row] for row in fold]
+            expected = [documents[row]['metadata']['department'] for row in fold]
+
+        for mode in MODES:
+            retriever = make_retriever(mode, metadata, model, lexical, dense, args)
+            if retriever is None:
+                continue
+            predictions, stages, timings = classify(retriever, fold_queries, args.k)
+            result = results[mode]
+            result['correct'] += sum(p == e for p, e in zip(predictions, expected))
+            result['total'] += len(expected)
+            result['lexical'] += stages.count(STAGE_LEXICAL)
+            result['lexical_correct'] += sum(
+                p == e for p, e, stage in zip(predictions, expected, stages) if stage == STAGE_LEXICAL
+            )
+            result['timings'].extend(timings)
+
+    print(f"🔬 Hybrid retrieval benchmark ({args.folds}-fold CV + {len(HELD_OUT_COMPLAINTS)} held-out, k={args.k}, "
+          f"gate share>={args.share} score>={args.score} hits>={args.hits}, dense backend {dense_name or 'unavailable'})")
+    for mode, result in results.items():
+        if not result['total']:
+            print(f"⚠️ {mode}: skipped (no embedding backend)")
+            continue
+        timings = sorted(result['timings'])
+        lexical_precision = result['lexical_correct'] / result['lexical'] if result['lexical'] else 0.0
+        print(f"📊 {mode:<16} accuracy {result['correct'] / result['total']:6.1%}, "
+              f"decided without encode {result['lexical'] / result['total']:6.1%} ({lexical_precision:6.1%} correct), "
+              f"query mean {sum(timings) / len(timings) * 1e3:6.2f} ms / p50 {timings[len(timings) // 2] * 1e3:6.2f} ms")
+
+    print("🔬 Encoder calls per /api/ai/analyze request")
+    return 0 if check_request_encodes() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the incremental SSE decoder
+Compares sse.iter_stream_deltas against the previous string-buffer parser on large synthetic WatsonX streams
+
+Usage: python benchmarks/bench_sse.py [--events N] [--chunk-size BYTES]
+"""
+
+import os
+import sys
+import json
+import codecs
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sse import iter_stream_deltas
+
+
+def legacy_parse(chunks):
+    """The parser previously inlined in call_watsonx_streaming (str buffer += chunk, split per chunk)"""
+    response_text = ""
+    buffer = ""
+    # requests' iter_content(decode_unicode=True) decodes incrementally like this
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        lines = buffer.split('\n')
+        buffer = lines.pop() if lines else ""
+        for line in lines:
+            if line.startswith('data:'):
+                data_str = line[5:].strip()
+                if data_str and data_str != '[DONE]':
+                    try:
+                        choices = json.loads(data_str).get('choices', [])
+                        if choices:
+                            content = choices[0].get('delta', {}).get('content')
+                            if content:
+                                response_text += content
+                    except (json.JSONDecodeError, IndexError, KeyError):
+                        continue
+    return response_text
+
+
+def synthetic_stream(events: int, chunk_size: int, single_line: bool = False):
+    """WatsonX-style stream split into fixed-size byte chunks; single_line drops the blank separators"""
+    separator = '\n' if single_line else '\n\n'
+    parts = []
+    for i in range(events):
+        payload = {'id': f'chatcmpl-{i}', 'choices': [{'index': 0, 'delta': {'content': f'token{i} शिकायत '}}]}
+        parts.append(f'id: {i}\nevent: message\ndata: {json.dumps(payload, ensure_ascii=False)}{separator}')
+    parts.append('data: [DONE]\n\n')
+    raw = ''.join(parts).encode('utf-8')
+    return [raw[i:i + chunk_size] for i in range(0, len(raw), chunk_size)], len(raw)
+
+
+def timed(fn, chunks, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--chunk-size', type=int, default=1024)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--large-event-kb', type=int, default=2048)
+    args = parser.parse_args()
+
+    print(f"🔬 SSE parser benchmark (chunk size {args.chunk_size} bytes, best of {args.repeat})")
+    for events in args.events:
+        chunks, size = synthetic_stream(events, args.chunk_size)
+        legacy_time, legacy_text = timed(legacy_parse, chunks, args.repeat)
+        decoder_time, decoder_text = timed(lambda c: ''.join(iter_stream_deltas(c)), chunks, args.repeat)
+        if legacy_text != decoder_text:
+            print(f"❌ Output mismatch for {events} events")
+            return 1
+        print(f"📊 {events:>6} events / {size / 1e6:6.2f} MB: legacy {legacy_time * 1e3:8.1f} ms, "
+              f"decoder {decoder_time * 1e3:8.1f} ms ({legacy_time / decoder_time:4.1f}x), "
+              f"{size / decoder_time / 1e6:6.1f} MB/s")
+
+    # One large event spanning many chunks: the legacy parser re-splits the whole buffer per chunk
+    payload = json.dumps({'choices': [{'delta': {'content': 'x' * (args.large_event_kb * 1024)}}]})
+    raw = f'data: {payload}\n\ndata: [DONE]\n\n'.encode('utf-8')
+    chunks = [raw[i:i + args.chunk_size] for i in range(0, len(raw), args.chunk_size)]
+    legacy_time, legacy_text = timed(legacy_parse, chunks, args.repeat)
+    decoder_time, decoder_text = timed(lambda c: ''.join(iter_stream_deltas(c)), chunks, args.repeat)
+    if legacy_text != decoder_text:
+        print("❌ Output mismatch for large event")
+        return 1
+    print(f"📊 single {args.large_event_kb} KB event: legacy {legacy_time * 1e3:8.1f} ms, "
+          f"decoder {decoder_time * 1e3:8.1f} ms ({legacy_time / decoder_time:4.1f}x)")
+
+    # Providers that omit the blank line between events still decode
+    chunks, _ = synthetic_stream(100, args.chunk_size, single_line=True)
+    if legacy_parse(chunks) != ''.join(iter_stream_deltas(chunks)):
+        print("❌ Output mismatch for stream without blank-line separators")
+        return 1
+    print("✅ Decoder output matches the legacy parser")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the Samadhan AI app
+Starts fresh interpreters and measures the time to import the app, to run
+initialize_runtime (dataset documents, BM25, embedding model, corpus
+embeddings, warm-up) and to answer the first /health request, plus peak
+memory and which heavy optional packages ended up loaded.
+
+--imports switches to the import-time profile: the app is imported once under
+python -X importtime and the cost is reported per top-level package (the
+repo's own modules are top-level, so each is listed on its own).
+
+Usage: python benchmarks/bench_startup.py [--runs 5] | --imports [--module app] [--top 25]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Optional packages whose import dominates cold start when they are pulled in
+HEAVY_PACKAGES = ('torch', 'sentence_transformers', 'transformers', 'langchain', 'faiss', 'sklearn', 'scipy',
+                  'numpy', 'asyncio')
+
+WORKER = r'''
+import sys, time, json, resource
+started = time.perf_counter()
+import app as samadhan
+imported = time.perf_counter()
+loaded_on_import = [name for name in {heavy!r} if name in sys.modules]
+samadhan.initialize_runtime()
+initialized = time.perf_counter()
+response = samadhan.app.test_client().get('/health')
+first_health = time.perf_counter()
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    'import': imported - started,
+    'initialize': initialized - imported,
+    'first_health': first_health - initialized,
+    'status': response.status_code,
+    'rss_mb': peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024,
+    'loaded_on_import': loaded_on_import,
+    'loaded_after_init': [name for name in {heavy!r} if name in sys.modules],
+    'phases': samadhan.startup_timings
+}}))
+'''
+
+
+def run_trial() -> dict:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='0')
+    output = subprocess.run([sys.executable, '-c', WORKER.format(heavy=HEAVY_PACKAGES)],
+                            cwd=ROOT, capture_output=True, text=True, env=env)
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr.strip().splitlines()[-1] if output.stderr.strip() else 'trial failed')
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def import_profile(module: str):
+    """(self µs, cumulative µs of the target module) per top-level package, from python -X importtime"""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True)
+    packages = {}
+    total = 0
+    for line in output.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace('import time:', '|', 1).split('|'))
+        top_level = name.split('.')[0]
+        packages[top_level] = packages.get(top_level, 0) + int(self_us)
+        if name == module:
+            total = int(cumulative_us)
+    return packages, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--imports', action='store_true', help='report per-package import cost instead')
+    parser.add_argument('--module', default='app', help='module to profile with --imports (e.g. asgi_app)')
+    parser.add_argument('--top', type=int, default=25)
+    args = parser.parse_args()
+
+    if args.imports:
+        packages, total = import_profile(args.module)
+        print(f"🔬 Import profile of {args.module}: {total / 1e3:.1f} ms (python -X importtime, self time per package)")
+        for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"📊 {package:<28} {self_us / 1e3:8.1f} ms  {self_us / total:6.1%}" if total else f"📊 {package}")
+        return 0
+
+    # The first run also warms the OS page cache and writes bytecode and embedding artifacts
+    print(f"🔬 Cold start of app ({args.runs} fresh processes after one warm-up run)")
+    run_trial()
+    trials = [run_trial() for _ in range(args.runs)]
+
+    for metric, label in (('import', 'import'), ('initialize', 'initialize_runtime'), ('first_health', 'first /health')):
+        values = [trial[metric] * 1e3 for trial in trials]
+        print(f"📊 {label:<20} median {statistics.median(values):8.1f} ms, min {min(values):8.1f} ms, max {max(values):8.1f} ms")
+    phases = trials[-1]['phases']
+    print("📊 startup phases     " + ', '.join(f'{phase} {seconds * 1e3:.1f} ms' for phase, seconds in phases.items()))
+    print(f"📊 peak RSS           {statistics.median(trial['rss_mb'] for trial in trials):8.0f} MiB")
+    print(f"📊 loaded on import:  {', '.join(trials[-1]['loaded_on_import']) or 'none'}")
+    print(f"📊 loaded after init: {', '.join(trials[-1]['loaded_after_init']) or 'none'}")
+    if any(trial['status'] != 200 for trial in trials):
+        print("❌ /health did not return 200")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
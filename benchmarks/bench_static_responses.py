@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Cost of the dataset endpoints polled by the frontend
+Times /api/up/data and /api/dataset/stats through the Flask test client as
+the original handlers served them (jsonify on every request) and as they are
+served now: precomputed identity bytes, a precompressed encoding, and a 304
+for a client that sends back the ETag. Also reports bytes on the wire.
+
+Usage: python benchmarks/bench_static_responses.py [--requests 2000]
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def time_requests(client, path, headers, requests):
+    """(mean ms per request, response bytes of the last request)"""
+    response = client.get(path, headers=headers)
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(path, headers=headers)
+    return (time.perf_counter() - started) / requests * 1e3, len(response.get_data())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    import app as samadhan
+    from flask import jsonify
+
+    # The original handlers, on separate paths of the same app
+    samadhan.app.add_url_rule('/legacy/up/data', 'legacy_up_data', lambda: jsonify(samadhan.get_complete_dataset()))
+    samadhan.app.add_url_rule('/legacy/dataset/stats', 'legacy_dataset_stats', lambda: jsonify(samadhan.get_dataset_stats()))
+    client = samadhan.app.test_client()
+    started = time.perf_counter()
+    samadhan.static_responses.prebuild()
+    print(f"🔬 Dataset endpoints ({args.requests} requests each, payloads built in {(time.perf_counter() - started) * 1e3:.1f} ms, "
+          f"brotli {'available' if samadhan.static_responses.stats()['brotli'] else 'not installed'})")
+
+    for path, legacy_path in (('/api/up/data', '/legacy/up/data'), ('/api/dataset/stats', '/legacy/dataset/stats')):
+        preferred = client.get(path, headers={'Accept-Encoding': 'br, gzip'})
+        if preferred.status_code != 200 or client.get(path).get_data() != client.get(legacy_path).get_data():
+            print(f"❌ {path} does not return the same JSON as jsonify")
+            return 1
+        encoding = preferred.headers.get('Content-Encoding', 'identity')
+        cases = (
+            ('jsonify (legacy)', legacy_path, {}),
+            ('identity bytes', path, {}),
+            (f'{encoding} bytes', path, {'Accept-Encoding': 'br, gzip'}),
+            ('304 Not Modified', path, {'Accept-Encoding': 'br, gzip', 'If-None-Match': preferred.headers['ETag']}),
+        )
+        legacy_ms = None
+        for label, case_path, headers in cases:
+            mean_ms, size = time_requests(client, case_path, headers, args.requests)
+            legacy_ms = legacy_ms or mean_ms
+            print(f"📊 {path:<20} {label:<18} {mean_ms:7.3f} ms/request ({legacy_ms / mean_ms:5.1f}x), {size:7d} bytes")
+    print("✅ Responses match jsonify")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Differential test and micro-benchmark of clean_ai_response
+Checks that app.clean_ai_response returns exactly what the original eight
+re.sub version (kept below as legacy_clean_ai_response) returns on a fuzz
+corpus of random markdown, whitespace and unicode fragments plus realistic
+model answers, then times both on plain, markdown and JSON answers.
+
+Usage: python benchmarks/bench_text_cleaner.py [--cases 20000] [--seed 0] [--repeat 20000]
+"""
+
+import os
+import re
+import sys
+import json
+import random
+import timeit
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def legacy_clean_ai_response(text: str) -> str:
+    """clean_ai_response before the precompiled passes, verbatim"""
+    if not text:
+        return text
+
+    # Remove markdown formatting
+    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # Remove **bold**
+    text = re.sub(r'\*(.*?)\*', r'\1', text)      # Remove *italic*
+    text = re.sub(r'#{1,6}\s*', '', text)         # Remove headers
+    text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)  # Remove code blocks
+    text = re.sub(r'`(.*?)`', r'\1', text)        # Remove inline code
+    text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)  # Remove links
+
+    # Remove extra whitespace and newlines
+    text = re.sub(r'\n\s*\n', '\n', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = text.strip()
+
+    return text
+
+
+PLAIN_REPLY = (
+    'Thank you for reporting the water leakage in Gomti Nagar, Lucknow. Your complaint has been forwarded to the '
+    'Jal Nigam (contact 0522-2239393), and a team will inspect the pipeline within 2-3 working days. '
+    'For emergencies please call 1076.'
+)
+MARKDOWN_REPLY = (
+    '## Complaint Registered\n\n**Dear Citizen,**\n\nThank you for contacting *CM Helpline 1076*. Your complaint about '
+    'the `broken street light` has been sent to the **Public Works Department**.\n\n### Next steps\n'
+    '- Contact: [PWD Lucknow](https://uppwd.gov.in) at 0522-2286700\n- Timeline: 3-5 days\n\n'
+    '```\nReference: UP-2024-118\n```\n\nRegards,\nSamadhan AI'
+)
+JSON_ANSWER = (
+    '```json\n{\n    "category": "WaterSupply",\n    "priority": "high",\n    "department": "Jal Nigam",\n'
+    '    "sentiment": "negative",\n    "confidence": 0.92,\n    "district": "Lucknow"\n}\n```'
+)
+
+# Fragments the fuzz corpus is assembled from: markdown syntax, whitespace of every kind
+# (including separators str.split and re's \s both treat as whitespace) and non-ASCII text
+FRAGMENTS = [
+    '*', '**', '***', '#', '##', '###### ', '`', '``', '```', '```json\n', '[', ']', '(', ')', '](', '[link](url)',
+    '{', '}', '"key": "value"', '\n', '\n\n', ' ', '  ', '\t', '\r\n', '\x0b', '\x0c', '\x1c', '\x1d', '\x1e',
+    '\x1f', '\x85', '\xa0', ' ', ' ', ' ', ' ', ' ', '　', '​', 'word', 'pani',
+    'सड़क टूटी है', 'पानी नहीं आ रहा', 'Lucknow', '1076', '.', ',', ':', '-', '_', '\\', 'é', '🚰',
+]
+
+
+def fuzz_corpus(cases: int, seed: int):
+    rng = random.Random(seed)
+    corpus = ['', ' ', '\n', PLAIN_REPLY, MARKDOWN_REPLY, JSON_ANSWER, MARKDOWN_REPLY + JSON_ANSWER,
+              json.dumps({'reply': MARKDOWN_REPLY})]
+    for _ in range(cases):
+        corpus.append(''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 40))))
+    for _ in range(cases // 10):
+        # Markdown fragments spliced into realistic answers
+        base = list(rng.choice((PLAIN_REPLY, MARKDOWN_REPLY, JSON_ANSWER)))
+        for _ in range(rng.randint(1, 8)):
+            base.insert(rng.randrange(len(base) + 1), rng.choice(FRAGMENTS))
+        corpus.append(''.join(base))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=20000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    from app import clean_ai_response, parse_llm_analysis
+
+    corpus = fuzz_corpus(args.cases, args.seed)
+    print(f"🔬 Differential test on {len(corpus)} fuzz cases (seed {args.seed})")
+    mismatches = [text for text in corpus if clean_ai_response(text) != legacy_clean_ai_response(text)]
+    if mismatches:
+        print(f"❌ {len(mismatches)} outputs differ from the legacy cleaner, first: {mismatches[0]!r}")
+        return 1
+    print("✅ Identical output on every case")
+
+    analysis = parse_llm_analysis('Paani nahi aa raha', JSON_ANSWER)
+    if not analysis or analysis['category'] != 'WaterSupply':
+        print("❌ Fenced JSON answer was not parsed")
+        return 1
+    print("✅ Fenced JSON answer parsed without a second clean")
+
+    print(f"🔬 Micro-benchmark ({args.repeat} calls each)")
+    for label, text in (('plain reply', PLAIN_REPLY), ('markdown reply', MARKDOWN_REPLY), ('JSON answer', JSON_ANSWER)):
+        legacy = timeit.timeit(lambda: legacy_clean_ai_response(text), number=args.repeat) / args.repeat
+        current = timeit.timeit(lambda: clean_ai_response(text), number=args.repeat) / args.repeat
+        print(f"📊 {label:<15} legacy {legacy * 1e6:7.2f} µs, current {current * 1e6:7.2f} µs, "
+              f"speed-up {legacy / current:5.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
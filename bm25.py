@@ -0,0 +1,242 @@
+"""
+BM25 lexical retrieval for Samadhan AI
+In-memory inverted index over the training documents as a first stage that
+settles clear-cut complaints without the embedding model, and fusion of
+lexical and dense (embedding) rankings for the rest
+"""
+
+import re
+import math
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from retrieval_index import Hit, MetadataFilter, RetrievalIndex, top_k_positions, weighted_vote
+
+FUSION_WEIGHTED = 'weighted'
+FUSION_RRF = 'rrf'
+FUSION_METHODS = (FUSION_WEIGHTED, FUSION_RRF)
+
+# Which stage decided a query in HybridRetriever
+STAGE_LEXICAL = 'lexical'
+STAGE_HYBRID = 'hybrid'
+STAGE_DENSE = 'dense'
+
+_TOKEN = re.compile(r'\w+')
+
+# Function words that carry no department signal
+STOPWORDS = frozenset('''
+a an and are as at be been but by for from has have i in is it its my near no not of on or our since so
+that the their there this to was we were which with
+'''.split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens without stopwords"""
+    return [token for token in _TOKEN.findall(text.casefold()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed corpus.
+
+    Each term's posting list stores its precomputed per-document BM25 weight,
+    so scoring a query is one vector add per query term. Scores are divided
+    by the query's upper bound (idf x (k1 + 1) summed over its terms, unknown
+    words at the maximum idf), which keeps them in [0, 1) and comparable
+    across queries: a query whose words are mostly unknown to the corpus
+    cannot score high. Filters are applied as in retrieval_index.MetadataFilter.
+    """
+
+    def __init__(self, texts: Sequence[str], metadata: Sequence[Mapping[str, Any]], k1: float = 1.2, b: float = 0.75):
+        if len(texts) != len(metadata):
+            raise ValueError(f'{len(metadata)} metadata entries for {len(texts)} documents')
+        self.metadata = list(metadata)
+        self.filter = MetadataFilter(self.metadata)
+        self.k1 = k1
+
+        term_counts = [Counter(tokenize(text)) for text in texts]
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+        length_norm = k1 * (1 - b + b * lengths / average_length)
+
+        postings: Dict[str, List[tuple]] = {}
+        for row, counts in enumerate(term_counts):
+            for term, count in counts.items():
+                postings.setdefault(term, []).append((row, count))
+
+        documents = len(texts)
+        # term -> (rows, BM25 weights of the term in those rows)
+        self._postings: Dict[str, tuple] = {}
+        self._idf: Dict[str, float] = {}
+        for term, entries in postings.items():
+            rows = np.array([row for row, _ in entries], dtype=np.int64)
+            tf = np.array([count for _, count in entries], dtype=np.float32)
+            idf = math.log(1 + (documents - len(entries) + 0.5) / (len(entries) + 0.5))
+            self._idf[term] = idf
+            self._postings[term] = (rows, (idf * tf * (k1 + 1) / (tf + length_norm[rows])).astype(np.float32))
+        self._unknown_idf = math.log(1 + (documents + 0.5) / 0.5)
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Normalised BM25 score of every document for the query"""
+        scores = np.zeros(len(self.metadata), dtype=np.float32)
+        terms = set(tokenize(query))
+        if not terms:
+            return scores
+        upper_bound = 0.0
+        for term in terms:
+            upper_bound += self._idf.get(term, self._unknown_idf) * (self.k1 + 1)
+            posting = self._postings.get(term)
+            if posting is not None:
+                rows, weights = posting
+                scores[rows] += weights
+        return scores / upper_bound
+
+    def search(self, query: str, k: int = 5, filters: Optional[Mapping[str, Any]] = None) -> List[Hit]:
+        """Top-k (row, normalised score) hits with a non-zero score, best first"""
+        scores = self.scores(query)
+        rows = self.filter.rows(filters)
+        if rows is not None:
+            scores = scores[rows]
+        if k <= 0 or not scores.size:
+            return []
+        positions = top_k_positions(scores.reshape(1, -1), k)[0]
+        return [(int(rows[p]) if rows is not None else int(p), float(scores[p])) for p in positions if scores[p] > 0]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hit]], k: int = 60) -> List[Hit]:
+    """Combine rankings by summed 1 / (k + rank)
+
+    Fused values are divided by their maximum (first in every ranking), so
+    scores are in (0, 1] like the weighted fusion.
+    """
+    fused: Dict[int, float] = {}
+    best = len(rankings) / (k + 1)
+    for ranking in rankings:
+        for rank, (row, _) in enumerate(ranking, start=1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank) / best
+    return sorted(fused.items(), key=lambda hit: hit[1], reverse=True)
+
+
+def weighted_fusion(lexical: Mapping[int, float], dense: Mapping[int, float], dense_weight: float = 0.5) -> List[Hit]:
+    """Combine per-row scores as dense_weight x dense + (1 - dense_weight) x lexical
+
+    Each side is divided by its best score among the candidates first (negative
+    cosines count as 0), so both span [0, 1]; rows missing from one side score
+    0 there.
+    """
+    best_lexical = max(lexical.values(), default=0.0) or 1.0
+    best_dense = max((max(score, 0.0) for score in dense.values()), default=0.0) or 1.0
+    fused = {
+        row: dense_weight * max(dense.get(row, 0.0), 0.0) / best_dense
+        + (1 - dense_weight) * lexical.get(row, 0.0) / best_lexical
+        for row in set(lexical) | set(dense)
+    }
+    return sorted(fused.items(), key=lambda hit: hit[1], reverse=True)
+
+
+class HybridRetriever:
+    """BM25 first stage that settles confident queries, dense retrieval for the rest.
+
+    A query is decided lexically when its top-k BM25 hits agree: there are at
+    least confident_hits of them, the similarity-weighted vote on gate_field
+    reaches confident_share and the best hit scores at least confident_score.
+    A lone hit always has a vote share of 1.0, so it never settles a query
+    by itself. Only the remaining queries are
+    embedded (one encode call per batch); their BM25 and dense candidate lists
+    are fused by reciprocal rank ('rrf') or by weighted scores ('weighted',
+    with exact cosines for every candidate). Without a lexical index every
+    query goes to dense retrieval; without a dense index BM25 hits are used
+    as they are.
+    """
+
+    def __init__(self, metadata: Sequence[Mapping[str, Any]], lexical: Optional[BM25Index] = None,
+                 dense: Optional[RetrievalIndex] = None, encode: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 gate_field: str = 'category', confident_share: float = 0.8, confident_score: float = 0.15,
+                 confident_hits: int = 3,
+                 fusion: str = FUSION_RRF, dense_weight: float = 0.5, candidates: int = 20, rrf_k: int = 60):
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion '{fusion}' (expected one of {', '.join(FUSION_METHODS)})")
+        if encode is None:
+            dense = None
+        if lexical is None and dense is None:
+            raise ValueError('HybridRetriever needs a lexical index or a dense index with an encoder')
+        self.metadata = list(metadata)
+        self.lexical = lexical
+        self.dense = dense
+        self.encode = encode
+        self.gate_field = gate_field
+        self.confident_share = confident_share
+        self.confident_score = confident_score
+        self.confident_hits = confident_hits
+        self.fusion = fusion
+        self.dense_weight = dense_weight
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self._stages = {STAGE_LEXICAL: 0, STAGE_HYBRID: 0, STAGE_DENSE: 0}
+        self._lock = threading.Lock()
+
+    def is_confident(self, hits: Sequence[Hit]) -> bool:
+        """BM25 hits agree enough to skip the embedding model"""
+        if not hits or len(hits) < self.confident_hits or hits[0][1] < self.confident_score:
+            return False
+        vote = weighted_vote(hits, self.metadata, self.gate_field)
+        return vote is not None and vote[1] >= self.confident_share
+
+    def search_many(self, queries: Sequence[str], k: int = 5,
+                    filters: Optional[Mapping[str, Any]] = None) -> List[Tuple[List[Hit], str]]:
+        """(top-k hits, stage) per query; stage is lexical, hybrid or dense"""
+        results: List[Optional[Tuple[List[Hit], str]]] = [None] * len(queries)
+        lexical_hits: List[List[Hit]] = [[] for _ in queries]
+        if self.lexical is not None:
+            for position, query in enumerate(queries):
+                lexical_hits[position] = self.lexical.search(query, max(k, self.candidates), filters)
+                if self.dense is None or self.is_confident(lexical_hits[position][:k]):
+                    results[position] = (lexical_hits[position][:k], STAGE_LEXICAL)
+
+        pending = [position for position, result in enumerate(results) if result is None]
+        if pending:
+            embeddings = self.encode([queries[position] for position in pending])
+            dense_hits = self.dense.search_batch(embeddings, max(k, self.candidates), filters)
+            for position, embedding, dense in zip(pending, embeddings, dense_hits):
+                if self.lexical is None:
+                    results[position] = (dense[:k], STAGE_DENSE)
+                else:
+                    results[position] = (self._fuse(lexical_hits[position], dense, embedding)[:k], STAGE_HYBRID)
+
+        with self._lock:
+            for _, stage in results:
+                self._stages[stage] += 1
+        return results
+
+    def search(self, query: str, k: int = 5, filters: Optional[Mapping[str, Any]] = None) -> Tuple[List[Hit], str]:
+        return self.search_many([query], k, filters)[0]
+
+    def similarities(self, query: str, rows: Sequence[int]) -> np.ndarray:
+        """Cosine similarity of the query to document rows, for reporting hybrid hits on the
+        dense scale (fused scores are rank-based); encodes the query again, so encode should be cached"""
+        return self.dense.similarities(self.encode([query])[0], rows)
+
+    def _fuse(self, lexical: List[Hit], dense: List[Hit], embedding: np.ndarray) -> List[Hit]:
+        if not lexical:
+            return dense
+        if self.fusion == FUSION_RRF:
+            return reciprocal_rank_fusion([lexical, dense], self.rrf_k)
+        # Re-rank the union of both candidate lists by exact cosine and BM25 score
+        rows = sorted({row for row, _ in lexical} | {row for row, _ in dense})
+        cosines = self.dense.similarities(embedding, rows)
+        return weighted_fusion(dict(lexical), dict(zip(rows, cosines.tolist())), self.dense_weight)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queries decided per stage; lexical_ratio is the share retrieval settled without the embedding model"""
+        with self._lock:
+            total = sum(self._stages.values())
+            return {
+                **self._stages,
+                'lexical_ratio': round(self._stages[STAGE_LEXICAL] / total, 4) if total else 0.0,
+                'fusion': self.fusion if self.lexical is not None and self.dense is not None else None
+            }
@@ -0,0 +1,222 @@
+"""
+Circuit breakers for Samadhan AI LLM providers
+Closed / open / half-open breakers per provider and per WatsonX account, so a
+degraded provider is skipped immediately instead of costing every request its timeout
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """The breaker is open: the call was not attempted"""
+
+
+class CircuitPermit:
+    """Permission for one call; report success or failure, then release"""
+
+    def __init__(self, breaker: 'CircuitBreaker', probe: bool):
+        self.breaker = breaker
+        self.probe = probe
+        self.started_at = time.monotonic()
+        self.duration: Optional[float] = None
+        self._done = False
+
+    def first_token(self):
+        """For streaming calls: judge slowness by time to first token"""
+        if self.duration is None:
+            self.duration = time.monotonic() - self.started_at
+
+    def success(self):
+        if not self._done:
+            self._done = True
+            duration = self.duration if self.duration is not None else time.monotonic() - self.started_at
+            self.breaker._record(self, failed=False, duration=duration)
+
+    def failure(self):
+        if not self._done:
+            self._done = True
+            self.breaker._record(self, failed=True, duration=time.monotonic() - self.started_at)
+
+    def release(self):
+        """End of call without an outcome (e.g. cancelled): frees a half-open probe slot"""
+        if not self._done:
+            self._done = True
+            self.breaker._release(self)
+
+
+class CircuitBreaker:
+    """Count-based sliding-window circuit breaker.
+
+    Closed: calls pass and their outcomes fill a window of the last window_size
+    calls. Once at least minimum_calls are recorded, the breaker opens if the
+    failure rate or the slow-call rate (calls longer than slow_call_seconds)
+    reaches its threshold. Open: calls are rejected for open_seconds. Half-open:
+    up to half_open_calls probe calls pass; if they all succeed without being
+    slow the breaker closes, otherwise it opens again.
+    """
+
+    def __init__(self, name: str, failure_rate_threshold: float = 0.5, slow_call_seconds: float = 10,
+                 slow_call_rate_threshold: float = 0.8, window_size: int = 20, minimum_calls: int = 5,
+                 open_seconds: float = 30, half_open_calls: int = 2):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        # (failed, slow) per call
+        self._window: deque = deque(maxlen=window_size)
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            logger.info(f'🔌 Circuit {self.name} half-open, probing')
+        return self._state
+
+    def allows_calls(self) -> bool:
+        """Whether acquire would currently succeed (no side effects on counters)"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            return state == CLOSED or (state == HALF_OPEN and self._probes_in_flight < self.half_open_calls)
+
+    def acquire(self) -> CircuitPermit:
+        """Permit for one call, or CircuitOpenError while the breaker rejects calls"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return CircuitPermit(self, probe=False)
+            if state == HALF_OPEN and self._probes_in_flight < self.half_open_calls:
+                self._probes_in_flight += 1
+                return CircuitPermit(self, probe=True)
+            self.rejected += 1
+        raise CircuitOpenError(f'Circuit {self.name} is open')
+
+    def _open(self, now: float, reason: str):
+        self._state = OPEN
+        self._opened_at = now
+        self._window.clear()
+        self.times_opened += 1
+        logger.warning(f'🔌 Circuit {self.name} opened ({reason}), skipping for {self.open_seconds:.0f}s')
+
+    def _record(self, permit: CircuitPermit, failed: bool, duration: float):
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            if permit.probe:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if self._state != HALF_OPEN:
+                    return
+                if failed or slow:
+                    self._open(now, 'probe failed' if failed else 'probe slow')
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._state = CLOSED
+                    self._window.clear()
+                    logger.info(f'🔌 Circuit {self.name} closed')
+                return
+
+            if self._state != CLOSED:
+                return
+            self._window.append((failed, slow))
+            calls = len(self._window)
+            if calls < self.minimum_calls:
+                return
+            failure_rate = sum(1 for f, _ in self._window if f) / calls
+            slow_rate = sum(1 for _, s in self._window if s) / calls
+            if failure_rate >= self.failure_rate_threshold:
+                self._open(now, f'failure rate {failure_rate:.0%}')
+            elif slow_rate >= self.slow_call_rate_threshold:
+                self._open(now, f'slow call rate {slow_rate:.0%}')
+
+    def _release(self, permit: CircuitPermit):
+        if permit.probe:
+            with self._lock:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            calls = len(self._window)
+            return {
+                'state': state,
+                'failure_rate': round(sum(1 for f, _ in self._window if f) / calls, 3) if calls else 0.0,
+                'slow_call_rate': round(sum(1 for _, s in self._window if s) / calls, 3) if calls else 0.0,
+                'calls_in_window': calls,
+                'open_for': round(max(0.0, self.open_seconds - (now - self._opened_at)), 1) if state == OPEN else 0.0,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected
+            }
+
+
+class CircuitBreakerRegistry:
+    """Named breakers sharing one set of thresholds, created on first use"""
+
+    def __init__(self, **settings):
+        self._settings = settings
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    breaker = self._breakers[name] = CircuitBreaker(name, **self._settings)
+        return breaker
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.status() for name, breaker in list(self._breakers.items())}
+
+
+def guarded_stream(breaker: CircuitBreaker, stream: Iterable, cancel=None, neutral: tuple = ()) -> Iterator:
+    """Pass a streaming call through a breaker.
+
+    The stream's first item marks its latency, running to the end is a success
+    and an exception is a failure, except for exceptions listed in neutral and
+    for calls cancelled through cancel (a hedging.CancelToken), which are not
+    held against the provider. Raises CircuitOpenError before the stream
+    starts if the breaker is open.
+    """
+    permit = breaker.acquire()
+    try:
+        started = False
+        for item in stream:
+            if not started:
+                started = True
+                permit.first_token()
+            yield item
+        permit.success()
+    except Exception as e:
+        if not isinstance(e, neutral) and not (cancel is not None and cancel.cancelled):
+            permit.failure()
+        raise
+    finally:
+        permit.release()
@@ -0,0 +1,132 @@
+"""
+Runtime configuration for Samadhan AI Backend
+Values are read from environment variables (and .env when python-dotenv is installed)
+"""
+
+import os
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+
+def _watsonx_accounts():
+    """WatsonX accounts from WATSONX_API_KEY, WATSONX_API_KEY_2, WATSONX_API_KEY_3 (and matching URLs)"""
+    primary_url = os.getenv('WATSONX_STREAMING_URL') or os.getenv('WATSONX_URL')
+    default_concurrency = int(os.getenv('WATSONX_MAX_CONCURRENCY', '8'))
+    accounts = []
+    for index, suffix in enumerate(('', '_2', '_3'), start=1):
+        api_key = os.getenv(f'WATSONX_API_KEY{suffix}')
+        if not api_key:
+            continue
+        accounts.append({
+            'name': f'account_{index}',
+            'api_key': api_key,
+            # Accounts without their own URL share the primary deployment
+            'url': os.getenv(f'WATSONX_STREAMING_URL{suffix}') or os.getenv(f'WATSONX_URL{suffix}') or primary_url,
+            'deployment_id': os.getenv(f'WATSONX_DEPLOYMENT_ID{suffix}'),
+            'max_concurrency': int(os.getenv(f'WATSONX_MAX_CONCURRENCY{suffix}', default_concurrency))
+        })
+    return accounts
+
+
+class Config:
+    """Runtime configuration loaded from the environment"""
+
+    # Server
+    PORT = int(os.getenv('PORT', '5000'))
+    FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:5173')
+
+    # WatsonX (primary account)
+    WATSONX_API_KEY = os.getenv('WATSONX_API_KEY')
+    WATSONX_URL = os.getenv('WATSONX_URL')
+    WATSONX_STREAMING_URL = os.getenv('WATSONX_STREAMING_URL') or WATSONX_URL
+
+    # WatsonX account pool (primary plus optional _2/_3 accounts)
+    WATSONX_ACCOUNTS = _watsonx_accounts()
+    WATSONX_THROTTLE_COOLDOWN = float(os.getenv('WATSONX_THROTTLE_COOLDOWN', '30'))
+    WATSONX_ACQUIRE_TIMEOUT = float(os.getenv('WATSONX_ACQUIRE_TIMEOUT', '2'))
+
+    # OpenRouter
+    OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
+
+    # Pooled HTTP clients (timeouts in seconds)
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+    IAM_READ_TIMEOUT = float(os.getenv('IAM_READ_TIMEOUT', '15'))
+    WATSONX_READ_TIMEOUT = float(os.getenv('WATSONX_TIMEOUT', '60'))
+    OPENROUTER_READ_TIMEOUT = float(os.getenv('OPENROUTER_TIMEOUT', '30'))
+
+    # Circuit breakers per provider and per WatsonX account (rates 0..1, times in seconds)
+    CIRCUIT_FAILURE_RATE_THRESHOLD = float(os.getenv('CIRCUIT_FAILURE_RATE_THRESHOLD', '0.5'))
+    CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv('CIRCUIT_SLOW_CALL_SECONDS', '10'))
+    CIRCUIT_SLOW_CALL_RATE_THRESHOLD = float(os.getenv('CIRCUIT_SLOW_CALL_RATE_THRESHOLD', '0.8'))
+    CIRCUIT_WINDOW_SIZE = int(os.getenv('CIRCUIT_WINDOW_SIZE', '20'))
+    CIRCUIT_MINIMUM_CALLS = int(os.getenv('CIRCUIT_MINIMUM_CALLS', '5'))
+    CIRCUIT_OPEN_SECONDS = float(os.getenv('CIRCUIT_OPEN_SECONDS', '30'))
+    CIRCUIT_HALF_OPEN_CALLS = int(os.getenv('CIRCUIT_HALF_OPEN_CALLS', '2'))
+
+    # Hedged WatsonX/OpenRouter racing (seconds; 0 disables a trigger)
+    HEDGE_ENABLED = os.getenv('HEDGE_ENABLED', 'true').lower() == 'true'
+    HEDGE_DELAY = float(os.getenv('HEDGE_DELAY', '6'))
+    HEDGE_FIRST_TOKEN_DEADLINE = float(os.getenv('HEDGE_FIRST_TOKEN_DEADLINE', '2'))
+
+    # Start response generation from the local classification while the LLM analysis runs
+    PIPELINE_ENABLED = os.getenv('PIPELINE_ENABLED', 'true').lower() == 'true'
+    PIPELINE_MAX_WORKERS = int(os.getenv('PIPELINE_MAX_WORKERS', '32'))
+    # Opt-in: one provider call returns the analysis and the reply together
+    COMBINED_PROMPT_ENABLED = os.getenv('COMBINED_PROMPT_ENABLED', 'false').lower() == 'true'
+
+    # Deployment profile: 'lite' runs without torch (TF-IDF embeddings, see requirements-lite.txt)
+    DEPLOYMENT_PROFILE = os.getenv('DEPLOYMENT_PROFILE', 'full').lower()
+
+    # Embeddings: backend is auto (sentence transformer if installed, else none), sentence-transformers, tfidf
+    # or none (local analysis on BM25 and the keyword rules)
+    EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'tfidf' if DEPLOYMENT_PROFILE == 'lite' else 'auto').lower()
+    EMBEDDING_MODEL_NAME = os.getenv('EMBEDDING_MODEL_NAME', 'all-MiniLM-L6-v2')
+    TFIDF_EMBEDDING_DIMENSIONS = int(os.getenv('TFIDF_EMBEDDING_DIMENSIONS', '256'))
+    EMBEDDING_CACHE_DIR = os.getenv('EMBEDDING_CACHE_DIR', os.path.join('.cache', 'embeddings'))
+    # Memory budget of the in-process query embedding LRU cache (MiB)
+    QUERY_EMBEDDING_CACHE_MB = float(os.getenv('QUERY_EMBEDDING_CACHE_MB', '32'))
+
+    # Retrieval: neighbours voting on the department, FAISS above this corpus size, /api/ai/similar limit
+    RETRIEVAL_VOTE_K = int(os.getenv('RETRIEVAL_VOTE_K', '5'))
+    RETRIEVAL_FAISS_MIN_DOCS = int(os.getenv('RETRIEVAL_FAISS_MIN_DOCS', '5000'))
+    SIMILAR_MAX_K = int(os.getenv('SIMILAR_MAX_K', '50'))
+
+    # BM25 first stage: complaints whose top hits agree skip the embedding model; the rest
+    # fuse BM25 and dense candidates ('rrf' or 'weighted')
+    LEXICAL_RETRIEVAL_ENABLED = os.getenv('LEXICAL_RETRIEVAL_ENABLED', 'true').lower() == 'true'
+    BM25_K1 = float(os.getenv('BM25_K1', '1.2'))
+    BM25_B = float(os.getenv('BM25_B', '0.75'))
+    LEXICAL_CONFIDENT_SHARE = float(os.getenv('LEXICAL_CONFIDENT_SHARE', '0.8'))
+    LEXICAL_CONFIDENT_SCORE = float(os.getenv('LEXICAL_CONFIDENT_SCORE', '0.15'))
+    LEXICAL_CONFIDENT_HITS = int(os.getenv('LEXICAL_CONFIDENT_HITS', '3'))
+    HYBRID_FUSION = os.getenv('HYBRID_FUSION', 'rrf').lower()
+    HYBRID_DENSE_WEIGHT = float(os.getenv('HYBRID_DENSE_WEIGHT', '0.5'))
+    HYBRID_CANDIDATES = int(os.getenv('HYBRID_CANDIDATES', '20'))
+
+    # Response cache (TTL in seconds)
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '2048'))
+    RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+    # Paraphrase cache: minimum cosine similarity of complaint embeddings for a hit
+    SEMANTIC_CACHE_SIZE = int(os.getenv('SEMANTIC_CACHE_SIZE', '1024'))
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.9'))
+
+    # /api/up/data and /api/dataset/stats: browser cache lifetime in seconds (0 = revalidate with the ETag every time)
+    STATIC_RESPONSE_MAX_AGE = int(os.getenv('STATIC_RESPONSE_MAX_AGE', '0'))
+
+    # ASGI serving mode (asgi_app.py): outbound connections per provider, CPU worker threads
+    ASGI_MAX_CONNECTIONS = int(os.getenv('ASGI_MAX_CONNECTIONS', '100'))
+    ASGI_CPU_WORKERS = int(os.getenv('ASGI_CPU_WORKERS', '4'))
+
+    # Batch analysis (at least one worker)
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '500'))
+    BATCH_MAX_CONCURRENCY = max(1, int(os.getenv('BATCH_MAX_CONCURRENCY', '8')))
+
+
+config = Config()
+
+__all__ = ['Config', 'config']
@@ -0,0 +1,103 @@
+"""
+Persisted document-embedding matrix for Samadhan AI
+Encodes the RAG corpus once, saves it as a versioned .npy artifact and memory-maps it on startup
+"""
+
+import os
+import json
+import hashlib
+import logging
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout or normalisation changes
+ARTIFACT_FORMAT_VERSION = 1
+
+
+def compute_corpus_hash(doc_texts: List[str], model_name: str) -> str:
+    """Content hash of the corpus texts and the model that embeds them"""
+    digest = hashlib.sha256()
+    digest.update(f'v{ARTIFACT_FORMAT_VERSION}:{model_name}'.encode('utf-8'))
+    digest.update(json.dumps(doc_texts, ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    """Row-wise L2 normalisation (zero rows are left untouched)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class CorpusEmbeddings:
+    """L2-normalised embedding matrix for the RAG corpus, one row per document"""
+
+    def __init__(self, matrix: np.ndarray, corpus_hash: str, model_name: str):
+        self.matrix = matrix
+        self.corpus_hash = corpus_hash
+        self.model_name = model_name
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @staticmethod
+    def artifact_path(cache_dir: str, model_name: str, corpus_hash: str) -> str:
+        """Path of the versioned artifact for a given model and corpus"""
+        model_slug = model_name.replace('/', '_')
+        return os.path.join(cache_dir, f'corpus-{model_slug}-v{ARTIFACT_FORMAT_VERSION}-{corpus_hash[:16]}.npy')
+
+    @classmethod
+    def load_or_build(cls, model, model_name: str, doc_texts: List[str], cache_dir: str) -> 'CorpusEmbeddings':
+        """Load the artifact for this corpus if present, otherwise encode the corpus and persist it"""
+        corpus_hash = compute_corpus_hash(doc_texts, model_name)
+        path = cls.artifact_path(cache_dir, model_name, corpus_hash)
+
+        matrix = cls._load(path, len(doc_texts))
+        if matrix is not None:
+            logger.info(f'✅ Loaded corpus embeddings from {path} ({matrix.shape[0]} documents)')
+            return cls(matrix, corpus_hash, model_name)
+
+        logger.info(f'🔄 Encoding {len(doc_texts)} corpus documents...')
+        matrix = l2_normalize(model.encode(doc_texts, batch_size=64, convert_to_numpy=True))
+        cls._save(path, matrix)
+        return cls(matrix, corpus_hash, model_name)
+
+    @staticmethod
+    def _load(path: str, expected_rows: int) -> Optional[np.ndarray]:
+        if not os.path.exists(path):
+            return None
+        try:
+            matrix = np.load(path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            logger.warning(f'⚠️ Ignoring unreadable corpus embeddings {path}: {e}')
+            return None
+        if matrix.ndim != 2 or matrix.shape[0] != expected_rows:
+            logger.warning(f'⚠️ Ignoring corpus embeddings {path}: shape {matrix.shape} does not match corpus')
+            return None
+        return matrix
+
+    @staticmethod
+    def _save(path: str, matrix: np.ndarray):
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, matrix)
+            os.replace(tmp_path, path)
+            logger.info(f'✅ Saved corpus embeddings to {path}')
+        except OSError as e:
+            # Read-only filesystems still get the in-memory matrix
+            logger.warning(f'⚠️ Could not persist corpus embeddings: {e}')
+
+    def similarities(self, query_embedding: np.ndarray) -> np.ndarray:
+        """Cosine similarity of one query embedding against every document"""
+        query = l2_normalize(np.asarray(query_embedding).reshape(1, -1))[0]
+        return self.matrix @ query
+
+    def similarity_matrix(self, query_embeddings: np.ndarray) -> np.ndarray:
+        """Cosine similarities for a batch of queries, shape (queries, documents)"""
+        return l2_normalize(query_embeddings) @ self.matrix.T
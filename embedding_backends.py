@@ -0,0 +1,157 @@
+"""
+Embedding backends for Samadhan AI
+A sentence transformer (torch) or a TF-IDF + SVD model fitted on the RAG corpus
+(scikit-learn only), behind the same encode interface
+"""
+
+import json
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKEND_AUTO = 'auto'
+BACKEND_SENTENCE_TRANSFORMERS = 'sentence-transformers'
+BACKEND_TFIDF = 'tfidf'
+BACKEND_NONE = 'none'
+EMBEDDING_BACKENDS = (BACKEND_AUTO, BACKEND_SENTENCE_TRANSFORMERS, BACKEND_TFIDF, BACKEND_NONE)
+
+# Bump when the TF-IDF model changes, so persisted corpus embeddings are rebuilt
+TFIDF_MODEL_VERSION = 2
+# Up to this many documents the SVD is solved exactly from the (documents x documents)
+# Gram matrix, which is ~10x faster than randomized SVD on the bundled corpus
+GRAM_SVD_MAX_DOCUMENTS = 2000
+
+
+class EmbeddingBackend(ABC):
+    """Maps texts to a (texts, dimension) float32 array.
+
+    name identifies the model and everything its vectors depend on; it keys
+    the persisted corpus embeddings, so two backends never share an artifact.
+    kind is the backend family (sentence-transformers or tfidf).
+    """
+
+    kind = ''
+    name = ''
+
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        """Embeddings of texts, one row per text"""
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """Pretrained sentence transformer; imports torch"""
+
+    kind = BACKEND_SENTENCE_TRANSFORMERS
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.name = model_name
+
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True, **kwargs)
+
+
+class TfidfSVDBackend(EmbeddingBackend):
+    """Word and character n-gram TF-IDF reduced by truncated SVD (LSA), fitted on the corpus.
+
+    Character n-grams within word boundaries keep misspellings and inflections
+    ('leaking', 'leakage') close; the SVD maps both into one dense space of at
+    most `dimensions` components so the vectors work with the retrieval index
+    and the semantic cache. Fitting on a few hundred documents takes about
+    0.2s and is deterministic, so the model is refitted at startup rather
+    than persisted. Needs scikit-learn only.
+    """
+
+    kind = BACKEND_TFIDF
+
+    def __init__(self, corpus: Sequence[str], dimensions: int = 256):
+        import sklearn
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.pipeline import make_union
+
+        corpus = list(corpus)
+        if not corpus:
+            raise ValueError('TF-IDF embedding backend needs a non-empty corpus')
+        union = make_union(
+            TfidfVectorizer(analyzer='word', ngram_range=(1, 2), sublinear_tf=True, strip_accents='unicode'),
+            TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 5), sublinear_tf=True, strip_accents='unicode')
+        )
+        features = union.fit_transform(corpus)
+        components = max(1, min(dimensions, features.shape[0] - 1, features.shape[1] - 1))
+        basis = _svd_basis(features, components)
+        components = basis.shape[0]
+
+        # Project each vectorizer's output onto its rows of the SVD basis and sum: the same
+        # vectors as union + svd.transform without stacking the sparse blocks per query
+        projection = np.ascontiguousarray(basis.T, dtype=np.float32)
+        self.vectorizers = [vectorizer for _, vectorizer in union.transformer_list]
+        self.projections = []
+        offset = 0
+        for vectorizer in self.vectorizers:
+            size = len(vectorizer.vocabulary_)
+            self.projections.append(projection[offset:offset + size])
+            offset += size
+
+        corpus_digest = hashlib.sha256(
+            json.dumps([TFIDF_MODEL_VERSION, sklearn.__version__, corpus], ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+        self.name = f'tfidf-svd{components}-{corpus_digest[:12]}'
+        logger.info(f'✅ TF-IDF embedding backend fitted on {len(corpus)} documents ({components} dimensions)')
+
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        texts = list(texts)
+        embeddings = np.zeros((len(texts), self.projections[0].shape[1]), dtype=np.float32)
+        for vectorizer, projection in zip(self.vectorizers, self.projections):
+            embeddings += vectorizer.transform(texts) @ projection
+        return embeddings
+
+
+def _svd_basis(features, components: int) -> np.ndarray:
+    """Top right singular vectors of the sparse features, shape (components, features)"""
+    if features.shape[0] > GRAM_SVD_MAX_DOCUMENTS:
+        from sklearn.decomposition import TruncatedSVD
+        return TruncatedSVD(n_components=components, algorithm='randomized', random_state=0).fit(features).components_
+
+    # X = U S Vt: the eigenvectors of X Xt are U with eigenvalues S^2, and Vt = S^-1 Ut X
+    eigenvalues, eigenvectors = np.linalg.eigh((features @ features.T).toarray())
+    order = np.argsort(eigenvalues)[::-1][:components]
+    singular_values = np.sqrt(np.clip(eigenvalues[order], 0.0, None))
+    # Directions with (numerically) zero singular value carry no signal
+    keep = singular_values > 1e-6 * singular_values[0]
+    return (features.T @ eigenvectors[:, order][:, keep]).T / singular_values[keep][:, None]
+
+
+def load_embedding_backend(backend: str, model_name: str, corpus: Sequence[str],
+                           tfidf_dimensions: int = 256) -> Optional[EmbeddingBackend]:
+    """Embedding backend by name, or None when its dependencies are missing or backend is none
+
+    auto uses the sentence transformer when sentence-transformers (and torch)
+    is installed and otherwise none: local analysis then runs on BM25 and the
+    keyword rules, which classify held-out complaints better than TF-IDF
+    embeddings do (benchmarks/bench_embedding_backends.py). TF-IDF is used only
+    when selected, and never imports torch.
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}' (expected one of {', '.join(EMBEDDING_BACKENDS)})")
+
+    if backend == BACKEND_NONE:
+        return None
+
+    if backend in (BACKEND_AUTO, BACKEND_SENTENCE_TRANSFORMERS):
+        try:
+            return SentenceTransformerBackend(model_name)
+        except ImportError as e:
+            logger.warning(f'⚠️ Sentence transformers not available: {e}')
+            return None
+
+    try:
+        return TfidfSVDBackend(corpus, tfidf_dimensions)
+    except ImportError as e:
+        logger.warning(f'⚠️ scikit-learn not available for the TF-IDF embedding backend: {e}')
+        return None
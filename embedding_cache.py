@@ -0,0 +1,125 @@
+"""
+Query embedding cache for Samadhan AI
+Bounded LRU cache in front of the sentence transformer, so repeated complaint
+texts are encoded once and shared by retrieval, the semantic cache and batches
+"""
+
+import re
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+_WHITESPACE = re.compile(r'\s+')
+
+# Approximate bookkeeping cost of one entry (key, dict slot, array header)
+ENTRY_OVERHEAD_BYTES = 160
+
+
+def embedding_cache_key(text: str) -> bytes:
+    """Digest of the text after Unicode (NFC) and whitespace normalisation"""
+    normalized = _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+
+
+class EmbeddingCache:
+    """Thread-safe LRU cache of float32 query embeddings within a memory budget.
+
+    encode maps a list of texts to a (texts, dim) array. Cached arrays are
+    read-only and shared between callers. Misses of a batch are encoded in one
+    call; concurrent misses on the same text may both encode it.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], Any], max_bytes: int):
+        self._encode = encode
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[bytes, np.ndarray]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def encode(self, text: str) -> np.ndarray:
+        """Embedding of one text"""
+        return self.encode_many([text])[0]
+
+    def peek(self, text: str) -> Optional[np.ndarray]:
+        """Cached embedding of text, or None; never encodes"""
+        key = embedding_cache_key(text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return embedding
+
+    def encode_many(self, texts: Sequence[str]) -> np.ndarray:
+        """Embeddings of texts, shape (len(texts), dim)"""
+        keys = [embedding_cache_key(text) for text in texts]
+        found: Dict[int, np.ndarray] = {}
+        with self._lock:
+            for position, key in enumerate(keys):
+                embedding = self._entries.get(key)
+                if embedding is not None:
+                    self._entries.move_to_end(key)
+                    found[position] = embedding
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        # Each distinct missing text is encoded once, in a single batch
+        missing: Dict[bytes, List[int]] = {}
+        for position, key in enumerate(keys):
+            if position not in found:
+                missing.setdefault(key, []).append(position)
+        if missing:
+            encoded = np.asarray(self._encode([texts[positions[0]] for positions in missing.values()]),
+                                 dtype=np.float32)
+            with self._lock:
+                for (key, positions), embedding in zip(missing.items(), encoded):
+                    embedding = embedding.copy()
+                    embedding.setflags(write=False)
+                    self._store(key, embedding)
+                    for position in positions:
+                        found[position] = embedding
+
+        return np.stack([found[position] for position in range(len(texts))]) if texts else np.empty((0, 0), dtype=np.float32)
+
+    def _store(self, key: bytes, embedding: np.ndarray):
+        size = embedding.nbytes + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.nbytes + ENTRY_OVERHEAD_BYTES
+        self._entries[key] = embedding
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes + ENTRY_OVERHEAD_BYTES
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and memory use for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions
+            }
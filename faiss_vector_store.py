@@ -0,0 +1,335 @@
+"""
+Persistent FAISS vector store for the LangChain RAG system
+Native FAISS index file plus a JSON docstore and a manifest, memory-mapped on
+load; runtime inserts go to an append-only log that is compacted periodically.
+Worker processes sharing the directory serialise writes with an fcntl lock
+"""
+
+import os
+import json
+import base64
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import faiss
+from langchain.docstore.in_memory import InMemoryDocstore
+from langchain.schema import Document
+from langchain.vectorstores import FAISS
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: only threads of one process are serialised
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout changes
+STORE_FORMAT_VERSION = 1
+
+INDEX_FILE = 'index.faiss'
+DOCSTORE_FILE = 'docstore.json'
+MANIFEST_FILE = 'manifest.json'
+APPEND_LOG_FILE = 'appends.jsonl'
+LOCK_FILE = 'store.lock'
+
+
+def compute_documents_hash(documents: List[Document], model_name: str) -> str:
+    """Content hash of the knowledge base documents and the model that embeds them"""
+    digest = hashlib.sha256()
+    digest.update(f'v{STORE_FORMAT_VERSION}:{model_name}'.encode('utf-8'))
+    digest.update(json.dumps(
+        [[doc.page_content, doc.metadata] for doc in documents], ensure_ascii=False, sort_keys=True, default=str
+    ).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _write_atomic(path: str, write):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class PersistentFAISSStore:
+    """LangChain FAISS store persisted as native files.
+
+    Layout of directory:
+      index.faiss    FAISS index of the last snapshot (memory-mapped when FAISS supports it)
+      docstore.json  documents of the snapshot, in index order
+      manifest.json  format version, embedding model, knowledge base hash and counts
+      appends.jsonl  documents added since the snapshot, with their embeddings
+
+    A snapshot whose manifest does not match the current knowledge base or
+    embedding model is rebuilt; documents added at runtime are kept and
+    re-embedded. An insert embeds one document and appends one log line, and
+    every compact_every inserts the log is folded into a new snapshot.
+
+    Several processes (gunicorn workers) may share the directory: loading,
+    inserts and compaction hold an exclusive lock on store.lock, and a writer
+    first catches up with the snapshot generation and log entries written by
+    the others, so positions stay unique and no entry is lost to a compaction.
+    """
+
+    def __init__(self, directory: str, embeddings, model_name: str, compact_every: int = 500):
+        self.directory = directory
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.compact_every = compact_every
+        self.vector_store: Optional[FAISS] = None
+        self._base_documents = 0
+        self._corpus_hash: Optional[str] = None
+        self._log_entries = 0
+        self._log_offset = 0
+        self._generation = 0
+        self._mmapped = False
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _process_lock(self):
+        """Exclusive lock shared by every process using the directory (taken after self._lock)"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(LOCK_FILE), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Closing the file releases the lock
+            yield
+
+    def load_or_build(self, documents: List[Document]) -> FAISS:
+        """Load the snapshot for this knowledge base and replay the log, or rebuild it"""
+        corpus_hash = compute_documents_hash(documents, self.model_name)
+        # Held while rebuilding too: a worker starting at the same time waits and loads the result
+        with self._lock, self._process_lock():
+            return self._load_or_build(documents, corpus_hash)
+
+    def _load_or_build(self, documents: List[Document], corpus_hash: str) -> FAISS:
+        manifest = self._read_manifest()
+        if (manifest and manifest.get('format_version') == STORE_FORMAT_VERSION
+                and manifest.get('embedding_model') == self.model_name
+                and manifest.get('corpus_hash') == corpus_hash):
+            try:
+                self._load_snapshot(manifest)
+                self._replay_log()
+                logger.info(f'✅ Loaded vector store from {self.directory} ({self.vector_store.index.ntotal} documents)')
+                return self.vector_store
+            except (OSError, ValueError, KeyError, RuntimeError) as e:
+                logger.warning(f'⚠️ Vector store in {self.directory} unreadable, rebuilding: {e}')
+        else:
+            logger.info(f'🔄 Vector store in {self.directory} missing or stale, rebuilding')
+
+        added = self._read_added_documents(manifest)
+        self._generation = manifest.get('generation', 0) if manifest else 0
+        self._build(documents, added, corpus_hash)
+        return self.vector_store
+
+    def add_documents(self, documents: List[Document]) -> List[str]:
+        """Embed and insert documents; cost does not grow with the store size"""
+        vectors = self.embeddings.embed_documents([doc.page_content for doc in documents])
+        ids = []
+        with self._lock, self._process_lock():
+            self._sync()
+            self._ensure_writable()
+            with open(self._path(APPEND_LOG_FILE), 'a', encoding='utf-8') as log:
+                for doc, vector in zip(documents, vectors):
+                    position = self._add(doc, vector)
+                    log.write(json.dumps({
+                        'position': position,
+                        'page_content': doc.page_content,
+                        'metadata': doc.metadata,
+                        'embedding': base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode('ascii')
+                    }, ensure_ascii=False, default=str) + '\n')
+                    ids.append(str(position))
+                log.flush()
+                self._log_offset = log.tell()
+            self._log_entries += len(documents)
+            if self._log_entries >= self.compact_every:
+                self._write_snapshot()
+        return ids
+
+    def compact(self):
+        """Fold the append log into a new snapshot"""
+        with self._lock, self._process_lock():
+            self._sync()
+            self._write_snapshot()
+
+    def _sync(self):
+        """Catch up with snapshots and log entries written by other processes (both locks held)"""
+        manifest = self._read_manifest()
+        if manifest and manifest.get('generation', 0) != self._generation:
+            self._load_snapshot(manifest)
+        self._replay_log()
+
+    def _add(self, doc: Document, vector) -> int:
+        position = self.vector_store.index.ntotal
+        self.vector_store.add_embeddings([(doc.page_content, list(vector))], metadatas=[doc.metadata],
+                                         ids=[str(position)])
+        return position
+
+    def _ensure_writable(self):
+        """A memory-mapped index is read-only: copy it into memory before the first insert"""
+        if self._mmapped:
+            self.vector_store.index = faiss.clone_index(self.vector_store.index)
+            self._mmapped = False
+
+    def _wrap(self, index, documents: List[Document]) -> FAISS:
+        return FAISS(
+            self.embeddings,
+            index,
+            InMemoryDocstore({str(i): doc for i, doc in enumerate(documents)}),
+            {i: str(i) for i in range(len(documents))}
+        )
+
+    def _build(self, documents: List[Document], added: List[Document], corpus_hash: str):
+        all_documents = documents + added
+        logger.info(f'🔄 Embedding {len(all_documents)} documents for the vector store...')
+        vectors = np.asarray(self.embeddings.embed_documents([doc.page_content for doc in all_documents]),
+                             dtype=np.float32)
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+        self.vector_store = self._wrap(index, all_documents)
+        self._mmapped = False
+        self._base_documents = len(documents)
+        self._corpus_hash = corpus_hash
+        self._write_snapshot()
+
+    def _documents(self) -> List[Document]:
+        store = self.vector_store
+        return [store.docstore.search(store.index_to_docstore_id[i]) for i in range(store.index.ntotal)]
+
+    def _write_snapshot(self):
+        """Write index, docstore and manifest (the manifest last, as the commit point), then clear the log
+
+        Called with both locks held, so no other process appends between the
+        snapshot and the truncation.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        index = self.vector_store.index
+        documents = self._documents()
+        _write_atomic(self._path(INDEX_FILE), lambda path: faiss.write_index(index, path))
+
+        def write_json(payload):
+            def write(path):
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(payload, f, ensure_ascii=False, default=str)
+            return write
+
+        _write_atomic(self._path(DOCSTORE_FILE), write_json(
+            [{'page_content': doc.page_content, 'metadata': doc.metadata} for doc in documents]
+        ))
+        _write_atomic(self._path(MANIFEST_FILE), write_json({
+            'format_version': STORE_FORMAT_VERSION,
+            'embedding_model': self.model_name,
+            'corpus_hash': self._corpus_hash,
+            'base_documents': self._base_documents,
+            'documents': index.ntotal,
+            'dimension': index.d,
+            'generation': self._generation + 1
+        }))
+        open(self._path(APPEND_LOG_FILE), 'w').close()
+        self._generation += 1
+        self._log_entries = 0
+        self._log_offset = 0
+        logger.info(f'✅ Vector store snapshot written to {self.directory} ({index.ntotal} documents)')
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(MANIFEST_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_docstore(self) -> List[Document]:
+        with open(self._path(DOCSTORE_FILE), encoding='utf-8') as f:
+            return [Document(page_content=entry['page_content'], metadata=entry['metadata']) for entry in json.load(f)]
+
+    def _load_snapshot(self, manifest: Dict[str, Any]):
+        try:
+            index = faiss.read_index(self._path(INDEX_FILE), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            mmapped = True
+        except RuntimeError:
+            # Index types without mmap support are read into memory
+            index = faiss.read_index(self._path(INDEX_FILE))
+            mmapped = False
+        documents = self._read_docstore()
+        if index.ntotal != len(documents) or index.ntotal != manifest.get('documents'):
+            raise ValueError(f'index has {index.ntotal} vectors, docstore {len(documents)} documents')
+
+        store = self._wrap(index, documents)
+        if self.vector_store is None:
+            self.vector_store = store
+        else:
+            # Swapped in place: the RAG chain's retriever holds on to this object
+            self.vector_store.index = store.index
+            self.vector_store.docstore = store.docstore
+            self.vector_store.index_to_docstore_id = store.index_to_docstore_id
+        self._mmapped = mmapped
+        self._base_documents = manifest.get('base_documents', len(documents))
+        self._corpus_hash = manifest['corpus_hash']
+        self._generation = manifest.get('generation', 0)
+        self._log_entries = 0
+        self._log_offset = 0
+
+    def _read_log(self, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Complete log entries from byte offset on, in order, and the offset after them;
+        a torn last line from a crash is cut off"""
+        try:
+            with open(self._path(APPEND_LOG_FILE), 'rb') as log:
+                log.seek(offset)
+                data = log.read()
+        except FileNotFoundError:
+            return [], 0
+
+        entries = []
+        valid_bytes = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b'\n'):
+                break
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+            valid_bytes += len(line)
+        if valid_bytes < len(data):
+            logger.warning('⚠️ Dropping incomplete vector store log entry')
+            with open(self._path(APPEND_LOG_FILE), 'r+b') as log:
+                log.truncate(offset + valid_bytes)
+        return entries, offset + valid_bytes
+
+    def _replay_log(self):
+        """Add log entries past self._log_offset to the index"""
+        entries, self._log_offset = self._read_log(self._log_offset)
+        replayed = 0
+        for entry in entries:
+            position = entry['position']
+            # Entries already folded into the snapshot (crash during compaction) are skipped
+            if position < self.vector_store.index.ntotal:
+                continue
+            if position > self.vector_store.index.ntotal:
+                logger.warning(f'⚠️ Vector store log has a gap at {position}, ignoring the rest')
+                break
+            self._ensure_writable()
+            vector = np.frombuffer(base64.b64decode(entry['embedding']), dtype=np.float32)
+            self._add(Document(page_content=entry['page_content'], metadata=entry['metadata']), vector)
+            replayed += 1
+        self._log_entries += replayed
+        if self._log_entries >= self.compact_every:
+            self._write_snapshot()
+
+    def _read_added_documents(self, manifest: Optional[Dict[str, Any]]) -> List[Document]:
+        """Documents added at runtime to a previous store, kept across a rebuild"""
+        snapshot: List[Document] = []
+        if manifest:
+            try:
+                snapshot = self._read_docstore()
+            except (OSError, ValueError, KeyError):
+                snapshot = []
+        added = snapshot[manifest.get('base_documents', 0):] if snapshot else []
+        added.extend(Document(page_content=entry['page_content'], metadata=entry['metadata'])
+                     for entry in self._read_log()[0] if entry['position'] >= len(snapshot))
+        return added
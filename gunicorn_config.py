@@ -1,3 +1,32 @@
+import gc
+import os
+
 bind = "0.0.0.0:10000"
 workers = 2
 timeout = 120
+
+# Import the app once in the master: the embedding model, corpus embeddings and
+# indexes are loaded before forking and shared copy-on-write by every worker,
+# including the ones started by --max-requests recycling
+preload_app = True
+
+# HuggingFace tokenizers' thread pool does not survive fork
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+
+def when_ready(server):
+    """Load and warm the embedding model in the master, before any worker is forked"""
+    from app import initialize_runtime
+    initialize_runtime()
+    # Move the loaded objects out of the collector's reach, so GC passes in the
+    # workers do not write to (and thereby copy) the shared pages
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    """Open pooled provider connections as soon as a worker has loaded the app"""
+    from app import initialize_runtime
+    from http_clients import prewarm_http_clients
+    # No-op when the master already did it; loads per worker if preloading is turned off
+    initialize_runtime()
+    prewarm_http_clients()
@@ -0,0 +1,304 @@
+"""
+Hedged provider racing for Samadhan AI
+Starts the secondary LLM provider when the primary is slow instead of waiting
+for it to fail, keeps the first usable answer and cancels the rest
+"""
+
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# open_stream(cancel_token) -> iterator of content deltas
+StreamFactory = Callable[['CancelToken'], Iterable[str]]
+
+
+class CancelToken:
+    """Cancellation flag for one provider call.
+
+    Providers bind their streaming HTTP response to the token; cancelling
+    closes it, which drops the connection instead of reading the rest of an
+    answer nobody will use.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._closeables: List[Any] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def bind(self, closeable: Any):
+        """Close closeable on cancellation (immediately if already cancelled)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._closeables.append(closeable)
+                return
+        self._close(closeable)
+
+    def cancel(self):
+        with self._lock:
+            self._event.set()
+            closeables, self._closeables = self._closeables, []
+        for closeable in closeables:
+            self._close(closeable)
+
+    @staticmethod
+    def _close(closeable: Any):
+        try:
+            closeable.close()
+        except Exception:
+            pass
+
+
+class ProviderRaceError(Exception):
+    """Every provider in the race failed before producing an answer"""
+
+    def __init__(self, errors: Dict[str, BaseException]):
+        self.errors = errors
+        details = '; '.join(f'{name}: {error}' for name, error in errors.items()) or 'no providers'
+        super().__init__(f'All providers failed ({details})')
+
+
+def _percentile(samples: Sequence[float], fraction: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 1)
+
+
+class RaceStats:
+    """Per-provider win, cancellation, failure and latency counters"""
+
+    def __init__(self, window: int = 256):
+        self._lock = threading.Lock()
+        self._window = window
+        self.races = 0
+        self.hedges: Dict[str, int] = {}
+        self._providers: Dict[str, Dict[str, Any]] = {}
+
+    def _provider(self, name: str) -> Dict[str, Any]:
+        entry = self._providers.get(name)
+        if entry is None:
+            entry = self._providers[name] = {
+                'started': 0, 'wins': 0, 'cancelled': 0, 'failures': 0,
+                'first_token_ms': deque(maxlen=self._window),
+                'answer_ms': deque(maxlen=self._window)
+            }
+        return entry
+
+    def record_race(self):
+        with self._lock:
+            self.races += 1
+
+    def record_hedge(self, reason: str):
+        with self._lock:
+            self.hedges[reason] = self.hedges.get(reason, 0) + 1
+
+    def record_start(self, name: str):
+        with self._lock:
+            self._provider(name)['started'] += 1
+
+    def record_first_token(self, name: str, elapsed: float):
+        with self._lock:
+            self._provider(name)['first_token_ms'].append(elapsed * 1000)
+
+    def record_win(self, name: str, elapsed: float):
+        with self._lock:
+            entry = self._provider(name)
+            entry['wins'] += 1
+            entry['answer_ms'].append(elapsed * 1000)
+
+    def record_cancel(self, name: str):
+        with self._lock:
+            self._provider(name)['cancelled'] += 1
+
+    def record_failure(self, name: str):
+        with self._lock:
+            self._provider(name)['failures'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus p50/p95 latencies (milliseconds, measured from each provider's start)"""
+        with self._lock:
+            providers = {}
+            for name, entry in self._providers.items():
+                first_token, answer = list(entry['first_token_ms']), list(entry['answer_ms'])
+                providers[name] = {
+                    'started': entry['started'],
+                    'wins': entry['wins'],
+                    'cancelled': entry['cancelled'],
+                    'failures': entry['failures'],
+                    'first_token_ms_p50': _percentile(first_token, 0.5),
+                    'first_token_ms_p95': _percentile(first_token, 0.95),
+                    'answer_ms_p50': _percentile(answer, 0.5),
+                    'answer_ms_p95': _percentile(answer, 0.95)
+                }
+            return {'races': self.races, 'hedges': dict(self.hedges), 'providers': providers}
+
+
+class _RaceInterrupt:
+    """Bound to a caller's CancelToken: wakes the race loop when the whole race is cancelled"""
+
+    def __init__(self, events: 'queue.Queue'):
+        self._events = events
+
+    def close(self):
+        self._events.put(('cancelled', None, None))
+
+
+class _Runner:
+    """One provider call running on its own thread"""
+
+    def __init__(self, name: str, open_stream: StreamFactory, events: 'queue.Queue'):
+        self.name = name
+        self.cancel_token = CancelToken()
+        self.started_at = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.parts: List[str] = []
+        self.finished = False
+        self._open_stream = open_stream
+        self._events = events
+        threading.Thread(target=self._run, name=f'race-{name}', daemon=True).start()
+
+    def _run(self):
+        try:
+            for content in self._open_stream(self.cancel_token):
+                if self.cancel_token.cancelled:
+                    return
+                self._events.put(('delta', self, content))
+            self._events.put(('done', self, None))
+        except Exception as e:
+            if not self.cancel_token.cancelled:
+                self._events.put(('error', self, e))
+
+
+def race_providers(providers: Sequence[Tuple[str, StreamFactory]], hedge_delay: float,
+                   first_token_deadline: float, stats: Optional[RaceStats] = None,
+                   commit_on_first_token: bool = False, cancel: Optional[CancelToken] = None) -> Iterator[Tuple[str, str]]:
+    """Run providers in priority order, hedging slow ones, and yield the winner's answer.
+
+    The next provider starts when the previous one fails, when it has produced
+    no token within first_token_deadline seconds, or when it has not finished
+    within hedge_delay seconds (a value <= 0 disables that trigger).
+
+    Yields ('provider', name) once a winner is chosen, followed by ('delta', text).
+    With commit_on_first_token the first provider to emit a token wins and its
+    deltas are passed through as they arrive (for streaming); otherwise the first
+    provider to finish with a non-empty answer wins and its full text is yielded
+    as one delta. Losers are cancelled. Raises ProviderRaceError if every
+    provider fails before a winner is chosen; an error from the winner after
+    that is re-raised as is. Cancelling cancel stops the whole race: every
+    provider is cancelled and the generator returns without (more) deltas.
+    """
+    events: 'queue.Queue' = queue.Queue()
+    pending = list(providers)
+    runners: List[_Runner] = []
+    errors: Dict[str, BaseException] = {}
+    winner: Optional[_Runner] = None
+
+    def launch(reason: Optional[str] = None):
+        name, open_stream = pending.pop(0)
+        if reason and stats:
+            stats.record_hedge(reason)
+        if reason:
+            logger.info(f'🏁 Hedging to {name} ({reason})')
+        if stats:
+            stats.record_start(name)
+        runners.append(_Runner(name, open_stream, events))
+
+    def next_hedge() -> Optional[Tuple[float, str]]:
+        """(monotonic time, reason) at which the next pending provider starts"""
+        if not pending:
+            return None
+        latest = runners[-1]
+        triggers = []
+        if hedge_delay > 0:
+            triggers.append((latest.started_at + hedge_delay, 'hedge_delay'))
+        if first_token_deadline > 0 and not any(runner.first_token_at for runner in runners):
+            triggers.append((latest.started_at + first_token_deadline, 'first_token_deadline'))
+        return min(triggers) if triggers else None
+
+    def choose(runner: _Runner):
+        nonlocal winner
+        winner = runner
+        for other in runners:
+            if other is not runner and not other.finished:
+                other.cancel_token.cancel()
+                other.finished = True
+                if stats:
+                    stats.record_cancel(other.name)
+
+    if cancel is not None:
+        if cancel.cancelled:
+            return
+        cancel.bind(_RaceInterrupt(events))
+    if stats:
+        stats.record_race()
+    if not pending:
+        raise ProviderRaceError(errors)
+    launch()
+
+    try:
+        while True:
+            hedge = next_hedge() if winner is None else None
+            timeout = None if hedge is None else max(0.0, hedge[0] - time.monotonic())
+            try:
+                kind, runner, payload = events.get(timeout=timeout)
+            except queue.Empty:
+                launch(hedge[1])
+                continue
+
+            if kind == 'cancelled':
+                return
+            if winner is not None and runner is not winner:
+                continue
+
+            if kind == 'delta':
+                if runner.first_token_at is None:
+                    runner.first_token_at = time.monotonic()
+                    if stats:
+                        stats.record_first_token(runner.name, runner.first_token_at - runner.started_at)
+                if winner is runner:
+                    yield 'delta', payload
+                    continue
+                runner.parts.append(payload)
+                if commit_on_first_token:
+                    choose(runner)
+                    yield 'provider', runner.name
+                    yield 'delta', ''.join(runner.parts)
+                continue
+
+            runner.finished = True
+            if kind == 'done' and (winner is runner or runner.parts):
+                if winner is None:
+                    choose(runner)
+                    yield 'provider', runner.name
+                    yield 'delta', ''.join(runner.parts)
+                if stats:
+                    stats.record_win(runner.name, time.monotonic() - runner.started_at)
+                return
+
+            # Failed, or finished without producing any text
+            error = payload if kind == 'error' else Exception(f'{runner.name} returned an empty answer')
+            if stats:
+                stats.record_failure(runner.name)
+            if winner is runner:
+                raise error
+            logger.warning(f'⚠️ {runner.name} failed in race: {error}')
+            errors[runner.name] = error
+            if pending:
+                launch('failure')
+            elif all(r.finished for r in runners):
+                raise ProviderRaceError(errors)
+    finally:
+        # Also reached when the consumer stops early (e.g. the client disconnected)
+        for runner in runners:
+            if not runner.finished:
+                runner.cancel_token.cancel()
+                runner.finished = True
@@ -0,0 +1,133 @@
+"""
+Pooled keep-alive HTTP clients for Samadhan AI LLM providers
+One requests.Session per provider per worker process, so IAM, WatsonX and
+OpenRouter calls reuse TCP/TLS connections instead of handshaking every time
+"""
+
+import os
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class PooledHTTPClient:
+    """Keep-alive session with a bounded connection pool and split connect/read timeouts
+
+    origins lists further hosts the client talks to (e.g. WatsonX accounts in
+    other regions); each gets its own pool and is pre-warmed with base_url.
+    """
+
+    def __init__(self, name: str, base_url: Optional[str], pool_size: int,
+                 connect_timeout: float, read_timeout: float, origins: Sequence[Optional[str]] = ()):
+        self.name = name
+        self.base_url = base_url
+        self.origins: List[str] = list(dict.fromkeys(origin for origin in (base_url, *origins) if origin))
+        self.pool_size = pool_size
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self._session: Optional[requests.Session] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """Session owned by the current process (sockets are never shared across a fork)"""
+        pid = os.getpid()
+        if self._session is None or self._pid != pid:
+            with self._lock:
+                if self._session is None or self._pid != pid:
+                    self._session = self._create_session()
+                    self._pid = pid
+        return self._session
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        # Retries are handled by the provider fallback chain, not by urllib3
+        adapter = HTTPAdapter(pool_connections=max(4, len(self.origins)), pool_maxsize=self.pool_size, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.post(url, **kwargs)
+
+    def prewarm(self) -> bool:
+        """Open a pooled connection to each origin ahead of the first real request; True if any opened"""
+        warmed = False
+        for origin in self.origins:
+            try:
+                self.session.head(origin, timeout=(self.timeout[0], self.timeout[0]), allow_redirects=False)
+                warmed = True
+            except requests.RequestException as e:
+                logger.warning(f'⚠️ Could not pre-warm {self.name} connection to {origin}: {e}')
+        return warmed
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+def _origin(url: Optional[str]) -> Optional[str]:
+    if not url:
+        return None
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}' if parts.scheme and parts.netloc else None
+
+
+_clients: Dict[str, PooledHTTPClient] = {}
+_clients_lock = threading.Lock()
+
+
+def _build_client(name: str) -> PooledHTTPClient:
+    if name == 'ibm_iam':
+        return PooledHTTPClient(name, 'https://iam.cloud.ibm.com', config.HTTP_POOL_SIZE,
+                                config.HTTP_CONNECT_TIMEOUT, config.IAM_READ_TIMEOUT)
+    if name == 'watsonx':
+        # Accounts of the pool may have their own deployment URL (WATSONX_URL_2, ...)
+        return PooledHTTPClient(name, _origin(config.WATSONX_STREAMING_URL), config.HTTP_POOL_SIZE,
+                                config.HTTP_CONNECT_TIMEOUT, config.WATSONX_READ_TIMEOUT,
+                                origins=[_origin(account['url']) for account in config.WATSONX_ACCOUNTS])
+    if name == 'openrouter':
+        return PooledHTTPClient(name, 'https://openrouter.ai', config.HTTP_POOL_SIZE,
+                                config.HTTP_CONNECT_TIMEOUT, config.OPENROUTER_READ_TIMEOUT)
+    raise ValueError(f'Unknown HTTP client: {name}')
+
+
+def get_http_client(name: str) -> PooledHTTPClient:
+    """Shared client for a provider: 'ibm_iam', 'watsonx' or 'openrouter'"""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = _build_client(name)
+    return client
+
+
+def prewarm_http_clients(background: bool = True):
+    """Open connections to the configured providers (at worker start)"""
+    names = []
+    if config.WATSONX_ACCOUNTS:
+        names.extend(['ibm_iam', 'watsonx'])
+    if config.OPENROUTER_API_KEY:
+        names.append('openrouter')
+
+    def warm():
+        warmed = [name for name in names if get_http_client(name).prewarm()]
+        if warmed:
+            logger.info(f'✅ Pre-warmed HTTP connections: {", ".join(warmed)}')
+
+    if background:
+        threading.Thread(target=warm, name='http-prewarm', daemon=True).start()
+    else:
+        warm()
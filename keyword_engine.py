@@ -0,0 +1,183 @@
+"""
+Multi-pattern keyword engine for Samadhan AI rule-based analysis
+Aho-Corasick automaton that finds every category, priority and sentiment keyword in one pass
+"""
+
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+# Start of every word: a word character not preceded by another word character
+_WORD_START = re.compile(r'\b\w')
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton over lowercase patterns.
+
+    With word_start=True a match must begin at a word boundary, so 'road' does
+    not fire inside 'broad'. Matches may end mid-word by default, which keeps
+    plurals and stems working ('street light' still matches 'street lights').
+
+    When matches must start on a word boundary the failure links can never
+    produce a valid hit that the trie walk from that word start would miss, so
+    the scan only walks the trie from word starts (located by the C regex
+    engine) instead of stepping the automaton through every character.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]], word_start: bool = True, word_end: bool = False):
+        self.word_start = word_start
+        self.word_end = word_end
+
+        # Trie stored as parallel lists indexed by state id
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[int, Any]]] = [[]]
+        # Patterns ending exactly at a state (before failure-link merging)
+        self._terminals: List[List[Tuple[int, Any]]] = [[]]
+
+        for pattern, payload in patterns:
+            pattern = pattern.lower()
+            if pattern:
+                self._add(pattern, payload)
+        self._build_failure_links()
+
+    def _add(self, pattern: str, payload: Any):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+                self._terminals.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._outputs[state].append((len(pattern), payload))
+        self._terminals[state].append((len(pattern), payload))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # Inherit matches that end at the same position through the failure chain
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """Yield (start, end, payload) for every pattern occurrence in lowercase text"""
+        if self.word_start:
+            yield from self._iter_word_start_matches(text)
+            return
+
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        text_length = len(text)
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not outputs[state]:
+                continue
+            end = index + 1
+            for length, payload in outputs[state]:
+                start = end - length
+                if self.word_end and end < text_length and _is_word_char(text[end]):
+                    continue
+                yield start, end, payload
+
+    def _iter_word_start_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        goto, terminals = self._goto, self._terminals
+        text_length = len(text)
+        for word in _WORD_START.finditer(text):
+            start = word.start()
+            state = 0
+            for index in range(start, text_length):
+                state = goto[state].get(text[index])
+                if state is None:
+                    break
+                for length, payload in terminals[state]:
+                    end = index + 1
+                    if self.word_end and end < text_length and _is_word_char(text[end]):
+                        continue
+                    yield start, end, payload
+
+
+class KeywordHits:
+    """Distinct keyword hits found in one complaint"""
+
+    def __init__(self):
+        self.category_keywords: Dict[str, Set[str]] = {}
+        self.priority_groups: Set[Tuple[str, str]] = set()
+        self.sentiment_keywords: Dict[str, Set[str]] = {}
+        # District names in order of first mention
+        self.districts: List[str] = []
+
+    def category_scores(self, category_order: Iterable[str]) -> Dict[str, int]:
+        """Number of distinct keywords per category, in dataset order"""
+        return {
+            category: len(self.category_keywords[category])
+            for category in category_order
+            if category in self.category_keywords
+        }
+
+    def sentiment_score(self, label: str) -> int:
+        return len(self.sentiment_keywords.get(label, ()))
+
+    @property
+    def district(self) -> Optional[str]:
+        """First district mentioned, if any"""
+        return self.districts[0] if self.districts else None
+
+
+class ComplaintKeywordIndex:
+    """Single automaton over department, priority and sentiment keywords and district names"""
+
+    def __init__(self, departments: Dict[str, Dict[str, Any]], priority_keywords: Dict[str, Dict[str, List[str]]],
+                 sentiment_keywords: Dict[str, List[str]], word_start: bool = True, districts: Iterable[str] = ()):
+        self.categories = list(departments)
+
+        patterns = []
+        for dept_name, dept_info in departments.items():
+            for keyword in dept_info.get('priority_keywords', []):
+                patterns.append((keyword, ('category', dept_name, keyword)))
+        for tier, groups in priority_keywords.items():
+            for group, keywords in groups.items():
+                for keyword in keywords:
+                    patterns.append((keyword, ('priority', (tier, group), keyword)))
+        for label, keywords in sentiment_keywords.items():
+            for keyword in keywords:
+                patterns.append((keyword, ('sentiment', label, keyword)))
+        for district in districts:
+            patterns.append((district, ('district', district, district)))
+
+        self.pattern_count = len(patterns)
+        self._automaton = AhoCorasick(patterns, word_start=word_start)
+
+    def scan(self, text: str) -> KeywordHits:
+        """Collect every category, priority, sentiment and district hit in one pass over the text"""
+        hits = KeywordHits()
+        text = text.lower()
+        for _, end, (kind, key, keyword) in self._automaton.iter_matches(text):
+            if kind == 'district':
+                # District names must match whole words ('Agra' is not in 'Agrawal')
+                if (end == len(text) or not _is_word_char(text[end])) and key not in hits.districts:
+                    hits.districts.append(key)
+            elif kind == 'category':
+                hits.category_keywords.setdefault(key, set()).add(keyword)
+            elif kind == 'priority':
+                hits.priority_groups.add(key)
+            else:
+                hits.sentiment_keywords.setdefault(key, set()).add(keyword)
+        return hits
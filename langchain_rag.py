@@ -7,7 +7,6 @@ import os
 import logging
 from typing import List, Dict, Any, Optional
 import json
-import pickle
 from pathlib import Path
 
 # LangChain imports
@@ -21,8 +20,14 @@ from langchain.prompts import PromptTemplate
 from langchain.chains.question_answering import load_qa_chain
 from langchain.callbacks import get_openai_callback
 
+from faiss_vector_store import PersistentFAISSStore
+
 logger = logging.getLogger(__name__)
 
+EMBEDDING_MODEL = "text-embedding-ada-002"
+VECTOR_STORE_DIR = os.getenv('VECTOR_STORE_DIR', 'vector_store')
+VECTOR_STORE_COMPACT_EVERY = int(os.getenv('VECTOR_STORE_COMPACT_EVERY', '500'))
+
 class SamadhanRAG:
     """Advanced RAG system for government complaint analysis"""
     
@@ -32,6 +37,7 @@ class SamadhanRAG:
         
         self.embeddings = None
         self.vector_store = None
+        self.vector_store_files = None
         self.qa_chain = None
         self.llm = None
         
@@ -127,7 +133,7 @@ class SamadhanRAG:
                 # Initialize OpenAI embeddings
                 self.embeddings = OpenAIEmbeddings(
                     openai_api_key=self.openai_api_key,
-                    model="text-embedding-ada-002"
+                    model=EMBEDDING_MODEL
                 )
                 
                 # Initialize LLM
@@ -154,24 +160,14 @@ class SamadhanRAG:
     def _create_vector_store(self):
         """Create or load vector store"""
         try:
-            vector_store_path = "vector_store.pkl"
-            
-            if os.path.exists(vector_store_path):
-                # Load existing vector store
-                with open(vector_store_path, 'rb') as f:
-                    self.vector_store = pickle.load(f)
-                logger.info("✅ Loaded existing vector store")
-            else:
-                # Create new vector store
-                self.vector_store = FAISS.from_documents(
-                    self.knowledge_base, 
-                    self.embeddings
-                )
-                
-                # Save vector store
-                with open(vector_store_path, 'wb') as f:
-                    pickle.dump(self.vector_store, f)
-                logger.info("✅ Created and saved new vector store")
+            # Native FAISS files checked against the knowledge base and embedding model
+            self.vector_store_files = PersistentFAISSStore(
+                VECTOR_STORE_DIR,
+                self.embeddings,
+                EMBEDDING_MODEL,
+                compact_every=VECTOR_STORE_COMPACT_EVERY
+            )
+            self.vector_store = self.vector_store_files.load_or_build(self.knowledge_base)
                 
         except Exception as e:
             logger.error(f"❌ Error creating vector store: {e}")
@@ -456,11 +452,9 @@ class SamadhanRAG:
                 return False
             
             doc = Document(page_content=content, metadata=metadata or {})
-            self.vector_store.add_documents([doc])
             
-            # Save updated vector store
-            with open("vector_store.pkl", 'wb') as f:
-                pickle.dump(self.vector_store, f)
+            # Appended to the store's log; the full index is only rewritten on compaction
+            self.vector_store_files.add_documents([doc])
             
             logger.info("✅ Document added to knowledge base")
             return True
@@ -475,15 +469,17 @@ class SamadhanRAG:
             if not self.vector_store:
                 return []
             
-            docs = self.vector_store.similarity_search(query, k=k)
+            docs_and_distances = self.vector_store.similarity_search_with_score(query, k=k)
             
+            # FAISS IndexFlatL2 returns squared L2 distances; ada-002 embeddings are
+            # unit length, so cosine similarity = 1 - distance / 2
             return [
                 {
                     'content': doc.page_content,
                     'metadata': doc.metadata,
-                    'similarity_score': 0.8  # Placeholder, FAISS doesn't return scores by default
+                    'similarity_score': round(1.0 - float(distance) / 2.0, 4)
                 }
-                for doc in docs
+                for doc, distance in docs_and_distances
             ]
             
         except Exception as e:
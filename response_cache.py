@@ -0,0 +1,252 @@
+"""
+Response caches for Samadhan AI
+Exact-match TTL/LRU cache for repeated complaints and an embedding-based
+cache for paraphrased ones
+"""
+
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+_NON_WORD = re.compile(r'[^\w\s]+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_complaint_text(text: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a complaint"""
+    return _WHITESPACE.sub(' ', _NON_WORD.sub(' ', text.casefold())).strip()
+
+
+def response_cache_key(complaint_text: str, category: str, priority: str, language: str,
+                       district: Optional[str] = None) -> Tuple[str, str, str, str, Optional[str]]:
+    """Cache key for a generated response"""
+    return (normalize_complaint_text(complaint_text), category, priority, language, district)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ttl seconds"""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if self._clock() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+class SemanticCache:
+    """Bounded cache of responses looked up by embedding similarity.
+
+    Entries live in a preallocated float32 matrix of L2-normalised embeddings,
+    so a lookup is one matrix-vector product. Only entries in the same scope
+    (e.g. category, priority, district and language) are candidates, and a hit
+    needs a cosine similarity of at least threshold. When full, expired entries
+    are reused first, then the least recently used one. A scope is forgotten
+    (and its id reused) when its last entry is overwritten, so scopes built
+    from client input cannot outnumber the entries.
+    """
+
+    # Lower edges of the similarity histogram reported by stats()
+    HISTOGRAM_EDGES = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95)
+
+    def __init__(self, maxsize: int, threshold: float, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._scope_ids = np.full(max(maxsize, 0), -1, dtype=np.int64)
+        self._expires_at = np.zeros(max(maxsize, 0), dtype=np.float64)
+        self._last_used = np.zeros(max(maxsize, 0), dtype=np.float64)
+        self._values: List[Any] = [None] * max(maxsize, 0)
+        self._scopes: Dict[Hashable, int] = {}
+        # scope id -> (scope, number of slots holding it)
+        self._scope_entries: Dict[int, List] = {}
+        self._free_scope_ids: List[int] = []
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._hit_similarity_sum = 0.0
+        self._hit_similarity_min: Optional[float] = None
+        # Best in-scope similarity of every lookup, bucketed for threshold tuning
+        self._histogram = [0] * (len(self.HISTOGRAM_EDGES) + 1)
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _acquire_scope(self, scope: Hashable) -> int:
+        """Scope id for one more slot holding scope"""
+        scope_id = self._scopes.get(scope)
+        if scope_id is None:
+            scope_id = self._free_scope_ids.pop() if self._free_scope_ids else len(self._scopes)
+            self._scopes[scope] = scope_id
+            self._scope_entries[scope_id] = [scope, 0]
+        self._scope_entries[scope_id][1] += 1
+        return scope_id
+
+    def _release_scope(self, scope_id: int):
+        """One slot no longer holds the scope; forget it after the last one"""
+        entry = self._scope_entries[scope_id]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._scopes[entry[0]]
+            del self._scope_entries[scope_id]
+            self._free_scope_ids.append(scope_id)
+
+    def _record_similarity(self, similarity: float):
+        bucket = 0
+        for edge in self.HISTOGRAM_EDGES:
+            if similarity < edge:
+                break
+            bucket += 1
+        self._histogram[bucket] += 1
+
+    def get(self, embedding: np.ndarray, scope: Hashable) -> Optional[Tuple[Any, float]]:
+        """(value, similarity) of the closest live entry in scope, or None below the threshold"""
+        with self._lock:
+            scope_id = self._scopes.get(scope)
+            if self._size == 0 or scope_id is None:
+                self.misses += 1
+                return None
+
+            now = self._clock()
+            size = self._size
+            similarities = self._matrix[:size] @ self._normalize(embedding)
+            candidates = (self._scope_ids[:size] == scope_id) & (self._expires_at[:size] > now)
+            if not candidates.any():
+                self.misses += 1
+                return None
+
+            similarities = np.where(candidates, similarities, -np.inf)
+            slot = int(np.argmax(similarities))
+            similarity = float(similarities[slot])
+            self._record_similarity(similarity)
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self._last_used[slot] = now
+            self.hits += 1
+            self._hit_similarity_sum += similarity
+            if self._hit_similarity_min is None or similarity < self._hit_similarity_min:
+                self._hit_similarity_min = similarity
+            return self._values[slot], similarity
+
+    def set(self, embedding: np.ndarray, scope: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+
+            now = self._clock()
+            if self._size < self.maxsize:
+                slot = self._size
+                self._size += 1
+            else:
+                # Reuse an expired slot if there is one, otherwise the least recently used
+                expired = self._expires_at <= now
+                slot = int(np.argmax(expired)) if expired.any() else int(np.argmin(self._last_used))
+                if not expired[slot]:
+                    self.evictions += 1
+                self._release_scope(int(self._scope_ids[slot]))
+
+            self._matrix[slot] = vector
+            self._scope_ids[slot] = self._acquire_scope(scope)
+            self._expires_at[slot] = now + self.ttl
+            self._last_used[slot] = now
+            self._values[slot] = value
+
+    def clear(self):
+        with self._lock:
+            self._size = 0
+            self._scopes.clear()
+            self._scope_entries.clear()
+            self._free_scope_ids.clear()
+            self._values = [None] * max(self.maxsize, 0)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and the similarity distribution for tuning the threshold"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            labels = [f'<{self.HISTOGRAM_EDGES[0]}'] + [
+                f'>={edge}' if index == len(self.HISTOGRAM_EDGES) - 1 else f'{edge}-{self.HISTOGRAM_EDGES[index + 1]}'
+                for index, edge in enumerate(self.HISTOGRAM_EDGES)
+            ]
+            return {
+                'size': self._size,
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'mean_hit_similarity': round(self._hit_similarity_sum / self.hits, 4) if self.hits else None,
+                'min_hit_similarity': round(self._hit_similarity_min, 4) if self._hit_similarity_min is not None else None,
+                'best_similarity_histogram': dict(zip(labels, self._histogram))
+            }
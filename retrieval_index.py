@@ -0,0 +1,152 @@
+"""
+Top-k retrieval over the Samadhan AI corpus embeddings
+Inner-product search with real similarity scores and metadata filters; numpy
+argpartition for small corpora, a FAISS flat index for large ones
+"""
+
+import logging
+import importlib.util
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from corpus_embeddings import l2_normalize
+
+# Probed without importing it: faiss is loaded by the first index large enough to use it
+FAISS_AVAILABLE = importlib.util.find_spec('faiss') is not None
+
+logger = logging.getLogger(__name__)
+
+# (document row, cosine similarity), best first
+Hit = Tuple[int, float]
+
+
+def _filter_key(value: Any) -> str:
+    return str(value).strip().casefold()
+
+
+class MetadataFilter:
+    """Posting lists of scalar metadata values for filtered search.
+
+    Filters map a metadata field (e.g. type, category, district) to a value
+    or a list of accepted values, compared case-insensitively; a document
+    matches when every filtered field matches.
+    """
+
+    def __init__(self, metadata: Sequence[Mapping[str, Any]]):
+        # field -> value -> sorted document rows
+        self._postings: Dict[str, Dict[str, np.ndarray]] = {}
+        for row, meta in enumerate(metadata):
+            for field, value in meta.items():
+                if isinstance(value, (str, int, float)):
+                    self._postings.setdefault(field, {}).setdefault(_filter_key(value), []).append(row)
+        for values in self._postings.values():
+            for value, rows in values.items():
+                values[value] = np.asarray(rows, dtype=np.int64)
+
+    def rows(self, filters: Optional[Mapping[str, Any]]) -> Optional[np.ndarray]:
+        """Rows matching every filter, or None when nothing is filtered"""
+        rows = None
+        for field, accepted in (filters or {}).items():
+            if accepted is None:
+                continue
+            values = accepted if isinstance(accepted, (list, tuple, set)) else [accepted]
+            postings = self._postings.get(field, {})
+            matched = [postings[_filter_key(v)] for v in values if _filter_key(v) in postings]
+            field_rows = np.unique(np.concatenate(matched)) if matched else np.empty(0, dtype=np.int64)
+            rows = field_rows if rows is None else np.intersect1d(rows, field_rows, assume_unique=True)
+        return rows
+
+
+def top_k_positions(scores: np.ndarray, k: int) -> np.ndarray:
+    """Column positions of the k best scores in each row, best first"""
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        positions = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        positions = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    best = np.take_along_axis(scores, positions, axis=1)
+    order = np.argsort(-best, axis=1, kind='stable')
+    return np.take_along_axis(positions, order, axis=1)
+
+
+class RetrievalIndex:
+    """Top-k cosine search over L2-normalised document embeddings.
+
+    Filters are applied as in MetadataFilter; filtered searches score only
+    the matching rows. Unfiltered searches use a FAISS IndexFlatIP once the
+    corpus has faiss_min_docs documents and FAISS is installed; below that a
+    matrix product plus argpartition is faster than handing the query to FAISS.
+    """
+
+    def __init__(self, matrix: np.ndarray, metadata: Sequence[Mapping[str, Any]], faiss_min_docs: int = 5000):
+        if len(metadata) != matrix.shape[0]:
+            raise ValueError(f'{len(metadata)} metadata entries for {matrix.shape[0]} embeddings')
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.metadata = list(metadata)
+        self.filter = MetadataFilter(self.metadata)
+
+        self._faiss_index = None
+        if FAISS_AVAILABLE and len(self.metadata) >= faiss_min_docs:
+            import faiss
+            self._faiss_index = faiss.IndexFlatIP(self.matrix.shape[1])
+            self._faiss_index.add(self.matrix)
+            logger.info(f'✅ FAISS retrieval index built ({len(self.metadata)} documents)')
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    @property
+    def backend(self) -> str:
+        return 'faiss' if self._faiss_index is not None else 'numpy'
+
+    def similarities(self, query_embedding: np.ndarray, rows: Sequence[int]) -> np.ndarray:
+        """Cosine similarity of one query to the given document rows (for re-ranking candidates)"""
+        query = l2_normalize(np.asarray(query_embedding).reshape(1, -1))[0]
+        return self.matrix[np.asarray(rows, dtype=np.int64)] @ query
+
+    def search_batch(self, query_embeddings: np.ndarray, k: int = 5,
+                     filters: Optional[Mapping[str, Any]] = None) -> List[List[Hit]]:
+        """Top-k hits for each query"""
+        queries = l2_normalize(np.atleast_2d(np.asarray(query_embeddings)))
+        if k <= 0 or not len(self.metadata):
+            return [[] for _ in range(queries.shape[0])]
+
+        rows = self.filter.rows(filters)
+        if rows is None and self._faiss_index is not None:
+            scores, ids = self._faiss_index.search(queries, min(k, len(self.metadata)))
+            return [[(int(i), float(s)) for i, s in zip(id_row, score_row) if i >= 0]
+                    for id_row, score_row in zip(ids, scores)]
+
+        if rows is not None and rows.size == 0:
+            return [[] for _ in range(queries.shape[0])]
+        candidates = self.matrix if rows is None else self.matrix[rows]
+        scores = queries @ candidates.T
+        positions = top_k_positions(scores, k)
+        return [
+            [(int(rows[p]) if rows is not None else int(p), float(scores[q, p])) for p in positions[q]]
+            for q in range(queries.shape[0])
+        ]
+
+    def search(self, query_embedding: np.ndarray, k: int = 5,
+               filters: Optional[Mapping[str, Any]] = None) -> List[Hit]:
+        """Top-k (row, similarity) hits for one query"""
+        return self.search_batch(np.asarray(query_embedding).reshape(1, -1), k, filters)[0]
+
+
+def weighted_vote(hits: Iterable[Hit], metadata: Sequence[Mapping[str, Any]],
+                  field: str) -> Optional[Tuple[Any, float]]:
+    """Similarity-weighted majority value of a metadata field among hits: (value, its share of the weight)
+
+    Hits whose document has no value for the field are ignored.
+    """
+    weights: Dict[Any, float] = {}
+    for row, score in hits:
+        label = metadata[row].get(field)
+        if label is not None:
+            weights[label] = weights.get(label, 0.0) + max(score, 0.0)
+    if not weights:
+        return None
+    total = sum(weights.values())
+    label = max(weights, key=weights.get)
+    return label, (weights[label] / total if total else 0.0)
@@ -3,6 +3,11 @@ Dataset Loader for Samadhan AI RAG Training
 ==========================================
 """
 
+import json
+import hashlib
+from functools import cached_property
+from types import MappingProxyType
+
 from . import (
     UP_GOVERNMENT_DATASET,
     COMPLAINT_PATTERNS, 
@@ -18,7 +23,7 @@ def get_complete_dataset():
     """Get the complete Samadhan AI dataset"""
     return SAMADHAN_AI_COMPLETE_DATASET
 
-def get_training_documents():
+def build_training_documents():
     """Generate training documents for RAG system"""
     documents = []
     
@@ -41,6 +46,7 @@ def get_training_documents():
     # Add complaint patterns
     for category, complaints in COMPLAINT_PATTERNS.items():
         for complaint in complaints:
+            dept_name = category
             dept_info = UP_GOVERNMENT_DATASET['departments'].get(category, {})
             if not dept_info:
                 # Map category to department
@@ -61,7 +67,7 @@ def get_training_documents():
                 'content': content,
                 'metadata': {
                     'category': category.replace(' ', ''),
-                    'department': dept_name if 'dept_name' in locals() else category,
+                    'department': dept_name,
                     'type': 'complaint_example',
                     'contact': dept_info.get('contact', 'N/A')
                 }
@@ -107,6 +113,78 @@ def get_training_documents():
     
     return documents
 
+class CorpusSnapshot:
+    """Immutable view of the dataset with memoised derived views.
+
+    The dataset modules are plain Python constants, so everything derived from
+    them (training documents, statistics) is built once per process and shared.
+    Documents and their metadata are read-only mappings, so no caller can
+    change the shared copies; get_training_documents returns mutable copies.
+    """
+
+    def __init__(self, dataset):
+        self._dataset = dataset
+
+    @cached_property
+    def version(self):
+        """Content hash of the complete dataset"""
+        payload = json.dumps(self._dataset, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @cached_property
+    def training_documents(self):
+        """All training documents, built once (read-only)"""
+        return tuple(
+            MappingProxyType({'content': doc['content'], 'metadata': MappingProxyType(dict(doc['metadata']))})
+            for doc in build_training_documents()
+        )
+
+    @cached_property
+    def documents_by_type(self):
+        """Training documents grouped by their metadata type"""
+        grouped = {}
+        for doc in self.training_documents:
+            grouped.setdefault(doc['metadata'].get('type'), []).append(doc)
+        return {doc_type: tuple(docs) for doc_type, docs in grouped.items()}
+
+    def documents_of_type(self, doc_type):
+        """Training documents of one type (department_info, complaint_example, district, ...)"""
+        return self.documents_by_type.get(doc_type, ())
+
+    @cached_property
+    def stats(self):
+        """Statistics about the dataset size"""
+        return {
+            'departments': len(UP_GOVERNMENT_DATASET['departments']),
+            'complaint_patterns': sum(len(complaints) for complaints in COMPLAINT_PATTERNS.values()),
+            'helplines': sum(len(helplines) for helplines in HELPLINES_DATASET.values()),
+            'districts': len(DISTRICTS_DATASET['major_districts']),
+            'online_services': sum(len(services) for services in ONLINE_SERVICES.values()),
+            'total_training_documents': len(self.training_documents),
+            'response_templates': sum(len(templates) for category_templates in RESPONSE_TEMPLATES.values() for templates in category_templates.values())
+        }
+
+_corpus_snapshot = None
+
+def get_corpus_snapshot():
+    """Get the process-wide dataset snapshot"""
+    global _corpus_snapshot
+    if _corpus_snapshot is None:
+        _corpus_snapshot = CorpusSnapshot(SAMADHAN_AI_COMPLETE_DATASET)
+    return _corpus_snapshot
+
+def invalidate_corpus_snapshot():
+    """Drop the cached snapshot (only needed after reloading the dataset modules)"""
+    global _corpus_snapshot
+    _corpus_snapshot = None
+
+def get_training_documents():
+    """Get training documents for RAG system"""
+    return [
+        {'content': doc['content'], 'metadata': dict(doc['metadata'])}
+        for doc in get_corpus_snapshot().training_documents
+    ]
+
 def get_priority_keywords():
     """Get priority keywords for classification"""
     return PRIORITY_KEYWORDS
@@ -133,16 +211,7 @@ def get_district_info(district_name):
 # Statistics about the dataset
 def get_dataset_stats():
     """Get statistics about the dataset size"""
-    stats = {
-        'departments': len(UP_GOVERNMENT_DATASET['departments']),
-        'complaint_patterns': sum(len(complaints) for complaints in COMPLAINT_PATTERNS.values()),
-        'helplines': sum(len(helplines) for helplines in HELPLINES_DATASET.values()),
-        'districts': len(DISTRICTS_DATASET['major_districts']),
-        'online_services': sum(len(services) for services in ONLINE_SERVICES.values()),
-        'total_training_documents': len(get_training_documents()),
-        'response_templates': sum(len(templates) for category_templates in RESPONSE_TEMPLATES.values() for templates in category_templates.values())
-    }
-    return stats
+    return dict(get_corpus_snapshot().stats)
 
 if __name__ == "__main__":
     # Print dataset statistics
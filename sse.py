@@ -0,0 +1,160 @@
+"""
+Incremental server-sent events (text/event-stream) decoder for Samadhan AI
+Parses provider streams from raw bytes in linear time and extracts chat completion deltas
+"""
+
+import json
+from itertools import chain
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+DONE_SENTINEL = '[DONE]'
+
+
+class SSEEvent(NamedTuple):
+    """One dispatched event"""
+    event: str
+    data: str
+    id: Optional[str] = None
+
+
+class SSEDecoder:
+    """Incremental SSE decoder.
+
+    Feed it raw byte chunks as they arrive; complete events are returned as soon
+    as their terminating blank line is seen. Each byte is scanned once: the
+    unfinished tail line stays in the buffer and scanning resumes where the
+    previous chunk ended. Lines are decoded as UTF-8 only once complete, so
+    multi-byte characters split across chunks are handled.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._scan_from = 0
+        self._event_type = ''
+        self._data_lines: List[str] = []
+        self._last_id: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        """Consume a chunk and return the events it completes"""
+        buffer = self._buffer
+        buffer += chunk
+
+        # Only the newly arrived bytes can contain the next line break
+        last_newline = buffer.rfind(b'\n', self._scan_from)
+        if last_newline == -1:
+            self._scan_from = len(buffer)
+            return []
+
+        text = buffer[:last_newline].decode('utf-8', errors='replace')
+        del buffer[:last_newline + 1]
+        self._scan_from = len(buffer)
+
+        lines = text.split('\n')
+        if '\r' in text:
+            lines = [line[:-1] if line.endswith('\r') else line for line in lines]
+        return self._process_lines(lines)
+
+    def flush(self) -> List[SSEEvent]:
+        """End of stream: process the trailing line and dispatch any pending event"""
+        lines = []
+        if self._buffer:
+            lines.append(self._buffer.decode('utf-8', errors='replace').rstrip('\r'))
+            self._buffer.clear()
+            self._scan_from = 0
+        events = self._process_lines(lines)
+        event = self._dispatch()
+        if event is not None:
+            events.append(event)
+        return events
+
+    def _process_lines(self, lines: List[str]) -> List[SSEEvent]:
+        events: List[SSEEvent] = []
+        data_lines = self._data_lines
+        for line in lines:
+            if line[:6] == 'data: ':
+                data_lines.append(line[6:])
+            elif line[:5] == 'data:':
+                data_lines.append(line[5:])
+            elif not line:
+                if data_lines:
+                    events.append(SSEEvent(self._event_type or 'message', '\n'.join(data_lines), self._last_id))
+                    data_lines = self._data_lines = []
+                self._event_type = ''
+            elif line.startswith(':'):
+                continue  # comment / keep-alive
+            else:
+                field, sep, value = line.partition(':')
+                if sep and value.startswith(' '):
+                    value = value[1:]
+                if field == 'event':
+                    self._event_type = value
+                elif field == 'id':
+                    self._last_id = value
+        return events
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        if not self._data_lines:
+            self._event_type = ''
+            return None
+        event = SSEEvent(self._event_type or 'message', '\n'.join(self._data_lines), self._last_id)
+        self._event_type = ''
+        self._data_lines = []
+        return event
+
+
+def _split_payloads(data: str) -> Iterator[object]:
+    """Per-line JSON payloads, for streams that omit the blank line between events"""
+    for line in data.split('\n'):
+        line = line.strip()
+        if line.startswith('data:'):
+            line = line[5:].strip()
+        if not line or line == DONE_SENTINEL:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+
+def extract_delta_content(payload: object) -> Optional[str]:
+    """choices[0].delta.content of a chat completion chunk, if any"""
+    try:
+        choices = payload.get('choices') or []
+        if choices:
+            return choices[0].get('delta', {}).get('content') or None
+    except (AttributeError, IndexError, TypeError):
+        pass
+    return None
+
+
+def event_deltas(data: str) -> Optional[List[str]]:
+    """Content deltas carried by one event's data, or None for the [DONE] sentinel"""
+    try:
+        content = extract_delta_content(json.loads(data))
+        return [content] if content else []
+    except json.JSONDecodeError:
+        pass
+    if data.strip() == DONE_SENTINEL:
+        return None
+    deltas = []
+    for payload in _split_payloads(data):
+        content = extract_delta_content(payload)
+        if content:
+            deltas.append(content)
+    return deltas
+
+
+def iter_events(chunks: Iterable[bytes]) -> Iterator[SSEEvent]:
+    """Decode a byte-chunk stream into events as they complete"""
+    decoder = SSEDecoder()
+    yield from chain.from_iterable(map(decoder.feed, chunks))
+    yield from decoder.flush()
+
+
+def iter_stream_deltas(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Yield content deltas from a chat completion event stream until [DONE]"""
+    for event in iter_events(chunks):
+        deltas = event_deltas(event.data)
+        if deltas is None:
+            return
+        yield from deltas
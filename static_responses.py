@@ -0,0 +1,162 @@
+"""
+Precompressed static JSON responses for Samadhan AI
+Endpoints whose payload only changes with the dataset (/api/up/data,
+/api/dataset/stats) are serialised once per dataset version together with a
+strong ETag and gzip/brotli variants, so a request is answered with a 304 or
+with bytes that are already encoded
+"""
+
+import gzip
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODING_BROTLI = 'br'
+ENCODING_GZIP = 'gzip'
+ENCODING_IDENTITY = 'identity'
+# Preferred first when the client accepts several with the same quality
+ENCODING_PREFERENCE = (ENCODING_BROTLI, ENCODING_GZIP, ENCODING_IDENTITY)
+# Smaller bodies fit in a packet either way and are sent as they are
+MIN_COMPRESS_BYTES = 1024
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Coding -> quality from an Accept-Encoding header (lower-cased codings, '*' kept)"""
+    qualities = {}
+    for item in (header or '').split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def select_encoding(header: Optional[str], available: Iterable[str]) -> Optional[str]:
+    """Best available content coding for an Accept-Encoding header, or None if none is acceptable
+
+    identity is acceptable unless excluded explicitly (identity;q=0, or *;q=0
+    without identity listed), as in RFC 9110.
+    """
+    qualities = parse_accept_encoding(header)
+    wildcard = qualities.get('*')
+    best, best_quality = None, 0.0
+    for coding in ENCODING_PREFERENCE:
+        if coding not in available:
+            continue
+        quality = qualities.get(coding, wildcard)
+        if quality is None:
+            quality = 1.0 if coding == ENCODING_IDENTITY else 0.0
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def etag_matches(if_none_match: Optional[str], etags: Iterable[str]) -> bool:
+    """If-None-Match matches one of the representation's ETags (weak comparison, as RFC 9110 requires)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return any(etag in candidates for etag in etags)
+
+
+class PrecompressedJSON:
+    """One serialised JSON payload with a strong ETag and its gzip/brotli encodings.
+
+    Each encoding gets its own ETag (the identity tag with a -gzip or -br
+    suffix), since a strong validator must change with the bytes; any of them
+    is accepted as a match in If-None-Match. Bodies under MIN_COMPRESS_BYTES
+    are not compressed, and an encoding is kept only when it is smaller.
+    """
+
+    def __init__(self, body: bytes, version: str = ''):
+        self.version = version
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.bodies: Dict[str, bytes] = {ENCODING_IDENTITY: body}
+        self.etags: Dict[str, str] = {ENCODING_IDENTITY: f'"{digest}"'}
+
+        encoded = {}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            encoded[ENCODING_GZIP] = gzip.compress(body, compresslevel=9, mtime=0)
+        if brotli is not None and len(body) >= MIN_COMPRESS_BYTES:
+            encoded[ENCODING_BROTLI] = brotli.compress(body, mode=brotli.MODE_TEXT, quality=11)
+        for coding, data in encoded.items():
+            if len(data) < len(body):
+                self.bodies[coding] = data
+                self.etags[coding] = f'"{digest}-{coding}"'
+
+    def sizes(self) -> Dict[str, int]:
+        return {coding: len(data) for coding, data in self.bodies.items()}
+
+    def negotiate(self, accept_encoding: Optional[str],
+                  if_none_match: Optional[str]) -> Tuple[int, bytes, Dict[str, str]]:
+        """(status, body, headers) for a request: 304 when the client's copy is current,
+        otherwise 200 with the best acceptable encoding (identity if none is)"""
+        coding = select_encoding(accept_encoding, self.bodies) or ENCODING_IDENTITY
+        headers = {'ETag': self.etags[coding], 'Vary': 'Accept-Encoding'}
+        if etag_matches(if_none_match, self.etags.values()):
+            return 304, b'', headers
+        if coding != ENCODING_IDENTITY:
+            headers['Content-Encoding'] = coding
+        return 200, self.bodies[coding], headers
+
+
+class StaticJSONResponses:
+    """Named PrecompressedJSON payloads, rebuilt when the dataset version changes.
+
+    version() is called on every get and must be cheap (the dataset
+    snapshot memoises its content hash); payloads are serialised with
+    serialize(payload) -> bytes.
+    """
+
+    def __init__(self, serialize: Callable[[Any], bytes], version: Callable[[], str]):
+        self._serialize = serialize
+        self._version = version
+        self._builders: Dict[str, Callable[[], Any]] = {}
+        self._payloads: Dict[str, PrecompressedJSON] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def register(self, name: str, build: Callable[[], Any]):
+        """build() returns the JSON-serialisable payload for the current dataset"""
+        self._builders[name] = build
+
+    def get(self, name: str) -> PrecompressedJSON:
+        version = self._version()
+        payload = self._payloads.get(name)
+        if payload is not None and payload.version == version:
+            return payload
+        with self._lock:
+            payload = self._payloads.get(name)
+            if payload is None or payload.version != version:
+                payload = PrecompressedJSON(self._serialize(self._builders[name]()), version)
+                self._payloads[name] = payload
+                self.builds += 1
+            return payload
+
+    def prebuild(self):
+        """Serialise and compress every registered payload now (at startup)"""
+        for name in self._builders:
+            self.get(name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'brotli': brotli is not None,
+            'builds': self.builds,
+            'payloads': {name: payload.sizes() for name, payload in self._payloads.items()}
+        }
@@ -0,0 +1,226 @@
+"""
+IBM Cloud IAM token manager for Samadhan AI
+Per-account token cache with single-flight refresh and proactive background renewal
+"""
+
+import time
+import logging
+import threading
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# asyncio is imported by the async classes when used: the Flask app never needs it
+
+# fetch(api_key) -> (access_token, expires_in_seconds)
+TokenFetcher = Callable[[str], Tuple[str, float]]
+AsyncTokenFetcher = Callable[[str], Awaitable[Tuple[str, float]]]
+
+# Shortest wait before a proactive refresh, so short-lived tokens cannot make it loop on IAM
+MIN_REFRESH_DELAY = 10.0
+
+
+def token_lifetime(expires_in: float, refresh_margin: float, expiry_margin: float) -> Tuple[float, float]:
+    """(seconds the token is served, seconds until its proactive refresh) after a fetch
+
+    The margins apply as configured when the token lives long enough. For a
+    lifetime shorter than a margin the token is served for half its lifetime
+    and refreshed after half of it (at least MIN_REFRESH_DELAY), instead of
+    being stale or due for refresh as soon as it arrives.
+    """
+    expires_in = max(0.0, expires_in)
+    valid_for = max(expires_in - expiry_margin, expires_in / 2)
+    refresh_after = expires_in - refresh_margin
+    if refresh_after < expires_in / 2:
+        refresh_after = max(expires_in / 2, MIN_REFRESH_DELAY)
+    return valid_for, refresh_after
+
+
+class _TokenEntry:
+    """Cached token for one API key"""
+
+    def __init__(self):
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self.refresh_at = 0.0
+        # Held for the duration of an IAM call: at most one refresh in flight per account
+        self.fetch_lock = threading.Lock()
+        self.background_refresh = False
+        self.timer: Optional[threading.Timer] = None
+
+    def is_valid(self, now: float) -> bool:
+        return bool(self.token) and now < self.expires_at
+
+
+class IAMTokenManager:
+    """Thread-safe IAM token cache keyed by API key.
+
+    Tokens are renewed in the background once they enter the refresh window
+    (refresh_margin seconds before expiry), so request threads only block on
+    IAM when no valid token exists at all, and then only one of them calls IAM
+    while the others wait for its result.
+    """
+
+    def __init__(self, fetch_token: TokenFetcher, refresh_margin: float = 300, expiry_margin: float = 60):
+        self._fetch_token = fetch_token
+        self.refresh_margin = refresh_margin
+        self.expiry_margin = expiry_margin
+        self._entries: Dict[str, _TokenEntry] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, api_key: str) -> _TokenEntry:
+        entry = self._entries.get(api_key)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.setdefault(api_key, _TokenEntry())
+        return entry
+
+    def get_token(self, api_key: str) -> str:
+        """Valid access token for the account, refreshing only when none is usable"""
+        entry = self._entry(api_key)
+        now = time.time()
+
+        if entry.is_valid(now):
+            if now >= entry.refresh_at:
+                self._refresh_in_background(api_key, entry)
+            return entry.token
+
+        with entry.fetch_lock:
+            # Another thread may have refreshed while we waited for the lock
+            if entry.is_valid(time.time()):
+                return entry.token
+            self._fetch(api_key, entry)
+            return entry.token
+
+    def invalidate(self, api_key: str):
+        """Forget the cached token (e.g. after a 401 from WatsonX)"""
+        entry = self._entry(api_key)
+        entry.token = None
+        entry.expires_at = 0.0
+
+    def status(self) -> Dict[str, Dict[str, float]]:
+        """Seconds until expiry for each cached account (keys are masked)"""
+        now = time.time()
+        return {
+            f'...{api_key[-4:]}': {'valid': entry.is_valid(now), 'expires_in': round(max(0.0, entry.expires_at - now), 1)}
+            for api_key, entry in list(self._entries.items())
+        }
+
+    def _fetch(self, api_key: str, entry: _TokenEntry):
+        """Call IAM and store the result (caller holds entry.fetch_lock)"""
+        token, expires_in = self._fetch_token(api_key)
+        fetched_at = time.time()
+        valid_for, refresh_after = token_lifetime(expires_in, self.refresh_margin, self.expiry_margin)
+        entry.token = token
+        entry.expires_at = fetched_at + valid_for
+        entry.refresh_at = fetched_at + refresh_after
+        self._schedule_refresh(api_key, entry, refresh_after)
+
+    def _schedule_refresh(self, api_key: str, entry: _TokenEntry, delay: float):
+        if entry.timer is not None:
+            entry.timer.cancel()
+        entry.timer = threading.Timer(max(0.0, delay), self._refresh_in_background, args=(api_key, entry))
+        entry.timer.daemon = True
+        entry.timer.start()
+
+    def _refresh_in_background(self, api_key: str, entry: _TokenEntry):
+        with self._lock:
+            if entry.background_refresh:
+                return
+            entry.background_refresh = True
+        threading.Thread(target=self._background_refresh, args=(api_key, entry),
+                         name='iam-token-refresh', daemon=True).start()
+
+    def _background_refresh(self, api_key: str, entry: _TokenEntry):
+        try:
+            # Non-blocking: a foreground refresh already in flight does the work
+            if not entry.fetch_lock.acquire(blocking=False):
+                return
+            try:
+                if time.time() < entry.refresh_at:
+                    return
+                self._fetch(api_key, entry)
+                logger.info('✅ IBM Cloud token refreshed in background')
+            finally:
+                entry.fetch_lock.release()
+        except Exception as e:
+            logger.warning(f'⚠️ Background IBM Cloud token refresh failed: {e}')
+            # Retry before the current token runs out
+            remaining = entry.expires_at - time.time()
+            if remaining > 0:
+                self._schedule_refresh(api_key, entry, min(30.0, remaining / 2))
+        finally:
+            with self._lock:
+                entry.background_refresh = False
+
+
+class _AsyncTokenEntry:
+    """Cached token for one API key (event-loop side)"""
+
+    def __init__(self):
+        import asyncio
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self.refresh_at = 0.0
+        self.fetch_lock = asyncio.Lock()
+        self.refresh_task: Optional[asyncio.Task] = None
+
+    def is_valid(self, now: float) -> bool:
+        return bool(self.token) and now < self.expires_at
+
+
+class AsyncIAMTokenManager:
+    """asyncio counterpart of IAMTokenManager for the ASGI app.
+
+    Same margins and single-flight behaviour: concurrent requests await one IAM
+    call per account, and tokens in the refresh window are renewed by a
+    background task while the current token keeps being served.
+    """
+
+    def __init__(self, fetch_token: AsyncTokenFetcher, refresh_margin: float = 300, expiry_margin: float = 60):
+        self._fetch_token = fetch_token
+        self.refresh_margin = refresh_margin
+        self.expiry_margin = expiry_margin
+        self._entries: Dict[str, _AsyncTokenEntry] = {}
+
+    async def get_token(self, api_key: str) -> str:
+        entry = self._entries.setdefault(api_key, _AsyncTokenEntry())
+        now = time.time()
+
+        if entry.is_valid(now):
+            if now >= entry.refresh_at and (entry.refresh_task is None or entry.refresh_task.done()):
+                import asyncio
+                entry.refresh_task = asyncio.create_task(self._background_refresh(api_key, entry))
+            return entry.token
+
+        async with entry.fetch_lock:
+            if entry.is_valid(time.time()):
+                return entry.token
+            await self._fetch(api_key, entry)
+            return entry.token
+
+    def invalidate(self, api_key: str):
+        entry = self._entries.get(api_key)
+        if entry is not None:
+            entry.token = None
+            entry.expires_at = 0.0
+
+    async def _fetch(self, api_key: str, entry: _AsyncTokenEntry):
+        token, expires_in = await self._fetch_token(api_key)
+        fetched_at = time.time()
+        valid_for, refresh_after = token_lifetime(expires_in, self.refresh_margin, self.expiry_margin)
+        entry.token = token
+        entry.expires_at = fetched_at + valid_for
+        entry.refresh_at = fetched_at + refresh_after
+
+    async def _background_refresh(self, api_key: str, entry: _AsyncTokenEntry):
+        if entry.fetch_lock.locked():
+            return
+        try:
+            async with entry.fetch_lock:
+                if time.time() < entry.refresh_at:
+                    return
+                await self._fetch(api_key, entry)
+                logger.info('✅ IBM Cloud token refreshed in background')
+        except Exception as e:
+            logger.warning(f'⚠️ Background IBM Cloud token refresh failed: {e}')
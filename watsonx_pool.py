@@ -0,0 +1,193 @@
+"""
+WatsonX account pool for Samadhan AI
+Spreads requests over several WatsonX accounts by expected latency and load,
+and skips accounts that are throttled or failing
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError, CircuitPermit
+
+logger = logging.getLogger(__name__)
+
+
+class NoWatsonXAccountAvailable(Exception):
+    """Every account is at its concurrency limit or cooling down"""
+
+
+class WatsonXAccount:
+    """One WatsonX account: credentials, concurrency limit and health statistics"""
+
+    def __init__(self, name: str, api_key: str, url: Optional[str], max_concurrency: int = 8,
+                 deployment_id: Optional[str] = None, breaker: Optional[CircuitBreaker] = None, **_):
+        self.name = name
+        self.breaker = breaker
+        self.api_key = api_key
+        self.url = url
+        self.deployment_id = deployment_id
+        self.max_concurrency = max(1, max_concurrency)
+        self.in_flight = 0
+        # Smoothed time to first token (seconds) and error rate (0..1); None until measured
+        self.ewma_latency: Optional[float] = None
+        self.ewma_error = 0.0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.throttled = 0
+
+    def is_cooling_down(self, now: float) -> bool:
+        return now < self.cooldown_until
+
+    def is_healthy(self, now: float) -> bool:
+        """Not throttled and not rejected by its circuit breaker"""
+        return not self.is_cooling_down(now) and (self.breaker is None or self.breaker.allows_calls())
+
+    def expected_cost(self, default_latency: float) -> float:
+        """Expected wait for one more request: latency scaled by load, penalised by errors"""
+        latency = self.ewma_latency if self.ewma_latency is not None else default_latency
+        load = (self.in_flight + 1) / self.max_concurrency
+        return latency * (1 + load) * (1 + 4 * self.ewma_error)
+
+    def status(self, now: float) -> Dict[str, Any]:
+        return {
+            'in_flight': self.in_flight,
+            'max_concurrency': self.max_concurrency,
+            'ewma_latency_ms': round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            'ewma_error_rate': round(self.ewma_error, 3),
+            'cooling_down_for': round(max(0.0, self.cooldown_until - now), 1),
+            'circuit': self.breaker.state if self.breaker is not None else None,
+            'requests': self.requests,
+            'failures': self.failures,
+            'throttled': self.throttled
+        }
+
+
+class AccountLease:
+    """A request slot on one account; report the outcome, then release it"""
+
+    def __init__(self, pool: 'WatsonXPool', account: WatsonXAccount, permit: Optional[CircuitPermit] = None):
+        self.pool = pool
+        self.account = account
+        self.permit = permit
+        self.started_at = time.monotonic()
+        self._done = False
+
+    def first_token(self):
+        """Record latency at the first streamed token"""
+        self.pool._record_latency(self.account, time.monotonic() - self.started_at)
+        if self.permit is not None:
+            self.permit.first_token()
+
+    def succeeded(self):
+        self.pool._record_outcome(self.account, error=False)
+        if self.permit is not None:
+            self.permit.success()
+
+    def failed(self):
+        self.pool._record_outcome(self.account, error=True)
+        if self.permit is not None:
+            self.permit.failure()
+
+    def throttle(self, retry_after: Optional[float] = None):
+        """Account hit its rate limit (HTTP 429): take it out of rotation for a while"""
+        self.pool._throttle(self.account, retry_after)
+
+    def release(self):
+        if not self._done:
+            self._done = True
+            if self.permit is not None:
+                self.permit.release()
+            self.pool._release(self.account)
+
+
+class WatsonXPool:
+    """Least-expected-latency balancing over WatsonX accounts.
+
+    Each account has its own concurrency limit; among accounts with a free slot,
+    no throttling cooldown and a breaker that lets calls through, the one with
+    the lowest expected cost (EWMA latency x load x error penalty) is chosen.
+    Throttled accounts cool down for the Retry-After period; failing or slow
+    accounts are taken out by their circuit breaker ('watsonx:<account>' in
+    breakers). When healthy accounts are merely busy, acquire waits up to
+    acquire_timeout seconds for a slot to free up.
+    """
+
+    def __init__(self, accounts: List[Dict[str, Any]], alpha: float = 0.2, throttle_cooldown: float = 30,
+                 acquire_timeout: float = 2, breakers: Optional[CircuitBreakerRegistry] = None):
+        self.accounts = [
+            WatsonXAccount(breaker=breakers.get(f"watsonx:{account['name']}") if breakers else None, **account)
+            for account in accounts
+        ]
+        self.alpha = alpha
+        self.throttle_cooldown = throttle_cooldown
+        self.acquire_timeout = acquire_timeout
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+    def acquire(self, exclude: tuple = (), timeout: Optional[float] = None) -> AccountLease:
+        """Lease a slot on the best available account (accounts in exclude are skipped)
+
+        timeout overrides acquire_timeout; 0 never blocks (for event-loop callers).
+        """
+        deadline = time.monotonic() + (self.acquire_timeout if timeout is None else timeout)
+        exclude = set(exclude)
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                eligible = [a for a in self.accounts if a.name not in exclude and a.is_healthy(now)]
+                candidates = [a for a in eligible if a.in_flight < a.max_concurrency]
+                if candidates:
+                    measured = [a.ewma_latency for a in self.accounts if a.ewma_latency is not None]
+                    # Unmeasured accounts look faster than the fastest measured one, so each gets tried
+                    default_latency = min(measured) / 2 if measured else 1.0
+                    account = min(candidates, key=lambda a: a.expected_cost(default_latency))
+                    try:
+                        permit = account.breaker.acquire() if account.breaker is not None else None
+                    except CircuitOpenError:
+                        # Lost the last half-open probe slot to another thread
+                        exclude.add(account.name)
+                        continue
+                    account.in_flight += 1
+                    account.requests += 1
+                    return AccountLease(self, account, permit)
+                # Waiting only helps if some healthy account is busy rather than cooling down
+                if not eligible or now >= deadline:
+                    raise NoWatsonXAccountAvailable('No WatsonX account available (all busy, throttled or failing)')
+                self._slot_freed.wait(deadline - now)
+
+    def _release(self, account: WatsonXAccount):
+        with self._lock:
+            account.in_flight -= 1
+            self._slot_freed.notify()
+
+    def _record_latency(self, account: WatsonXAccount, latency: float):
+        with self._lock:
+            if account.ewma_latency is None:
+                account.ewma_latency = latency
+            else:
+                account.ewma_latency += self.alpha * (latency - account.ewma_latency)
+
+    def _record_outcome(self, account: WatsonXAccount, error: bool):
+        with self._lock:
+            account.ewma_error += self.alpha * ((1.0 if error else 0.0) - account.ewma_error)
+            if error:
+                account.failures += 1
+
+    def _throttle(self, account: WatsonXAccount, retry_after: Optional[float]):
+        cooldown = retry_after if retry_after and retry_after > 0 else self.throttle_cooldown
+        with self._lock:
+            account.throttled += 1
+            account.ewma_error += self.alpha * (1.0 - account.ewma_error)
+            account.cooldown_until = max(account.cooldown_until, time.monotonic() + cooldown)
+        logger.warning(f'⚠️ WatsonX {account.name} throttled, skipped for {cooldown:.0f}s')
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            now = time.monotonic()
+            return {account.name: account.status(now) for account in self.accounts}